@@ -0,0 +1,210 @@
+"""Adaptive re-runs: repeat only the tests whose outcome is still uncertain.
+
+Instead of running every scenario a fixed four times, each test's rate of
+non-matching outcomes gets a Beta posterior from the runs recorded so far in
+``run_<n>_<tree>_results.json``. A test is settled once that posterior is
+confidently below or above the blocking threshold, or after ``max_runs``
+runs. Stable ``Match``/``Received`` tests settle after a single run; only
+non-matching or inconsistent ones are scheduled again.
+
+    python adaptive_rerun.py plan udp_dns_qname_prober
+    python apicampaign.py --ids-file rerun_udp_dns_ids.txt --results-file run_2_udp_dns_results.json
+    python adaptive_rerun.py synthesize
+    python adaptive_rerun.py simulate        # replay the recorded runs to estimate savings
+
+Entries that did not complete (submission/polling failures) count as missing
+observations, so those tests are simply scheduled again.
+"""
+import argparse
+import json
+import math
+import os
+
+from classifiers import MATCH_LABELS, RUN_CLASSIFIERS
+from result_archive import archive_path, load_results
+
+# Results file stem per test tree (run_<n>_<stem>_results.json)
+RUN_STEMS = {
+    "http_simple_request": "http_simple",
+    "http_1_conformance": "http",
+    "https_sni": "https",
+    "udp_dns_qname_prober": "udp_dns",
+}
+
+# Synthesis keys written per test tree (same as the conformance scripts)
+SYNTHESIS_KEYS = {
+    "http_1_conformance": "S2_HTTP",
+    "https_sni": "S3_HTTPS",
+    "udp_dns_qname_prober": "S4_DNS",
+}
+
+# Prior pseudo-counts (non-matching, matching): most tests match
+DEFAULT_PRIOR = (1, 4)
+
+
+def run_path(test_name, run_idx):
+    return f"run_{run_idx}_{RUN_STEMS[test_name]}_results.json"
+
+
+def load_runs(test_name, max_runs=4):
+    runs = []
+    for run_idx in range(1, max_runs + 1):
+        path = run_path(test_name, run_idx)
+        if not os.path.exists(path) and not os.path.exists(archive_path(path)):
+            break
+        runs.append(load_results(path))
+    return runs
+
+
+def collect_outcomes(test_name, runs):
+    """Map each test ID to its list of per-run labels (completed runs only)."""
+    classify = RUN_CLASSIFIERS[test_name]
+    outcomes = {}
+    for data in runs:
+        for tid, entry in data.items():
+            labels = outcomes.setdefault(tid, [])
+            if entry.get("status") == "completed" and entry.get("result"):
+                labels.append(classify(entry))
+    return outcomes
+
+
+def beta_sf(x, a, b):
+    # P(p > x) for p ~ Beta(a, b) with integer a, b (binomial identity)
+    n = a + b - 1
+    cdf = sum(math.comb(n, j) * x ** j * (1 - x) ** (n - j) for j in range(a, n + 1))
+    return 1.0 - cdf
+
+
+def blocked_probability(labels, match_label, threshold=0.5, prior=DEFAULT_PRIOR):
+    non_matches = sum(1 for label in labels if label != match_label)
+    matches = len(labels) - non_matches
+    return beta_sf(threshold, prior[0] + non_matches, prior[1] + matches)
+
+
+def is_settled(labels, match_label, confidence=0.95, min_runs=1, max_runs=4, threshold=0.5, prior=DEFAULT_PRIOR):
+    if len(labels) >= max_runs:
+        return True
+    if len(labels) < min_runs:
+        return False
+    p = blocked_probability(labels, match_label, threshold, prior)
+    return p >= confidence or p <= 1 - confidence
+
+
+def verdict(labels, match_label, blocked_fraction=0.75):
+    # Same rule as the conformance scripts (>= 3 of 4 non-matching runs)
+    if not labels:
+        return None
+    non_matches = sum(1 for label in labels if label != match_label)
+    return "Blocked" if non_matches / len(labels) >= blocked_fraction else "Passed"
+
+
+def plan(test_name, confidence=0.95, min_runs=1, max_runs=4, prior=DEFAULT_PRIOR):
+    """Return ``(unsettled_ids, next_run_index, outcomes)`` for a test tree."""
+    runs = load_runs(test_name, max_runs)
+    outcomes = collect_outcomes(test_name, runs)
+    match_label = MATCH_LABELS[test_name]
+    unsettled = [
+        tid for tid, labels in outcomes.items()
+        if not is_settled(labels, match_label, confidence, min_runs, max_runs, prior=prior)
+    ]
+    return sorted(unsettled, key=int), len(runs) + 1, outcomes
+
+
+def synthesize(test_names, max_runs=4, filename="synthesis.json"):
+    try:
+        with open(filename, "r") as f:
+            synthesis = json.load(f)
+    except FileNotFoundError:
+        synthesis = {}
+
+    for test_name in test_names:
+        outcomes = collect_outcomes(test_name, load_runs(test_name, max_runs))
+        if not outcomes:
+            print(f"⚠️ No runs found for {test_name}")
+            continue
+        match_label = MATCH_LABELS[test_name]
+        if test_name == "http_simple_request":
+            from result_join import CampaignJoin
+
+            join = CampaignJoin(("protocol",))
+            synthesis["S1_HTTP"], synthesis["S1_HTTPS"] = {}, {}
+            unmatched = 0
+            for tid in sorted(outcomes, key=int):
+                try:
+                    protocol = join.fields_of(tid)["protocol"]
+                except (KeyError, ValueError):
+                    unmatched += 1
+                    continue
+                synthesis[f"S1_{protocol.upper()}"][tid] = verdict(outcomes[tid], match_label)
+            if unmatched:
+                print(f"⚠️ {unmatched} {test_name} results have no entry in the campaign and were left out")
+        else:
+            key = SYNTHESIS_KEYS[test_name]
+            synthesis[key] = {tid: verdict(outcomes[tid], match_label) for tid in sorted(outcomes, key=int)}
+
+    with open(filename, "w") as f:
+        json.dump(synthesis, f, indent=2)
+    print(f"✅ Synthesis file '{filename}' updated")
+
+
+def simulate(test_name, confidence=0.95, min_runs=1, max_runs=4, prior=DEFAULT_PRIOR):
+    """Replay the recorded runs adaptively; return (runs used, runs recorded, verdict changes)."""
+    runs = load_runs(test_name, max_runs)
+    full = collect_outcomes(test_name, runs)
+    match_label = MATCH_LABELS[test_name]
+    used, changed = 0, 0
+    for labels in full.values():
+        seen = []
+        for label in labels:
+            seen.append(label)
+            if is_settled(seen, match_label, confidence, min_runs, max_runs, prior=prior):
+                break
+        used += len(seen)
+        if verdict(seen, match_label) != verdict(labels, match_label):
+            changed += 1
+    return used, sum(len(labels) for labels in full.values()), changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Schedule extra runs only for uncertain test outcomes.")
+    parser.add_argument("command", choices=("plan", "synthesize", "simulate"))
+    parser.add_argument("tests", nargs="*", help=f"Test trees (default: all of {', '.join(sorted(RUN_STEMS))})")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Posterior confidence needed to settle a test (default: 0.95)")
+    parser.add_argument("--min-runs", type=int, default=1, help="Runs before a test can settle (default: 1)")
+    parser.add_argument("--max-runs", type=int, default=4, help="Runs after which a test is settled regardless (default: 4)")
+    parser.add_argument("--prior", default="1,4", help="Beta prior pseudo-counts 'non_matching,matching' (default: 1,4)")
+    args = parser.parse_args()
+
+    test_names = args.tests or sorted(RUN_STEMS)
+    unknown = [name for name in test_names if name not in RUN_STEMS]
+    if unknown:
+        parser.error(f"unknown test tree(s): {', '.join(unknown)}")
+    prior = tuple(int(v) for v in args.prior.split(","))
+
+    if args.command == "synthesize":
+        synthesize(test_names, args.max_runs)
+        return
+
+    for test_name in test_names:
+        if args.command == "simulate":
+            used, recorded, changed = simulate(test_name, args.confidence, args.min_runs, args.max_runs, prior)
+            saved = 1 - used / recorded if recorded else 0
+            print(f"{test_name:<24} {used:>5}/{recorded} runs ({saved:.0%} saved), {changed} verdicts changed")
+            continue
+
+        unsettled, next_run, outcomes = plan(test_name, args.confidence, args.min_runs, args.max_runs, prior)
+        if not outcomes:
+            print(f"⚠️ No runs found for {test_name}; run {run_path(test_name, 1)} first")
+            continue
+        if not unsettled:
+            print(f"✅ {test_name}: all {len(outcomes)} tests settled")
+            continue
+        ids_file = f"rerun_{RUN_STEMS[test_name]}_ids.txt"
+        with open(ids_file, "w") as f:
+            f.write("\n".join(unsettled) + "\n")
+        print(f"🔁 {test_name}: {len(unsettled)}/{len(outcomes)} tests need another run → {ids_file}")
+        print(f"   python apicampaign.py --ids-file {ids_file} --results-file {run_path(test_name, next_run)}")
+
+
+if __name__ == "__main__":
+    main()
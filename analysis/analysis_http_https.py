@@ -1,47 +1,114 @@
+"""HTTP vs HTTPS discrepancies between the dict and sync_dict results.
+
+    python analysis/analysis_http_https.py                                   # enriched_filtered.json
+    python analysis/analysis_http_https.py run_1_http_simple_results.json   # joined on the fly
+
+Results without ``protocol``/``hostname`` get them from the campaign
+(result_join.py). Run from the repository root.
+
+The ``results`` and ``errors`` of each worker's dict and sync_dict are
+compared with structural_diff.py. A hostname/protocol is a discrepancy
+("yes") when any of its tests differs. The differing fields are grouped
+into categories (status, reason, body, response missing, errors) and
+written per hostname and protocol to ``http_https_discrepancy_details.json``.
+"""
 import json
+import os
+import sys
+from collections import Counter, defaultdict
+
 import matplotlib.pyplot as plt
 
-# Load input data
-with open("enriched_filtered.json", "r") as f:
-    data = json.load(f)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-discrepancies = {}
+from result_join import CampaignJoin  # noqa: E402
+from result_stream import iter_results  # noqa: E402
+from structural_diff import ANY, DiffEngine, categorize, format_path  # noqa: E402
+
+# First matching rule wins: a whole response on one side only is "response missing"
+HTTP_RULES = [
+    ("status", ("results", ANY, "status")),
+    ("reason", ("results", ANY, "reason")),
+    ("body", ("results", ANY, "body")),
+    ("response missing", ("results",)),
+    ("errors", ("errors",)),
+]
+EXAMPLES = 3
+
+
+def compared_section(variables, name):
+    section = (variables.get(name) or {}).get("result") or {}
+    return {"results": section.get("results"), "errors": section.get("errors")}
+
+
+def shorten(value, limit=200):
+    text = value if isinstance(value, str) else json.dumps(value)
+    return text if len(text) <= limit else text[:limit] + "…"
 
-for test_id, test_data in data.items():
+
+input_file = sys.argv[1] if len(sys.argv) > 1 else "enriched_filtered.json"
+join = None
+engine = DiffEngine()
+
+discrepancies = {}
+details = defaultdict(lambda: {"tests": 0, "discrepant": 0, "categories": Counter(), "examples": []})
+
+for test_id, test_data in iter_results(input_file):
+    if "protocol" not in test_data or "hostname" not in test_data:
+        join = join or CampaignJoin(("protocol", "hostname"))
+        try:
+            test_data.update(join.fields_of(test_id))
+        except (KeyError, ValueError):
+            pass
     hostname = test_data.get("hostname")
     protocol = test_data.get("protocol")
     key = f"{hostname}_{protocol}"
+    detail = details[key]
+    detail["tests"] += 1
 
-    discrepancy_found = False
     result = test_data.get("result")
-
     if not result:
-        discrepancies[key] = "no"
+        discrepancies.setdefault(key, "no")
         continue
 
+    categories = set()
     for worker_key in ["Worker_1", "Worker_2"]:
-        worker_data = result.get(worker_key, {}).get("Variables", {})
-
-        dict_section = worker_data.get("dict", {}).get("result", {})
-        sync_section = worker_data.get("sync_dict", {}).get("result", {})
-
-        dict_results = dict_section.get("results")
-        sync_results = sync_section.get("results")
-
-        dict_errors = dict_section.get("errors")
-        sync_errors = sync_section.get("errors")
-
-        if dict_results != sync_results or dict_errors != sync_errors:
-            discrepancy_found = True
-            break
-
-    discrepancies[key] = "yes" if discrepancy_found else "no"
+        worker_data = (result.get(worker_key) or {}).get("Variables") or {}
+        changes = engine.diff(compared_section(worker_data, "dict"), compared_section(worker_data, "sync_dict"))
+        if not changes:
+            continue
+        categories.update(categorize(changes, HTTP_RULES))
+        for change in changes[:EXAMPLES - len(detail["examples"])]:
+            detail["examples"].append({
+                "test_id": test_id,
+                "worker": worker_key,
+                "field": format_path(change.path),
+                "kind": change.kind,
+                "dict": shorten(change.left),
+                "sync_dict": shorten(change.right),
+            })
+
+    if categories:
+        detail["discrepant"] += 1
+        detail["categories"].update(categories)
+    discrepancies[key] = "yes" if categories or discrepancies.get(key) == "yes" else "no"
 
 # Save discrepancies JSON
 with open("http_https_discrepancies.json", "w") as f:
     json.dump(discrepancies, f, indent=4)
 
-print("✅ Discrepancy check complete — saved to 'http_https_discrepancies.json'")
+with open("http_https_discrepancy_details.json", "w") as f:
+    json.dump({key: {**detail, "categories": dict(detail["categories"].most_common())} for key, detail in details.items()}, f, indent=2)
+
+print("✅ Discrepancy check complete — saved to 'http_https_discrepancies.json' and 'http_https_discrepancy_details.json'")
+print(f"   {engine.compared} comparisons, {engine.walked} distinct mismatches diffed")
+for protocol in ("http", "https"):
+    totals = Counter()
+    for key, detail in details.items():
+        if key.endswith(f"_{protocol}"):
+            totals.update(detail["categories"])
+    if totals:
+        print(f"   {protocol.upper()}: " + ", ".join(f"{category} {count}" for category, count in totals.most_common()))
 
 # ------------------------
 # Prepare data for vector chart
@@ -1,32 +1,18 @@
-import json
-import yaml
+"""Add ``protocol`` and ``hostname`` from the campaign to filtered results.
 
-# Load JSON
-with open("custom_filtered.json") as f:
-    json_data = json.load(f)
+A shortcut for ``result_join.py custom_filtered.json enriched_filtered.json``
+(see result_join.py for other inputs and ``--fields``). Run from the
+repository root, where ``profiles/`` and ``tests-trees/`` are.
 
-# Load YAML
-with open("campaign.yml") as f:
-    yaml_data = yaml.safe_load(f)
+    python analysis/enriched_filtering.py
+    python analysis/enriched_filtering.py run_1_http_simple_results.json enriched_run_1.json
+"""
+import os
+import sys
 
-# Create a lookup table from YAML by ID
-yaml_lookup = {str(entry["id"]): entry for entry in yaml_data}
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Enrich JSON
-for test_id, test_data in json_data.items():
-    if test_id in yaml_lookup:
-        campaign_entry = yaml_lookup[test_id]
-        parameters = campaign_entry.get("parameters", {})
+from result_join import main  # noqa: E402
 
-        # Determine protocol
-        use_https = parameters.get("use_https", "0")
-        protocol = "https" if use_https == "1" else "http"
-        hostname = parameters.get("hostname", "")
-
-        # Add to JSON
-        test_data["protocol"] = protocol
-        test_data["hostname"] = hostname
-
-# Save enriched JSON
-with open("enriched_filtered.json", "w") as f:
-    json.dump(json_data, f, indent=2)
+if __name__ == "__main__":
+    main("custom_filtered.json", "enriched_filtered.json")
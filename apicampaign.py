@@ -1,13 +1,38 @@
 import yaml
 import json
-import requests
 import time
 from datetime import datetime
-from tqdm import tqdm
 import os
 import itertools
+import argparse
+from collections import deque
+from runner_metrics import RunnerMetrics
+from payload_cache import PayloadBuilder, load_payloads
+from task_client import TaskClient, MissingTaskId
+from worker_health import WorkerHealth
+from scheduler import fair_order, fit_time_budget, parse_assignments
 
 results_log_file = "results.json"
+campaign_file = "./campaign.yml"
+
+# --- Configuration ---
+master = "mahmoudmaster.admin.master.nopasaran.org"
+# Point at a local stand-in (see master_standin.py) with NOPASARAN_TASK_URL
+task_url = os.environ.get("NOPASARAN_TASK_URL", "https://www.nopasaran.org/api/v1/tests-trees/task")
+poll_interval = 2
+poll_timeout = 30
+metrics = RunnerMetrics()
+metrics_file = None
+# JSON-lines stream of logged results for live_dashboard.py (--events-file)
+events_file = None
+# Tests per submission batch; 1 keeps the original submit-then-poll loop
+batch_size = 1
+concurrency = 8
+use_batch_endpoint = True
+# Circuit breakers and rate limits per worker (see worker_health.py)
+health = WorkerHealth()
+repository = "https://github.com/nopasaran-org/nopasaran-tests-trees"
+payload_builder = PayloadBuilder(master, repository)
 
 def load_existing_results():
     if os.path.exists(results_log_file):
@@ -32,24 +57,42 @@ def log_result(results_dict, test_id, entry):
         **entry
     }
     results_dict[str(test_id)] = ordered_entry
-
-def poll_status(status_url, progress_bar, interval=2, timeout=30):
+    if events_file:
+        with open(events_file, "a") as f:
+            f.write(json.dumps({"id": str(test_id), **ordered_entry}) + "\n")
+
+def poll_status(status_url, progress_bar, interval=2, timeout=30, trace=None, session=None):
+    import requests
+
+    # trace (optional dict) receives the poll count, time spent queued on the
+    # master before the task left "pending", and how polling ended
+    trace = trace if trace is not None else {}
+    http = session or requests
+    trace["polls"] = 0
     start_time = time.time()
     anim = itertools.cycle(["←", "↖", "↑", "↗", "→", "↘", "↓", "↙"])
     while time.time() - start_time < timeout:
-        progress_bar.set_description(f"Polling {next(anim)}")
+        if progress_bar is not None:
+            progress_bar.set_description(f"Polling {next(anim)}")
         try:
-            response = requests.get(status_url)
+            trace["polls"] += 1
+            response = http.get(status_url)
             response.raise_for_status()
             data = response.json()
             status = data.get("status")
+            if status != "pending" and "queued" not in trace:
+                trace["queued"] = time.time() - start_time
             if status == "completed":
+                trace["outcome"] = "completed"
                 return data.get("result")
             elif status == "failed":
+                trace["outcome"] = "TaskFailed"
                 return None
-        except requests.exceptions.RequestException:
+        except requests.exceptions.RequestException as e:
+            trace["outcome"] = f"PollError {type(e).__name__}"
             return None
         time.sleep(interval)
+    trace["outcome"] = "PollTimeout"
     return None
 
 def extract_test_names(folder="./tests-trees"):
@@ -78,270 +121,474 @@ def extract_worker_names(profiles_folder="./profiles"):
                     continue
     return sorted(set(worker_names))
 
-# --- Load and select tests ---
-campaign_file = "./campaign.yml"
-if not os.path.exists(campaign_file):
-    raise FileNotFoundError("The campaign.yml file does not exist in the current directory.")
+def select_tests(test_campaign):
+    print("Test selection method:")
+    print("1. Run all tests")
+    print("2. Run by test ID range")
+    print("3. Run all tests with a specific name")
+    print("4. Run all tests between two specific workers")
+    print("5. Filter by both test name and worker pair")
+    selection = input("Select option (1/2/3/4/5): ").strip()
 
-with open(campaign_file, "r") as file:
-    test_campaign = yaml.safe_load(file)
+    while selection not in ("1", "2", "3", "4", "5"):
+        selection = input("Please enter 1, 2, 3, 4, or 5: ").strip()
 
-existing_results = load_existing_results()
+    rerun_completed = False
 
-print("Test selection method:")
-print("1. Run all tests")
-print("2. Run by test ID range")
-print("3. Run all tests with a specific name")
-print("4. Run all tests between two specific workers")
-print("5. Filter by both test name and worker pair")
-selection = input("Select option (1/2/3/4/5): ").strip()
+    if selection == "1":
+        rerun_input = input("Re-run completed tests as well? (y/n): ").strip().lower()
+        while rerun_input not in ("y", "n"):
+            rerun_input = input("Please enter 'y' or 'n': ").strip().lower()
+        rerun_completed = rerun_input == "y"
 
-while selection not in ("1", "2", "3", "4", "5"):
-    selection = input("Please enter 1, 2, 3, 4, or 5: ").strip()
+    elif selection == "2":
+        while True:
+            try:
+                start_id = int(input("Enter start test ID (inclusive): ").strip())
+                end_id = int(input("Enter end test ID (inclusive): ").strip())
+                selected_ids = list(range(start_id, end_id + 1))
+                filtered = [t for t in test_campaign if t.get("id") in selected_ids]
+                if filtered:
+                    test_campaign = filtered
+                    break
+                else:
+                    print("No matching test IDs found in range.")
+            except ValueError:
+                print("Invalid input. Please enter numeric test IDs.")
 
-rerun_completed = False
+    elif selection == "3":
+        names = extract_test_names()
+        if not names:
+            print("No test names found in tests-trees directory.")
+            exit(1)
 
-if selection == "1":
-    rerun_input = input("Re-run completed tests as well? (y/n): ").strip().lower()
-    while rerun_input not in ("y", "n"):
-        rerun_input = input("Please enter 'y' or 'n': ").strip().lower()
-    rerun_completed = rerun_input == "y"
+        print("\nAvailable test names:")
+        for i, name in enumerate(names, start=1):
+            print(f"{i}. {name}")
 
-elif selection == "2":
-    while True:
-        try:
-            start_id = int(input("Enter start test ID (inclusive): ").strip())
-            end_id = int(input("Enter end test ID (inclusive): ").strip())
-            selected_ids = list(range(start_id, end_id + 1))
-            filtered = [t for t in test_campaign if t.get("id") in selected_ids]
-            if filtered:
-                test_campaign = filtered
-                break
-            else:
-                print("No matching test IDs found in range.")
-        except ValueError:
-            print("Invalid input. Please enter numeric test IDs.")
+        while True:
+            try:
+                choice = int(input("\nEnter the number of the test to run: ").strip())
+                if 1 <= choice <= len(names):
+                    selected_name = names[choice - 1]
+                    break
+                else:
+                    print(f"Please enter a number between 1 and {len(names)}.")
+            except ValueError:
+                print("Invalid input. Please enter a number.")
 
-elif selection == "3":
-    names = extract_test_names()
-    if not names:
-        print("No test names found in tests-trees directory.")
-        exit(1)
+        filtered = [t for t in test_campaign if t.get("name") == selected_name]
+        if not filtered:
+            print(f"No tests found with the name '{selected_name}'. Exiting.")
+            exit(1)
+        test_campaign = filtered
 
-    print("\nAvailable test names:")
-    for i, name in enumerate(names, start=1):
-        print(f"{i}. {name}")
+    elif selection == "4":
+        worker_names = extract_worker_names()
+        if len(worker_names) < 2:
+            print("Not enough workers found to create a pair.")
+            exit(1)
+
+        print("\nAvailable workers:")
+        for i, name in enumerate(worker_names, 1):
+            print(f"{i}. {name}")
+
+        def choose_worker(prompt):
+            while True:
+                try:
+                    choice = int(input(prompt).strip())
+                    if 1 <= choice <= len(worker_names):
+                        return worker_names[choice - 1]
+                    else:
+                        print(f"Enter a number between 1 and {len(worker_names)}.")
+                except ValueError:
+                    print("Invalid input. Please enter a number.")
+
+        selected_w1 = choose_worker("Select Worker 1 by number: ")
+        selected_w2 = choose_worker("Select Worker 2 by number: ")
+
+        if selected_w1 == selected_w2:
+            print("Worker 1 and Worker 2 cannot be the same.")
+            exit(1)
+
+        filtered = [
+            t for t in test_campaign
+            if t["Worker_1"]["name"] == selected_w1 and t["Worker_2"]["name"] == selected_w2
+        ]
+
+        if not filtered:
+            print(f"No tests found between {selected_w1} and {selected_w2}. Exiting.")
+            exit(1)
+
+        test_campaign = filtered
+
+    elif selection == "5":
+        names = extract_test_names()
+        if not names:
+            print("No test names found in tests-trees directory.")
+            exit(1)
+
+        print("\nAvailable test names:")
+        for i, name in enumerate(names, start=1):
+            print(f"{i}. {name}")
 
-    while True:
-        try:
-            choice = int(input("\nEnter the number of the test to run: ").strip())
-            if 1 <= choice <= len(names):
-                selected_name = names[choice - 1]
-                break
-            else:
-                print(f"Please enter a number between 1 and {len(names)}.")
-        except ValueError:
-            print("Invalid input. Please enter a number.")
-
-    filtered = [t for t in test_campaign if t.get("name") == selected_name]
-    if not filtered:
-        print(f"No tests found with the name '{selected_name}'. Exiting.")
-        exit(1)
-    test_campaign = filtered
-
-elif selection == "4":
-    worker_names = extract_worker_names()
-    if len(worker_names) < 2:
-        print("Not enough workers found to create a pair.")
-        exit(1)
-
-    print("\nAvailable workers:")
-    for i, name in enumerate(worker_names, 1):
-        print(f"{i}. {name}")
-
-    def choose_worker(prompt):
         while True:
             try:
-                choice = int(input(prompt).strip())
-                if 1 <= choice <= len(worker_names):
-                    return worker_names[choice - 1]
+                choice = int(input("\nEnter the number of the test to run: ").strip())
+                if 1 <= choice <= len(names):
+                    selected_name = names[choice - 1]
+                    break
                 else:
-                    print(f"Enter a number between 1 and {len(worker_names)}.")
+                    print(f"Please enter a number between 1 and {len(names)}.")
             except ValueError:
                 print("Invalid input. Please enter a number.")
 
-    selected_w1 = choose_worker("Select Worker 1 by number: ")
-    selected_w2 = choose_worker("Select Worker 2 by number: ")
+        worker_names = extract_worker_names()
+        if len(worker_names) < 2:
+            print("Not enough workers found to create a pair.")
+            exit(1)
 
-    if selected_w1 == selected_w2:
-        print("Worker 1 and Worker 2 cannot be the same.")
-        exit(1)
+        print("\nAvailable workers:")
+        for i, name in enumerate(worker_names, 1):
+            print(f"{i}. {name}")
 
-    filtered = [
-        t for t in test_campaign
-        if t["Worker_1"]["name"] == selected_w1 and t["Worker_2"]["name"] == selected_w2
-    ]
+        def choose_worker(prompt):
+            while True:
+                try:
+                    choice = int(input(prompt).strip())
+                    if 1 <= choice <= len(worker_names):
+                        return worker_names[choice - 1]
+                    else:
+                        print(f"Enter a number between 1 and {len(worker_names)}.")
+                except ValueError:
+                    print("Invalid input. Please enter a number.")
 
-    if not filtered:
-        print(f"No tests found between {selected_w1} and {selected_w2}. Exiting.")
-        exit(1)
+        selected_w1 = choose_worker("Select Worker 1 by number: ")
+        selected_w2 = choose_worker("Select Worker 2 by number: ")
 
-    test_campaign = filtered
+        if selected_w1 == selected_w2:
+            print("Worker 1 and Worker 2 cannot be the same.")
+            exit(1)
 
-elif selection == "5":
-    names = extract_test_names()
-    if not names:
-        print("No test names found in tests-trees directory.")
-        exit(1)
+        filtered = [
+            t for t in test_campaign
+            if t.get("name") == selected_name
+            and t["Worker_1"]["name"] == selected_w1
+            and t["Worker_2"]["name"] == selected_w2
+        ]
 
-    print("\nAvailable test names:")
-    for i, name in enumerate(names, start=1):
-        print(f"{i}. {name}")
+        if not filtered:
+            print(f"No tests found for '{selected_name}' between {selected_w1} and {selected_w2}. Exiting.")
+            exit(1)
 
-    while True:
-        try:
-            choice = int(input("\nEnter the number of the test to run: ").strip())
-            if 1 <= choice <= len(names):
-                selected_name = names[choice - 1]
-                break
-            else:
-                print(f"Please enter a number between 1 and {len(names)}.")
-        except ValueError:
-            print("Invalid input. Please enter a number.")
+        test_campaign = filtered
 
-    worker_names = extract_worker_names()
-    if len(worker_names) < 2:
-        print("Not enough workers found to create a pair.")
-        exit(1)
+    return test_campaign, rerun_completed
 
-    print("\nAvailable workers:")
-    for i, name in enumerate(worker_names, 1):
-        print(f"{i}. {name}")
+def error_class(exc):
+    import requests
 
-    def choose_worker(prompt):
-        while True:
-            try:
-                choice = int(input(prompt).strip())
-                if 1 <= choice <= len(worker_names):
-                    return worker_names[choice - 1]
-                else:
-                    print(f"Enter a number between 1 and {len(worker_names)}.")
-            except ValueError:
-                print("Invalid input. Please enter a number.")
-
-    selected_w1 = choose_worker("Select Worker 1 by number: ")
-    selected_w2 = choose_worker("Select Worker 2 by number: ")
+    if isinstance(exc, requests.exceptions.HTTPError) and exc.response is not None:
+        return f"HTTPError {exc.response.status_code}"
+    return type(exc).__name__
 
-    if selected_w1 == selected_w2:
-        print("Worker 1 and Worker 2 cannot be the same.")
-        exit(1)
-
-    filtered = [
-        t for t in test_campaign
-        if t.get("name") == selected_name
-        and t["Worker_1"]["name"] == selected_w1
-        and t["Worker_2"]["name"] == selected_w2
-    ]
+def poll_task(test, task_id, timing, progress_bar=None, session=None):
+    test_name = test.get("name", "unknown_test")
+    status_url = f"{task_url}/{task_id}"
+    trace = {}
+    with metrics.time_stage("poll", test_name, timing):
+        result = poll_status(status_url, progress_bar, interval=poll_interval, timeout=poll_timeout, trace=trace, session=session)
+    metrics.record_polls(test_name, trace["polls"])
+    timing["polls"] = trace["polls"]
+    if "queued" in trace:
+        metrics.observe_stage("queue", test_name, trace["queued"], timing)
+    if not result:
+        outcome = trace.get("outcome")
+        metrics.record_error(test_name, "EmptyResult" if outcome == "completed" else outcome)
+    return {
+        "worker_1": test["Worker_1"]["name"],
+        "worker_2": test["Worker_2"]["name"],
+        "polling_url": status_url,
+        "test_name": test_name,
+        "status": "completed" if result else "polling_failed",
+        "result": result if result else None,
+        "error": None if result else "Polling failed or timed out."
+    }
 
-    if not filtered:
-        print(f"No tests found for '{selected_name}' between {selected_w1} and {selected_w2}. Exiting.")
-        exit(1)
+def failed_entry(test, status, error):
+    return {
+        "worker_1": test["Worker_1"]["name"],
+        "worker_2": test["Worker_2"]["name"],
+        "polling_url": None,
+        "test_name": test.get("name", "unknown_test"),
+        "status": status,
+        "error": error
+    }
 
-    test_campaign = filtered
+def finish_test(test, existing_results, entry, timing, started):
+    test_name = test.get("name", "unknown_test")
+    metrics.observe_stage("total", test_name, time.perf_counter() - started, timing)
+    metrics.record_result(test_name, entry["status"])
+    entry["timing"] = timing
+    log_result(existing_results, str(test.get("id", "unknown_id")), entry)
 
-# --- Configuration ---
-master = "mahmoudmaster.admin.master.nopasaran.org"
-task_url = "https://www.nopasaran.org/api/v1/tests-trees/task"
-repository = "https://github.com/nopasaran-org/nopasaran-tests-trees"
+def run_test(test, existing_results, body=None):
+    import requests
+    from tqdm import tqdm
 
-# --- Main test loop ---
-for test in test_campaign:
     test_name = test.get("name", "unknown_test")
     test_id = test.get("id", "unknown_id")
 
-    worker_1_name = test["Worker_1"]["name"]
-    worker_2_name = test["Worker_2"]["name"]
-
-    if not rerun_completed and str(test_id) in existing_results and existing_results[str(test_id)]["status"] == "completed":
-        continue
-
-    bar_desc = f"Test {test_id}: {worker_1_name} ↔ {worker_2_name}"
-    with tqdm(total=1, desc=bar_desc, unit="test", dynamic_ncols=True) as bar:
-        tests_tree = f"{test_name}.png"
-        worker_1 = f"{worker_1_name}.admin.worker.nopasaran.org"
-        worker_2 = f"{worker_2_name}.admin.worker.nopasaran.org"
-
-        controller_conf = test["parameters"].get("controller_conf_filename")
-        shared_params = {
-            k: v for k, v in test["parameters"].items()
-            if k != "controller_conf_filename"
-        }
-
-        variables = {
-            "Root": {
-                "Worker_1": {
-                    **{k: v for k, v in test["Worker_1"].items() if k != "parameters"},
-                    "controller_conf_filename": controller_conf,
-                    **shared_params
-                },
-                "Worker_2": {
-                    **{k: v for k, v in test["Worker_2"].items() if k != "parameters"},
-                    "controller_conf_filename": controller_conf,
-                    **shared_params
-                }
-            }
-        }
-
-        payload = {
-            "master": master,
-            "first-worker": worker_1,
-            "second-worker": worker_2,
-            "repository": repository,
-            "tests-tree": tests_tree,
-            "variables": variables
-        }
+    timing = {}
+    started = time.perf_counter()
 
-        try:
-            tqdm.write(f"Submitting test {test_id} - {test_name}")
+    with metrics.time_stage("build", test_name, timing):
+        if body is None:
+            body = payload_builder.build(test)
+
+    try:
+        tqdm.write(f"Submitting test {test_id} - {test_name}")
+        with metrics.time_stage("submit", test_name, timing):
             response = requests.post(
                 task_url,
-                data=json.dumps(payload),
+                data=body,
                 headers={'Content-Type': 'application/json'}
             )
             response.raise_for_status()
-
-            task_id = response.json().get("task_id")
-            if task_id:
-                status_url = f"{task_url}/{task_id}"
-                result = poll_status(status_url, tqdm(desc=f"Polling {test_id}", total=0))
-                log_result(existing_results, str(test_id), {
-                    "worker_1": worker_1_name,
-                    "worker_2": worker_2_name,
-                    "polling_url": status_url,
-                    "test_name": test_name,
-                    "status": "completed" if result else "polling_failed",
-                    "result": result if result else None,
-                    "error": None if result else "Polling failed or timed out."
-                })
+        metrics.record_submission(test_name)
+
+        task_id = response.json().get("task_id")
+        if task_id:
+            entry = poll_task(test, task_id, timing, tqdm(desc=f"Polling {test_id}", total=0))
+        else:
+            metrics.record_error(test_name, "NoTaskId")
+            entry = failed_entry(test, "error", "No task ID in response")
+
+    except requests.exceptions.RequestException as e:
+        metrics.record_error(test_name, error_class(e))
+        entry = failed_entry(test, "submission_failed", str(e))
+
+    finish_test(test, existing_results, entry, timing, started)
+
+def run_batch(client, tests, existing_results, payloads=None):
+    # Submit the whole batch in one go, then poll its tasks concurrently
+    started = time.perf_counter()
+    timings = {test["id"]: {} for test in tests}
+    bodies = []
+    for test in tests:
+        with metrics.time_stage("build", test.get("name", "unknown_test"), timings[test["id"]]):
+            body = payloads.get(test["id"]) if payloads else None
+            if body is None:
+                body = payload_builder.build(test)
+        bodies.append((test["id"], body))
+
+    submit_started = time.perf_counter()
+    task_ids = client.submit_many(bodies)
+    submit_seconds = time.perf_counter() - submit_started
+
+    def collect(test):
+        test_name = test.get("name", "unknown_test")
+        timing = timings[test["id"]]
+        metrics.observe_stage("submit", test_name, submit_seconds, timing)
+        task_id = task_ids.get(test["id"])
+        if isinstance(task_id, MissingTaskId):
+            metrics.record_error(test_name, "NoTaskId")
+            return failed_entry(test, "error", str(task_id))
+        if isinstance(task_id, Exception):
+            metrics.record_error(test_name, error_class(task_id))
+            return failed_entry(test, "submission_failed", str(task_id))
+        metrics.record_submission(test_name)
+        return poll_task(test, task_id, timing, session=client.session())
+
+    for test, entry in zip(tests, client.map(collect, tests)):
+        finish_test(test, existing_results, entry, timings[test["id"]], started)
+
+def take_tests(pending, deferred, limit, dropped):
+    # Next tests whose workers may be dispatched now. Tests held back by an
+    # open breaker wait in deferred (per worker pair) and are retried first.
+    batch = []
+    for pair in list(deferred):
+        while deferred[pair] and len(batch) < limit:
+            verdict = health.check(*pair)
+            if verdict == "allow":
+                batch.append(deferred[pair].popleft())
             else:
-                log_result(existing_results, str(test_id), {
-                    "worker_1": worker_1_name,
-                    "worker_2": worker_2_name,
-                    "polling_url": None,
-                    "test_name": test_name,
-                    "status": "error",
-                    "error": "No task ID in response"
-                })
-
-        except requests.exceptions.RequestException as e:
-            log_result(existing_results, str(test_id), {
-                "worker_1": worker_1_name,
-                "worker_2": worker_2_name,
-                "polling_url": None,
-                "test_name": test_name,
-                "status": "submission_failed",
-                "error": str(e)
-            })
-
-        save_results(existing_results)
-        bar.update(1)
+                if verdict == "dead":
+                    dropped.extend(deferred[pair])
+                    deferred[pair].clear()
+                break
+        if not deferred[pair]:
+            del deferred[pair]
+
+    while pending and len(batch) < limit:
+        test = pending.popleft()
+        pair = (test["Worker_1"]["name"], test["Worker_2"]["name"])
+        if pair in deferred:
+            deferred[pair].append(test)
+            continue
+        verdict = health.check(*pair)
+        if verdict == "allow":
+            batch.append(test)
+        elif verdict == "defer":
+            deferred.setdefault(pair, deque()).append(test)
+        else:
+            dropped.append(test)
+    return batch
+
+def run_campaign(test_campaign, existing_results, rerun_completed=False, payloads=None, deadline=None):
+    from tqdm import tqdm
+
+    pending = deque(
+        test for test in test_campaign
+        if rerun_completed or existing_results.get(str(test.get("id")), {}).get("status") != "completed"
+    )
+    deferred = {}
+    dropped = []
+    client = TaskClient(task_url, concurrency=concurrency, batch_size=batch_size, use_batch_endpoint=use_batch_endpoint) if batch_size > 1 else None
+    bar = tqdm(total=len(pending), desc="Campaign", unit="test", dynamic_ncols=True) if client else None
+
+    try:
+        while pending or deferred:
+            if deadline and time.monotonic() >= deadline:
+                tqdm.write("⏱️  Time budget used up, stopping")
+                break
+            batch = take_tests(pending, deferred, batch_size, dropped)
+            if not batch:
+                probe_at = health.next_probe_at()
+                if probe_at is None:
+                    break
+                wait = max(0.0, probe_at - time.monotonic())
+                tqdm.write(f"⏸️  {sum(len(tests) for tests in deferred.values())} tests held back by open circuit breakers, probing again in {wait:.0f}s")
+                time.sleep(wait)
+                continue
+
+            for test in batch:
+                health.throttle(test["Worker_1"]["name"], test["Worker_2"]["name"])
+
+            if client:
+                bar.set_description(f"Tests {batch[0]['id']}-{batch[-1]['id']}")
+                run_batch(client, batch, existing_results, payloads)
+            else:
+                test = batch[0]
+                test_id = test.get("id", "unknown_id")
+                bar_desc = f"Test {test_id}: {test['Worker_1']['name']} ↔ {test['Worker_2']['name']}"
+                with tqdm(total=1, desc=bar_desc, unit="test", dynamic_ncols=True) as test_bar:
+                    run_test(test, existing_results, payloads.get(test_id) if payloads else None)
+                    test_bar.update(1)
+
+            for test in batch:
+                status = existing_results[str(test.get("id", "unknown_id"))]["status"]
+                health.record(test["Worker_1"]["name"], test["Worker_2"]["name"], status)
+            save_results(existing_results)
+            if metrics_file:
+                metrics.write_textfile(metrics_file)
+            if bar:
+                bar.update(len(batch))
+    finally:
+        if bar:
+            bar.close()
+        if client:
+            client.close()
+
+    dropped.extend(test for tests in deferred.values() for test in tests)
+    if pending:
+        print(f"⏱️  {len(pending)} tests left for a later run")
+    workers, pairs = health.unhealthy()
+    if dropped:
+        print(f"⚠️  {len(dropped)} tests not run because their workers were unavailable (left unlogged for the next run)")
+    for worker, state in sorted(workers.items()):
+        print(f"   worker {worker}: {state}")
+    for pair, state in sorted(pairs.items()):
+        print(f"   pair {pair[0]} ↔ {pair[1]}: {state}")
+    return dropped
+
+def main():
+    global results_log_file, metrics_file, events_file, batch_size, concurrency, use_batch_endpoint, health
+
+    parser = argparse.ArgumentParser(description="Run a NoPASARAN test campaign.")
+    parser.add_argument("--metrics-file", help="Write Prometheus metrics to this file after every test")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port at /metrics")
+    parser.add_argument("--no-payload-cache", action="store_true", help="Rebuild payloads from campaign.yml without reading or writing the on-disk cache")
+    parser.add_argument("--batch-size", type=int, default=1, help="Submit tests in batches of this size and poll them concurrently (default: 1, one test at a time)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent submissions/polls when batching (default: 8)")
+    parser.add_argument("--no-batch-endpoint", action="store_true", help="Never use the master's batch endpoint; pipeline single submissions instead")
+    parser.add_argument("--failure-threshold", type=int, default=3, help="Consecutive failed tests that open a worker pair's circuit breaker (default: 3)")
+    parser.add_argument("--partner-threshold", type=int, default=2, help="Failing partners after which a worker is held back entirely (default: 2)")
+    parser.add_argument("--probe-backoff", type=float, default=30, help="Seconds before re-probing an open breaker; doubles after each failed probe (default: 30)")
+    parser.add_argument("--max-probes", type=int, default=3, help="Failed probes after which a worker is skipped for the rest of the run (default: 3)")
+    parser.add_argument("--worker-rate", type=float, help="Maximum submissions per second per worker")
+    parser.add_argument("--master-rate", type=float, help="Maximum submissions per second to the master")
+    parser.add_argument("--order", choices=("campaign", "fair"), default="campaign", help="Run tests in campaign order, or interleaved across test trees, worker pairs and domains (default: campaign)")
+    parser.add_argument("--priority", help="Priority classes per test tree for --order fair, e.g. udp_dns_qname_prober=0,https_sni=1 (lower runs first)")
+    parser.add_argument("--weight", help="Share per test tree within a priority class for --order fair, e.g. http_simple_request=2")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the starting offsets of --order fair")
+    parser.add_argument("--time-budget", type=float, help="Only run the tests expected to fit in this many minutes (from historical timings), then stop")
+    parser.add_argument("--ids-file", help="Run only the test IDs listed in this file (one per line, e.g. from adaptive_rerun.py) without prompting")
+    parser.add_argument("--results-file", help=f"Log results to this file instead of {results_log_file}")
+    parser.add_argument("--events-file", help="Also append every logged result as a JSON line to this file (for live_dashboard.py)")
+    args = parser.parse_args()
+
+    metrics_file = args.metrics_file
+    events_file = args.events_file
+    if args.results_file:
+        results_log_file = args.results_file
+    batch_size = max(1, args.batch_size)
+    concurrency = max(1, args.concurrency)
+    use_batch_endpoint = not args.no_batch_endpoint
+    health = WorkerHealth(
+        failure_threshold=args.failure_threshold,
+        partner_threshold=args.partner_threshold,
+        backoff=args.probe_backoff,
+        max_probes=args.max_probes,
+        worker_rate=args.worker_rate,
+        master_rate=args.master_rate,
+    )
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+        print(f"📈 Metrics served on :{args.metrics_port}/metrics")
+
+    if not os.path.exists(campaign_file):
+        raise FileNotFoundError("The campaign.yml file does not exist in the current directory.")
+
+    # Payloads are compiled once per campaign and cached next to it
+    test_campaign, payloads = load_payloads(campaign_file, master, repository, use_cache=not args.no_payload_cache)
+
+    existing_results = load_existing_results()
+
+    if args.ids_file:
+        with open(args.ids_file, "r") as f:
+            wanted = {int(line) for line in f if line.strip()}
+        test_campaign = [t for t in test_campaign if t.get("id") in wanted]
+        rerun_completed = False
+        print(f"📋 {len(test_campaign)} tests selected from {args.ids_file}")
+    else:
+        test_campaign, rerun_completed = select_tests(test_campaign)
+
+    if args.order == "fair":
+        test_campaign = fair_order(
+            test_campaign,
+            priorities=parse_assignments(args.priority, int),
+            weights=parse_assignments(args.weight),
+            seed=args.seed,
+        )
+
+    deadline = None
+    if args.time_budget:
+        todo = [
+            t for t in test_campaign
+            if rerun_completed or existing_results.get(str(t.get("id")), {}).get("status") != "completed"
+        ]
+        parallelism = min(batch_size, concurrency)
+        test_campaign, estimate = fit_time_budget(todo, existing_results, args.time_budget * 60, parallelism)
+        print(f"⏱️  {len(test_campaign)} of {len(todo)} tests fit in {args.time_budget:g} min (estimated {estimate / 60:.1f} min)")
+        deadline = time.monotonic() + args.time_budget * 60
+
+    try:
+        run_campaign(test_campaign, existing_results, rerun_completed, payloads, deadline)
+    finally:
+        if metrics_file:
+            metrics.write_textfile(metrics_file)
+        print("\n" + metrics.summary())
+
+if __name__ == "__main__":
+    main()
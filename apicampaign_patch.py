@@ -1,10 +1,10 @@
 import os
 import json
-import yaml
 import requests
+from generator import CampaignIndex
+from payload_cache import PayloadBuilder
 
 # Config
-campaign_file = "./campaign.yml"
 image_scripts = {
     "http_simple_request": "http_simple_all_workers_conformance.py",
     "http_1_conformance": "http_conformance_all_workers_conformance.py",
@@ -23,11 +23,11 @@ repository = "https://github.com/nopasaran-org/nopasaran-tests-trees"
 # Prompt for test ID
 test_id = input("Enter the test ID to run: ").strip()
 
-# Load campaign
-with open(campaign_file, "r") as f:
-    campaign = yaml.safe_load(f)
-
-test = next((t for t in campaign if str(t.get("id")) == test_id), None)
+# Decode the entry from profiles and test trees instead of loading the whole campaign
+try:
+    test = CampaignIndex.load().entry(int(test_id))
+except (KeyError, ValueError):
+    test = None
 
 if not test:
     print(f"No test found with ID {test_id}")
@@ -36,40 +36,10 @@ else:
     if test_name not in image_scripts or test_name not in result_files:
         print(f"No image script or result file defined for test '{test_name}'")
     else:
-        # Prepare payload
-        worker_1 = f"{test['Worker_1']['name']}.admin.worker.nopasaran.org"
-        worker_2 = f"{test['Worker_2']['name']}.admin.worker.nopasaran.org"
-        tests_tree = f"{test_name}.png"
-        controller_conf = test["parameters"].get("controller_conf_filename")
-        shared_params = {k: v for k, v in test["parameters"].items() if k != "controller_conf_filename"}
-        variables = {
-            "Root": {
-                "Worker_1": {
-                    **{k: v for k, v in test["Worker_1"].items() if k != "parameters"},
-                    "controller_conf_filename": controller_conf,
-                    **shared_params
-                },
-                "Worker_2": {
-                    **{k: v for k, v in test["Worker_2"].items() if k != "parameters"},
-                    "controller_conf_filename": controller_conf,
-                    **shared_params
-                }
-            }
-        }
-
-        payload = {
-            "master": master,
-            "first-worker": worker_1,
-            "second-worker": worker_2,
-            "repository": repository,
-            "tests-tree": tests_tree,
-            "variables": variables
-        }
-
         # Submit test
         print(f"Submitting test ID {test_id} ({test_name}) to NoPASARAN...")
         try:
-            response = requests.post(task_url, json=payload)
+            response = requests.post(task_url, data=PayloadBuilder(master, repository).build(test), headers={"Content-Type": "application/json"})
             response.raise_for_status()
             task_id = response.json().get("task_id")
             print(f"Task submitted. Task ID: {task_id}")
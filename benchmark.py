@@ -0,0 +1,569 @@
+"""Offline benchmark harness for the campaign pipeline.
+
+Builds a synthetic workspace (profiles, hostnames, test trees), then times and
+memory-profiles each stage: campaign generation (serial and with a process
+pool), campaign loading, payload submission against an in-process stand-in for
+the NoPASARAN API, the full runner loop against the local master stand-in
+(master_standin.py), batched and pipelined submission throughput against the
+same stand-in (task_client.py), classification (per entry and per unique
+result in a content-addressed store), live dashboard updates (including
+results of workers that went offline) and chart rendering. Results
+are written as JSON under ``bench_results/`` so that runs from different
+commits can be compared:
+
+    python benchmark.py --preset small
+    python benchmark.py --workers 20 --hostnames 1000 --runs 10
+    python benchmark.py --compare bench_results/a.json bench_results/b.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import permutations
+
+import yaml
+
+import classifiers
+import generator
+from payload_cache import PayloadBuilder
+from result_store import ResultStore
+
+BENCH_DIR = "bench_results"
+
+PRESETS = {
+    "small": {"workers": 6, "hostnames": 65, "runs": 4},
+    "medium": {"workers": 20, "hostnames": 1000, "runs": 10},
+    "large": {"workers": 200, "hostnames": 100000, "runs": 50},
+}
+
+# Classifiers benchmarked per test tree: (all-workers variant, per-run variant)
+CLASSIFIER_VARIANTS = {
+    "http_simple_request": (classifiers.classify_http_simple_entry, classifiers.classify_http_simple_run_entry),
+    "http_1_conformance": (classifiers.classify_http_conformance_entry, classifiers.classify_http_conformance_run_entry),
+    "https_sni": (classifiers.classify_https_sni_entry, classifiers.classify_https_sni_run_entry),
+    "udp_dns_qname_prober": (classifiers.classify_dns_entry, classifiers.classify_dns_run_entry),
+}
+
+
+@contextmanager
+def working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+# --- Synthetic data ---
+def make_profiles(n_workers, rng):
+    # Roughly half routers (intranet only) and half internet-facing VPSes
+    profiles = []
+    for i in range(n_workers):
+        is_vps = i % 2 == 1
+        profiles.append({
+            "name": f"{'vps' if is_vps else 'rb'}{i:04d}",
+            "ip": f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+            "intranet_accessible": True,
+            "internet_accessible": is_vps,
+        })
+    return profiles
+
+
+def make_hostnames(n_hostnames):
+    return [f"host{i}.bench{i % 97}.example" for i in range(n_hostnames)]
+
+
+def make_ips(n_hostnames, rng):
+    return [f"198.{rng.randrange(18, 20)}.{rng.randrange(256)}.{rng.randrange(1, 255)}" for _ in range(n_hostnames)]
+
+
+def write_workspace(root, profiles, hostnames, ips, tests_folder="./tests-trees"):
+    os.makedirs(os.path.join(root, "profiles"))
+    os.makedirs(os.path.join(root, "inputs"))
+    shutil.copytree(tests_folder, os.path.join(root, "tests-trees"))
+
+    for profile in profiles:
+        with open(os.path.join(root, "profiles", f"{profile['name']}.yml"), "w") as f:
+            yaml.safe_dump(profile, f, sort_keys=False)
+    with open(os.path.join(root, "inputs", "hostnames.yml"), "w") as f:
+        yaml.safe_dump(hostnames, f)
+    with open(os.path.join(root, "inputs", "ip.yml"), "w") as f:
+        yaml.safe_dump(ips, f)
+
+
+def _worker(state, variables):
+    return {"State": state, "Variables": dict(variables, ctrl=None, event="DONE", signal_type="ready_stop", **{"signaling-event": "DONE"})}
+
+
+def make_http_simple_result(hostname, rng):
+    ok = {"result": {"results": {"HTTP": {"status": 301, "reason": "Moved Permanently", "body": ""}}, "errors": []}}
+    roll = rng.random()
+    if roll < 0.85:
+        bad = ok
+    elif roll < 0.90:
+        bad = {"result": {"results": {"HTTP": {"status": 503, "reason": "Service Unavailable", "body": f"<title>{hostname} is Blocked</title>"}}, "errors": []}}
+    elif roll < 0.95:
+        bad = {"result": {"results": {}, "errors": ["HTTPS request failed: [Errno 104] Connection reset by peer"]}}
+    else:
+        bad = {"result": {"results": {}, "errors": ["HTTPS request failed: The read operation timed out"]}}
+    return {
+        "Worker_1": _worker("EXCHANGE_SYNC", {"dict": bad, "sync_dict": ok}),
+        "Worker_2": _worker("EXCHANGE_SYNC", {"dict": ok, "sync_dict": bad}),
+    }
+
+
+def make_http_conformance_result(hostname, rng):
+    request = f"GET / HTTP/1.1\r\nHost: {hostname}\r\nUser-Agent: Test-Client\r\nAccept: */*\r\n\r\n"
+    response = "HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\nContent-Length: 18\r\nConnection: close\r\n\r\nhello from server\r\n\r\n"
+    roll = rng.random()
+    if roll < 0.9:
+        received = response
+    elif roll < 0.97:
+        received = "HTTP/1.1 503 Service Unavailable\r\nConnection: close\r\n\r\n<title>The Website is Blocked</title>"
+    else:
+        received = ""
+    return {
+        "Worker_1": _worker("EXCHANGING_SYNC", {"received": received, "sync_received": request}),
+        "Worker_2": _worker("EXCHANGING_SYNC", {"received": request, "sync_received": response}),
+    }
+
+
+def make_https_sni_result(hostname, rng):
+    request = f"GET / HTTP/1.1\r\nHost: {hostname}\r\nUser-Agent: Test-Client\r\nAccept: */*\r\n\r\n"
+    response = "HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\nContent-Length: 18\r\nConnection: close\r\n\r\nhello from server\r\n\r\n"
+    if rng.random() < 0.9:
+        w1, w2 = {"received": response, "sync_dict": request}, {"received": request, "sync_dict": response}
+    else:
+        w1 = w2 = {"received": None, "sync_dict": None}
+    return {
+        "Worker_1": _worker("EXCHANGING_SYNC", w1),
+        "Worker_2": _worker("EXCHANGING_SYNC", w2),
+    }
+
+
+def make_dns_result(hostname, rng):
+    query = {"query": {"received": f";{hostname}.                IN      A"}}
+    roll = rng.random()
+    if roll < 0.78:
+        received = {"query": f";{hostname}. IN A", "response": f"ANSWER SECTION:{hostname}. 60 IN A 127.0.0.1", "error": None}
+    elif roll < 0.86:
+        received = {"query": f";{hostname}. IN A", "response": f"ANSWER SECTION:{hostname}. 1 IN CNAME sinkhole.paloaltonetworks.com.", "error": None}
+    else:
+        received = None
+    response = {"response": {"received": received}}
+    return {
+        "Worker_1": _worker("EXCHANGE_SYNC", {"dict": response, "sync_dict": query}),
+        "Worker_2": _worker("EXCHANGE_SYNC", {"dict": query, "sync_dict": response}),
+    }
+
+
+RESULT_BUILDERS = {
+    "http_simple_request": make_http_simple_result,
+    "http_1_conformance": make_http_conformance_result,
+    "https_sni": make_https_sni_result,
+    "udp_dns_qname_prober": make_dns_result,
+}
+
+
+def make_run_results(test_name, pairs, hostnames, rng, max_entries):
+    results = {}
+    test_id = 1
+    for w1, w2 in pairs:
+        for hostname in hostnames:
+            if test_id > max_entries:
+                return results
+            results[str(test_id)] = {
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "worker_1": w1,
+                "worker_2": w2,
+                "polling_url": None,
+                "test_name": test_name,
+                "status": "completed",
+                "result": RESULT_BUILDERS[test_name](hostname, rng),
+                "error": None,
+            }
+            test_id += 1
+    return results
+
+
+class FakeTaskAPI:
+    """In-process stand-in for the NoPASARAN task endpoints.
+
+    Accepts serialized payloads and completes every task immediately with a
+    synthetic result for the submitted test tree.
+    """
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.tasks = {}
+
+    def submit(self, body):
+        payload = json.loads(body)
+        task_id = str(uuid.UUID(int=self.rng.getrandbits(128)))
+        self.tasks[task_id] = payload
+        return {"task_id": task_id}
+
+    def status(self, task_id):
+        payload = self.tasks.pop(task_id)
+        test_name = payload["tests-tree"][:-len(".png")]
+        hostname = payload["variables"]["Root"]["Worker_1"].get("domain", "bench.example")
+        return {"status": "completed", "result": RESULT_BUILDERS[test_name](hostname, self.rng)}
+
+
+# --- Stages ---
+def stage_generate(ctx):
+    with working_directory(ctx["workspace"]):
+        generator.main()
+    return None
+
+
+def stage_generate_parallel(ctx):
+    with working_directory(ctx["workspace"]):
+        generator.main(campaign_output_file="campaign_parallel.yml", jobs=ctx["jobs"])
+    return None
+
+
+def stage_load(ctx):
+    with open(os.path.join(ctx["workspace"], "campaign.yml"), "r") as f:
+        campaign = yaml.safe_load(f)
+    ctx["campaign"] = campaign
+    return len(campaign)
+
+
+def stage_submit(ctx):
+    builder = PayloadBuilder("bench.admin.master.nopasaran.org", "https://github.com/nopasaran-org/nopasaran-tests-trees")
+    api = FakeTaskAPI(random.Random(ctx["seed"]))
+    for test in ctx["campaign"]:
+        body = builder.build(test)
+        task_id = api.submit(body)["task_id"]
+        api.status(task_id)
+    return len(ctx["campaign"])
+
+
+def stage_runner(ctx):
+    import apicampaign
+    from master_standin import MasterStandin, start_in_thread
+
+    if "standin_url" not in ctx:
+        standin = MasterStandin(task_duration=ctx["task_duration"], worker_capacity=ctx["worker_capacity"], seed=ctx["seed"])
+        ctx["standin_url"] = start_in_thread(standin)
+
+    apicampaign.task_url = ctx["standin_url"]
+    apicampaign.poll_interval = 0.01
+    apicampaign.results_log_file = os.path.join(ctx["workspace"], "runner_results.json")
+
+    tests = ctx["campaign"][:ctx["runner_tests"]]
+    apicampaign.run_campaign(tests, {}, rerun_completed=True)
+    return len(tests)
+
+
+def _submit_throughput(ctx, batch_enabled):
+    from master_standin import MasterStandin, start_in_thread
+    from task_client import TaskClient
+
+    key = "standin_url_batch" if batch_enabled else "standin_url_nobatch"
+    if key not in ctx:
+        standin = MasterStandin(task_duration=ctx["task_duration"], worker_capacity=ctx["worker_capacity"], batch_enabled=batch_enabled, seed=ctx["seed"])
+        ctx[key] = start_in_thread(standin)
+
+    builder = PayloadBuilder("bench.admin.master.nopasaran.org", "https://github.com/nopasaran-org/nopasaran-tests-trees")
+    items = [(test["id"], builder.build(test)) for test in ctx["campaign"][:ctx["submit_tests"]]]
+    client = TaskClient(ctx[key], concurrency=ctx["concurrency"], batch_size=ctx["batch_size"], use_batch_endpoint=batch_enabled)
+    try:
+        outcome = client.submit_many(items)
+    finally:
+        client.close()
+    return sum(1 for task_id in outcome.values() if not isinstance(task_id, Exception))
+
+
+def stage_submit_batch(ctx):
+    return _submit_throughput(ctx, batch_enabled=True)
+
+
+def stage_submit_pipelined(ctx):
+    return _submit_throughput(ctx, batch_enabled=False)
+
+
+def stage_classify(ctx):
+    count = 0
+    for test_name, runs in ctx["results"].items():
+        all_workers, per_run = CLASSIFIER_VARIANTS[test_name]
+        for results in runs:
+            for entry in results.values():
+                all_workers(entry)
+                per_run(entry)
+                count += 1
+    return count
+
+
+def stage_classify_dedup(ctx):
+    count = 0
+    for test_name, runs in ctx["results"].items():
+        all_workers, per_run = CLASSIFIER_VARIANTS[test_name]
+        for run_idx in range(len(runs)):
+            name = f"{test_name}_{run_idx}"
+            count += len(ctx["store"].classify(name, all_workers))
+            ctx["store"].classify(name, per_run)
+    return count
+
+
+def stage_live(ctx):
+    from live_dashboard import LiveState
+    from result_join import CampaignJoin
+
+    with working_directory(ctx["workspace"]):
+        state = LiveState(CampaignJoin(("protocol",)))
+    count = 0
+    for test_name, runs in ctx["results"].items():
+        for test_id, entry in runs[0].items():
+            state.update(test_id, entry)
+            count += 1
+        # What the runner records when a worker goes offline mid-campaign
+        test_id, entry = next(iter(runs[0].items()))
+        state.update(test_id, dict(entry, status="polling_failed", result=None, error="worker offline"))
+    return count
+
+
+def build_store(ctx):
+    store = ResultStore()
+    for test_name, runs in ctx["results"].items():
+        for run_idx, results in enumerate(runs):
+            store.add_run(f"{test_name}_{run_idx}", results)
+    ctx["store"] = store
+
+
+def stage_render(ctx):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import chart_export
+    from plotting import draw_status_row
+
+    colors = {'Received': 'green', 'Sinkhole': 'red', 'No Response': 'yellow', 'Failure': 'dimgray', 'PollingFailed': 'black'}
+    patterns = {'Received': '//', 'Sinkhole': '\\\\', 'No Response': 'xx', 'Failure': '...', 'PollingFailed': '///'}
+
+    rows = {}
+    for entry in ctx["results"]["udp_dns_qname_prober"][0].values():
+        row = rows.setdefault((entry["worker_1"], entry["worker_2"]), [])
+        if len(row) < ctx["max_row_cells"]:
+            row.append(classifiers.classify_dns_entry(entry))
+    rows = dict(list(rows.items())[:ctx["max_rows"]])
+
+    fig, ax = plt.subplots(figsize=(15, 6))
+    for idx, (pair, statuses) in enumerate(rows.items()):
+        draw_status_row(ax, 0.65 * (len(rows) - idx), statuses, colors, patterns, 0.6, f'{pair[0]} ↔ {pair[1]}')
+    plt.tight_layout()
+    chart_export.render(fig, os.path.join(ctx["workspace"], "bench_render"), ("png",), 300, chart_export.tight_bbox(fig, 300), False)
+    plt.close(fig)
+    return sum(len(statuses) for statuses in rows.values())
+
+
+STAGES = [
+    ("generate", stage_generate),
+    ("generate_parallel", stage_generate_parallel),
+    ("load", stage_load),
+    ("submit", stage_submit),
+    ("runner", stage_runner),
+    ("submit_batch", stage_submit_batch),
+    ("submit_pipelined", stage_submit_pipelined),
+    ("classify", stage_classify),
+    ("classify_dedup", stage_classify_dedup),
+    ("live", stage_live),
+    ("render", stage_render),
+]
+
+
+def measure(stage, ctx, repeat, profile_memory):
+    timings = []
+    items = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = stage(ctx)
+        timings.append(time.perf_counter() - start)
+
+    record = {"seconds": min(timings), "items": items}
+    if items:
+        record["items_per_second"] = items / record["seconds"] if record["seconds"] else None
+
+    if profile_memory:
+        tracemalloc.start()
+        stage(ctx)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        record["peak_mb"] = round(peak / (1024 * 1024), 3)
+    return record
+
+
+def git_revision():
+    try:
+        rev = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD"], stderr=subprocess.DEVNULL) != 0
+        return rev + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_benchmark(workers, hostnames, runs, seed=0, repeat=1, profile_memory=True,
+                  max_entries=200000, max_rows=50, max_row_cells=500, stages=None,
+                  runner_tests=50, task_duration="const:0.01", worker_capacity=4,
+                  submit_tests=1000, batch_size=50, concurrency=8, jobs=None):
+    rng = random.Random(seed)
+    profiles = make_profiles(workers, rng)
+    names = make_hostnames(hostnames)
+    ips = make_ips(hostnames, rng)
+
+    pairs = [
+        (w1["name"], w2["name"]) for w1, w2 in permutations(sorted(profiles, key=lambda p: p["name"]), 2)
+        if w2["internet_accessible"]
+    ]
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "params": {"workers": workers, "hostnames": hostnames, "runs": runs, "seed": seed, "repeat": repeat},
+        "stages": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="nopasaran-bench-") as workspace:
+        write_workspace(workspace, profiles, names, ips)
+        ctx = {
+            "workspace": workspace,
+            "seed": seed,
+            "max_rows": max_rows,
+            "max_row_cells": max_row_cells,
+            "runner_tests": runner_tests,
+            "task_duration": task_duration,
+            "worker_capacity": worker_capacity,
+            "submit_tests": submit_tests,
+            "batch_size": batch_size,
+            "concurrency": concurrency,
+            "jobs": jobs or os.cpu_count() or 1,
+            "results": {
+                test_name: [make_run_results(test_name, pairs, names, rng, max_entries) for _ in range(runs)]
+                for test_name in RESULT_BUILDERS
+            },
+        }
+
+        for name, stage in STAGES:
+            if stages and name not in stages:
+                continue
+            if name in ("load", "submit", "runner", "submit_batch", "submit_pipelined") and not os.path.exists(os.path.join(workspace, "campaign.yml")):
+                stage_generate(ctx)
+            if name in ("submit", "runner", "submit_batch", "submit_pipelined") and "campaign" not in ctx:
+                stage_load(ctx)
+            if name == "classify_dedup" and "store" not in ctx:
+                build_store(ctx)
+            try:
+                record = measure(stage, ctx, repeat, profile_memory)
+            except ImportError as e:
+                record = {"skipped": f"missing dependency: {e.name}"}
+            if name == "generate_parallel" and "seconds" in report["stages"].get("generate", {}):
+                record["jobs"] = ctx["jobs"]
+                record["speedup"] = round(report["stages"]["generate"]["seconds"] / record["seconds"], 2) if record["seconds"] else None
+            report["stages"][name] = record
+            print(f"{name:>16}: {_format_record(record)}")
+
+    return report
+
+
+def _format_record(record):
+    if "skipped" in record:
+        return record["skipped"]
+    text = f"{record['seconds']:.3f}s"
+    if record.get("items"):
+        text += f"  {record['items']} items"
+    if record.get("speedup"):
+        text += f"  {record['speedup']}x vs serial ({record['jobs']} jobs)"
+    if "peak_mb" in record:
+        text += f"  peak {record['peak_mb']} MB"
+    return text
+
+
+def save_report(report, output_dir=BENCH_DIR):
+    os.makedirs(output_dir, exist_ok=True)
+    params = report["params"]
+    filename = f"bench_{report['revision']}_w{params['workers']}_h{params['hostnames']}_r{params['runs']}.json"
+    path = os.path.join(output_dir, filename)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Benchmark saved: {path}")
+    return path
+
+
+def compare_reports(old_path, new_path):
+    with open(old_path, "r") as f:
+        old = json.load(f)
+    with open(new_path, "r") as f:
+        new = json.load(f)
+
+    print(f"{'stage':>16}  {old['revision']:>14}  {new['revision']:>14}  {'speedup':>8}  {'peak MB':>17}")
+    for name in new["stages"]:
+        before, after = old["stages"].get(name, {}), new["stages"][name]
+        if "seconds" not in before or "seconds" not in after:
+            print(f"{name:>16}  {'-':>14}  {'-':>14}")
+            continue
+        speedup = before["seconds"] / after["seconds"] if after["seconds"] else float("inf")
+        memory = f"{before.get('peak_mb', '-')} → {after.get('peak_mb', '-')}"
+        print(f"{name:>16}  {before['seconds']:>13.3f}s  {after['seconds']:>13.3f}s  {speedup:>7.2f}x  {memory:>17}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark campaign generation, loading, submission, classification and rendering.")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--workers", type=int, help="Number of synthetic worker profiles")
+    parser.add_argument("--hostnames", type=int, help="Number of synthetic hostnames")
+    parser.add_argument("--runs", type=int, help="Number of synthetic result runs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="Timing repetitions per stage (best is kept)")
+    parser.add_argument("--stages", nargs="+", choices=[name for name, _ in STAGES])
+    parser.add_argument("--max-entries", type=int, default=200000, help="Cap on synthetic results per run and test tree")
+    parser.add_argument("--runner-tests", type=int, default=50, help="Campaign entries pushed through the runner against the local master stand-in")
+    parser.add_argument("--task-duration", default="const:0.01", help="Stand-in task duration distribution for the runner stage")
+    parser.add_argument("--worker-capacity", type=int, default=4, help="Stand-in concurrent tasks per worker for the runner stage")
+    parser.add_argument("--submit-tests", type=int, default=1000, help="Campaign entries submitted in the batched/pipelined throughput stages")
+    parser.add_argument("--batch-size", type=int, default=50, help="Batch size for the submission throughput stages")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent submissions for the pipelined stage")
+    parser.add_argument("--jobs", type=int, help="Processes for the generate_parallel stage (default: CPU count)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--output-dir", default=BENCH_DIR)
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two saved benchmark files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_reports(*args.compare)
+        return
+
+    preset = PRESETS[args.preset]
+    report = run_benchmark(
+        workers=args.workers or preset["workers"],
+        hostnames=args.hostnames or preset["hostnames"],
+        runs=args.runs or preset["runs"],
+        seed=args.seed,
+        repeat=args.repeat,
+        profile_memory=not args.no_memory,
+        max_entries=args.max_entries,
+        stages=args.stages,
+        runner_tests=args.runner_tests,
+        task_duration=args.task_duration,
+        worker_capacity=args.worker_capacity,
+        submit_tests=args.submit_tests,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        jobs=args.jobs,
+    )
+    save_report(report, args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
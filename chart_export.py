@@ -0,0 +1,159 @@
+"""Chart export: layout computed once, rendering in a process pool.
+
+The plotting scripts hand their finished figure to ``save_chart`` instead of
+``plt.savefig(..., bbox_inches='tight')``. The tight bounding box is computed
+once per figure and reused for every output format, and the figure is
+pickled to a pool of worker processes that render it (PNG, SVG, PDF), so the
+next chart is built while the previous one is rasterized. The default PNG
+output is the same as ``plt.savefig``'s, pixel for pixel and about the same
+size. ``--indexed`` writes 64-color palette PNGs instead, about 60% smaller.
+This is lossy: the charts have about 280 colors, mostly from antialiased
+edges and text. On the eleven charts, at most 0.1% of pixels change by more
+than 8 of 255 on any channel, and none by more than 15. A 256-color palette
+gives the same error, so 64 colors is kept.
+
+Run plotting scripts through one shared exporter:
+
+    python chart_export.py dns_all_workers.py https_conformance_all_workers.py --jobs 4
+    python chart_export.py synthesis_vector.py --formats png pdf --indexed
+
+Run on their own, the scripts render inline, as before.
+"""
+import argparse
+import io
+import os
+import pickle
+import runpy
+from concurrent.futures import ProcessPoolExecutor
+
+FORMATS = ("png", "svg", "pdf")
+PAD_INCHES = 0.1
+
+# Exporter used by save_chart while chart_export.py runs the scripts
+_active = None
+
+
+def tight_bbox(fig, dpi, pad_inches=PAD_INCHES):
+    """Bounding box (inches) of what ``bbox_inches='tight'`` would keep at ``dpi``."""
+    # Text extents depend on the dpi: measure at the output resolution
+    figure_dpi, fig.dpi = fig.dpi, dpi
+    try:
+        bbox = fig.get_tightbbox(fig.canvas.get_renderer())
+    finally:
+        fig.dpi = figure_dpi
+    return bbox.padded(pad_inches)
+
+
+def indexed_png(data, colors=64):
+    """Re-encode PNG bytes as a palette image of at most ``colors`` colors."""
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data)).convert("RGB")
+    image = image.quantize(colors=colors, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+    out = io.BytesIO()
+    image.save(out, format="png", optimize=True)
+    return out.getvalue()
+
+
+def render(fig, base, formats, dpi, bbox, indexed):
+    """Write ``base.<format>`` for every format; return the written paths."""
+    paths = []
+    for fmt in formats:
+        buf = io.BytesIO()
+        fig.savefig(buf, format=fmt, dpi=dpi, bbox_inches=bbox)
+        data = buf.getvalue()
+        if fmt == "png" and indexed:
+            data = indexed_png(data)
+        path = f"{base}.{fmt}"
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        paths.append(path)
+    return paths
+
+
+def _render_pickled(blob, base, formats, dpi, bbox, indexed):
+    import matplotlib.pyplot as plt
+
+    fig = pickle.loads(blob)
+    try:
+        return render(fig, base, formats, dpi, bbox, indexed)
+    finally:
+        plt.close(fig)
+
+
+class ChartExporter:
+    """Renders figures inline (``jobs=1``) or in a pool of ``jobs`` processes."""
+
+    def __init__(self, jobs=1, formats=None, dpi=300, indexed=False):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.formats = tuple(formats) if formats else None
+        self.dpi = dpi
+        self.indexed = indexed
+        self.pool = ProcessPoolExecutor(self.jobs) if self.jobs > 1 else None
+        self.pending = []
+
+    def save(self, fig, output_file):
+        import matplotlib.pyplot as plt
+
+        base, ext = os.path.splitext(output_file)
+        formats = self.formats or (ext.lstrip(".") or "png",)
+        bbox = tight_bbox(fig, self.dpi)
+        if self.pool is None:
+            self._report(render(fig, base, formats, self.dpi, bbox, self.indexed))
+        else:
+            blob = pickle.dumps(fig)
+            self.pending.append(self.pool.submit(_render_pickled, blob, base, formats, self.dpi, bbox, self.indexed))
+        plt.close(fig)
+
+    def _report(self, paths):
+        for path in paths:
+            print(f"✅ Chart saved: {path}")
+
+    def close(self):
+        for future in self.pending:
+            self._report(future.result())
+        self.pending = []
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def save_chart(fig, output_file):
+    """Export ``fig``, through the exporter of ``chart_export.py`` if one is running."""
+    if _active is not None:
+        _active.save(fig, output_file)
+    else:
+        with ChartExporter() as exporter:
+            exporter.save(fig, output_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run plotting scripts and export their charts through a process pool.")
+    parser.add_argument("scripts", nargs="+", help="Plotting scripts, run in order from the current directory")
+    parser.add_argument("--jobs", type=int, default=None, help="Rendering processes (default: CPU count)")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, help="Output formats (default: the script's file extension)")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--indexed", action="store_true", help="Write 64-color palette PNGs (lossy, about 60%% smaller)")
+    args = parser.parse_args()
+
+    import matplotlib
+    matplotlib.use("Agg")
+
+    # The scripts import chart_export, not this __main__ module
+    import chart_export
+    with chart_export.ChartExporter(args.jobs, args.formats, args.dpi, args.indexed) as exporter:
+        chart_export._active = exporter
+        for script in args.scripts:
+            runpy.run_path(script, run_name="__main__")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,216 @@
+"""Reconcile the qnames the DNS servers received against the domain list.
+
+Streams any number of ``udp_dns_qname_prober`` result files (one per run;
+``.json`` or ``.npra``). Each test ID is mapped through the campaign
+(``generator.CampaignIndex``) to its worker pair and to the domain it
+queried. Coverage is kept as bitmaps over the domain table
+(``inputs/domains.yml``, see domain_inputs.py): per worker pair, the
+domains tested and the domains the server (Worker_2) received; per run, the
+same over all pairs. Memory grows with pairs × domains / 8 bytes, not with
+the size of the result files.
+
+    python checkvpsrecieved.py
+    python checkvpsrecieved.py run_*_udp_dns_results.json --details
+    python checkvpsrecieved.py run_all_workers_dns_results.json --json dns_coverage.json
+
+Per pair, a domain is *missing* when it was tested but its query never
+reached the server in any run, and *unexpected* when the server received a
+query for a domain the pair did not test (or one not in the table at all).
+Tests without a result (submission or polling failures) count as not run.
+"""
+import argparse
 import json
-import yaml
+from collections import Counter, defaultdict
+
+from domain_inputs import DomainTable, normalize_hostname
+from generator import CampaignIndex
+from payload_cache import entry_domain
+from result_stream import iter_results
+
+TEST_NAME = "udp_dns_qname_prober"
 
-file_paths = [
+DEFAULT_FILES = [
     "run_1_udp_dns_results.json",
     "run_2_udp_dns_results.json",
     "run_3_udp_dns_results.json",
     "run_4_udp_dns_results.json"
 ]
-def load_json_file(path):
-    with open(path, "r") as f:
-        return json.load(f)
-# Load the domain list from hostnames.yml
-with open("inputs/hostnames.yml", "r") as f:
-    expected_domains = set(d.strip().lower() for d in yaml.safe_load(f))
-
-# Collect all domains seen in VPS3 queries
-vps_domains = set()
-
-for path in file_paths:
-    data = load_json_file(path)
-    for test_data in data.values():
+
+
+class Bitmap:
+    """Fixed-size set of domain positions."""
+
+    __slots__ = ("bits",)
+
+    def __init__(self, size):
+        self.bits = bytearray((size + 7) // 8)
+
+    def add(self, position):
+        self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __int__(self):
+        return int.from_bytes(self.bits, "little")
+
+
+def positions(mask):
+    """Positions of the set bits of an int, in increasing order."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def received_qname(entry):
+    """The qname the server (Worker_2) received, or None."""
+    try:
+        received = entry["result"]["Worker_2"]["Variables"]["dict"]
+    except (KeyError, TypeError):
+        return None
+    if not isinstance(received, dict):
+        return None
+    # Question line as printed by dig: ";example.com.   IN   A"
+    query = received.get("query")
+    if isinstance(query, dict) and isinstance(query.get("received"), str):
+        fields = query["received"].lstrip(";").split()
+        return normalize_hostname(fields[0]) if fields else None
+    # Older results: {"received": {"questions": [{"qname": ...}]}}
+    questions = received.get("received", {}).get("questions") if isinstance(received.get("received"), dict) else None
+    if questions:
+        return normalize_hostname(questions[0].get("qname", "")) or None
+    return None
+
+
+class Coverage:
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+        self.size = len(table)
+        self.position = {row["hostname"]: p for p, row in enumerate(table)}
+        self.test = next(t for t, test in enumerate(index.test_cases) if test["name"] == TEST_NAME)
+        self.targets = {}
+        self.tested = defaultdict(lambda: Bitmap(self.size))
+        self.received = defaultdict(lambda: Bitmap(self.size))
+        # Queries for names missing from the table, per pair
+        self.unknown = defaultdict(Counter)
+        self.not_run = Counter()
+        # (pair or run) -> number of results
+        self.results = Counter()
+
+    def target(self, offset):
+        # Table position of the domain tested at an offset of the DNS tree (same for every pair)
+        if offset not in self.targets:
+            params = self.index.space(self.test)[offset]
+            self.targets[offset] = self.position.get(normalize_hostname(entry_domain({"parameters": params}) or ""))
+        return self.targets[offset]
+
+    def add(self, run, test_id, entry):
+        if entry.get("test_name", TEST_NAME) != TEST_NAME or not str(test_id).isdigit():
+            return
         try:
-            w2_received = test_data["result"]["Worker_2"]["Variables"]["dict"].get("received", {})
-            if isinstance(w2_received, dict) and "questions" in w2_received:
-                qname = w2_received["questions"][0].get("qname", "").strip().lower().rstrip(".")
-                if qname:
-                    vps_domains.add(qname)
-        except Exception:
-            continue
-
-# Compare domains
-missing_in_vps = expected_domains - vps_domains
-unexpected_in_vps = vps_domains - expected_domains
-
-missing_in_vps, unexpected_in_vps, len(missing_in_vps)
-
-# --- Compare ---
-missing_in_vps = expected_domains - vps_domains
-unexpected_in_vps = vps_domains - expected_domains
-
-# --- Report ---
-print(f"\nExpected domains in hostnames.yml: {len(expected_domains)}")
-print(f"Domains seen in VPS test runs: {len(vps_domains)}")
-print(f"Missing from VPS: {len(missing_in_vps)}")
-print(f"Unexpected in VPS: {len(unexpected_in_vps)}")
-
-if missing_in_vps:
-    print("\nDomains missing from VPS queries:")
-    for d in sorted(missing_in_vps):
-        print(f" - {d}")
+            p, t, offset = self.index.locate(int(test_id))
+        except KeyError:
+            return
+        if t != self.test:
+            return
+        i, j, _ = self.index.pairs[p]
+        pair = (self.index.workers[i]["name"], self.index.workers[j]["name"])
+        self.results[pair] += 1
+        self.results[run] += 1
+        if entry.get("status") != "completed" or not entry.get("result"):
+            self.not_run[pair] += 1
+            self.not_run[run] += 1
+            return
+
+        expected = self.target(offset)
+        if expected is not None:
+            self.tested[pair].add(expected)
+            self.tested[run].add(expected)
+        qname = received_qname(entry)
+        if qname is None:
+            return
+        position = self.position.get(qname)
+        if position is None:
+            self.unknown[pair][qname] += 1
+            self.unknown[run][qname] += 1
+        else:
+            self.received[pair].add(position)
+            self.received[run].add(position)
+
+    def summary(self, key):
+        tested, received = int(self.tested[key]), int(self.received[key])
+        return {
+            "results": self.results[key],
+            "not_run": self.not_run[key],
+            "tested": tested.bit_count(),
+            "received": received.bit_count(),
+            "missing": [self.table.rows[p]["hostname"] for p in positions(tested & ~received)],
+            "unexpected": [self.table.rows[p]["hostname"] for p in positions(received & ~tested)] + sorted(self.unknown[key]),
+        }
+
+
+def reconcile(paths, table=None, index=None):
+    coverage = Coverage(table or DomainTable.load(), index or CampaignIndex.load())
+    for path in paths:
+        for test_id, entry in iter_results(path):
+            coverage.add(path, test_id, entry)
+    return coverage
+
+
+def print_line(name, summary, details):
+    print(f"{name:<40} {summary['received']:>6}/{summary['tested']:<6} received"
+          f"  missing {len(summary['missing']):>5}  unexpected {len(summary['unexpected']):>4}  not run {summary['not_run']:>4}")
+    if details:
+        for domain in summary["missing"]:
+            print(f"     - {domain}")
+        for domain in summary["unexpected"]:
+            print(f"     + {domain}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check which qnames the DNS servers received, per worker pair and per run.")
+    parser.add_argument("files", nargs="*", default=DEFAULT_FILES, help="udp_dns_qname_prober result files, one per run")
+    parser.add_argument("--details", action="store_true", help="List the missing (-) and unexpected (+) domains of every pair")
+    parser.add_argument("--json", help="Also write the full report to this file")
+    args = parser.parse_args()
+
+    coverage = reconcile(args.files)
+    pairs = sorted(key for key in coverage.results if isinstance(key, tuple))
+
+    # Over all runs and pairs, against the whole table
+    everything = 0
+    for pair in pairs:
+        everything |= int(coverage.received[pair])
+    unknown = set().union(*(coverage.unknown[pair] for pair in pairs)) if pairs else set()
+    missing = [coverage.table.rows[p]["hostname"] for p in positions(~everything & ((1 << len(coverage.table)) - 1))]
+    print(f"\nExpected domains in inputs/domains.yml: {len(coverage.table)}")
+    print(f"Domains seen in VPS test runs: {everything.bit_count() + len(unknown)}")
+    print(f"Missing from VPS: {len(missing)}")
+    print(f"Unexpected in VPS: {len(unknown)}")
+
+    print("\nPer run:")
+    for path in args.files:
+        print_line(path, coverage.summary(path), False)
+    print("\nPer worker pair:")
+    for pair in pairs:
+        print_line(f"{pair[0]} ↔ {pair[1]}", coverage.summary(pair), args.details)
+
+    if missing:
+        print("\nDomains missing from VPS queries:")
+        for d in missing:
+            print(f" - {d}")
+
+    if args.json:
+        report = {
+            "domains": len(coverage.table),
+            "missing": missing,
+            "unexpected": sorted(unknown),
+            "runs": {path: coverage.summary(path) for path in args.files},
+            "pairs": {f"{pair[0]}|{pair[1]}": coverage.summary(pair) for pair in pairs},
+        }
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📄 Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Persistent classification cache shared by the analysis scripts.
+
+Labels are cached per classifier at two levels:
+
+* per results file, keyed by its size and modification time, so re-plotting
+  or re-synthesizing unchanged data neither classifies nor hashes anything;
+* per entry, keyed by a canonical hash of the fields classifiers read
+  (``status`` and ``result``), so a new or updated file only classifies the
+  entries whose results have not been seen before, in any file.
+
+Cached labels are tied to a hash of the classifier's source module and its
+inputs: editing ``classifiers.py``, ``error_patterns.py`` or
+``error_taxonomy.yml`` invalidates them. The cache lives in
+``.classification_cache.json`` and is written atomically on ``save``, which
+also drops the labels of files that were removed or have changed since, and
+keeps at most ``MAX_ENTRIES`` entry labels per classifier, the most recently
+used.
+
+    with ClassificationCache() as cache:
+        labels = cache.classify_file('run_all_workers_dns_results.json', classify_dns_entry)
+"""
+import hashlib
+import inspect
+import json
+import os
+
+CACHE_FILE = ".classification_cache.json"
+FORMAT_VERSION = 1
+# Entry labels kept per classifier (least recently used dropped first)
+MAX_ENTRIES = 200_000
+
+_module_hashes = {}
+
+
+def classifier_key(classifier):
+    """Name of the classifier plus a hash of its module's source and of the
+    files listed in the module's ``CLASSIFIER_INPUTS``."""
+    module = inspect.getmodule(classifier)
+    if module not in _module_hashes:
+        digest = hashlib.blake2b(digest_size=8)
+        for path in [inspect.getsourcefile(module), *getattr(module, "CLASSIFIER_INPUTS", [])]:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        _module_hashes[module] = digest.hexdigest()
+    return f"{classifier.__module__}.{classifier.__qualname__}@{_module_hashes[module]}"
+
+
+def entry_hash(entry):
+    relevant = {"status": entry.get("status"), "result": entry.get("result")}
+    return hashlib.blake2b(json.dumps(relevant, sort_keys=True, separators=(",", ":")).encode(), digest_size=16).hexdigest()
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class ClassificationCache:
+    def __init__(self, path=CACHE_FILE, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.files = {}
+        self.entries = {}
+        self.changed = False
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            if data.get("version") == FORMAT_VERSION:
+                self.files, self.entries = data["files"], data["entries"]
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.save()
+
+    def save(self):
+        if not self.changed:
+            return
+        self.prune()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": FORMAT_VERSION, "files": self.files, "entries": self.entries}, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        self.changed = False
+
+    def prune(self):
+        """Drop the labels of files that are gone or changed, and the least
+        recently used entry labels beyond ``max_entries`` per classifier."""
+        for files in self.files.values():
+            for path in list(files):
+                try:
+                    current = _signature(path)
+                except OSError:
+                    current = None
+                if current != files[path]["stat"]:
+                    del files[path]
+        for known in self.entries.values():
+            # Insertion order is use order: classify_results moves hits to the end
+            for digest in list(known)[:max(len(known) - self.max_entries, 0)]:
+                del known[digest]
+
+    def _key(self, classifier):
+        key = classifier_key(classifier)
+        # Drop labels from earlier versions of the same classifier
+        name = key.split("@")[0]
+        for table in (self.files, self.entries):
+            for stale in [k for k in table if k.split("@")[0] == name and k != key]:
+                del table[stale]
+                self.changed = True
+        return key
+
+    def classify_results(self, results, classifier):
+        """Map each test ID of a ``{test_id: entry}`` dict to its label."""
+        key = self._key(classifier)
+        known = self.entries.setdefault(key, {})
+        labels = {}
+        for test_id, entry in results.items():
+            digest = entry_hash(entry)
+            label = known.pop(digest, None)
+            if label is None:
+                label = classifier(entry)
+            known[digest] = label
+            labels[test_id] = label
+        # New labels, and hits moved to the end of the use order: both must be
+        # saved, or the next prune would evict labels that were just used
+        if labels:
+            self.changed = True
+        return labels
+
+    def classify_file(self, path, classifier, results=None):
+        """Labels of a results file; ``results`` is its content if already loaded."""
+        key = self._key(classifier)
+        signature = _signature(path)
+        cached = self.files.get(key, {}).get(os.path.abspath(path))
+        if cached and cached["stat"] == signature:
+            return cached["labels"]
+
+        if results is None:
+            with open(path, "r") as f:
+                results = json.load(f)
+        labels = self.classify_results(results, classifier)
+        self.files.setdefault(key, {})[os.path.abspath(path)] = {"stat": signature, "labels": labels}
+        self.changed = True
+        return labels
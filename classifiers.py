@@ -0,0 +1,234 @@
+"""Result classifiers shared by the conformance and plotting scripts.
+
+The ``*_run_entry`` variants are the ones used by the per-run scripts
+(``run_<n>_*_results.json``); the others are the all-workers variants,
+which also report submission/polling failures and missing workers.
+
+Error strings and DNS answers are matched against ``error_taxonomy.yml``
+through the compiled matchers of ``error_patterns.py``.
+"""
+import error_patterns
+from error_patterns import TAXONOMY_FILE, load_taxonomy
+
+ERROR_MATCHERS = load_taxonomy()
+
+# Files besides this module that classification depends on: the taxonomy
+# and the matcher that compiles it (precedence, regex construction)
+CLASSIFIER_INPUTS = [TAXONOMY_FILE, error_patterns.__file__]
+
+
+# Labels of results the runner could not get, by status
+UNFINISHED_LABELS = {'submission_failed': 'SubmissionFailed', 'polling_failed': 'PollingFailed'}
+
+
+def unfinished_label(entry):
+    """Label of an entry with nothing to classify (runner failure, or no result
+    because a worker went offline); None for an entry with a result."""
+    status = entry.get('status')
+    if status in UNFINISHED_LABELS:
+        return UNFINISHED_LABELS[status]
+    if entry.get('result') is None:
+        return 'WorkerMissing'
+    return None
+
+
+# --- http_simple_request ---
+def classify_http_simple_entry(entry):
+    if entry.get('status') == 'submission_failed':
+        return 'SubmissionFailed'
+    if entry.get('status') == 'polling_failed':
+        return 'PollingFailed'
+
+    result = entry.get('result') or {}
+    if result.get('Worker_1') is None or result.get('Worker_2') is None:
+        return 'WorkerMissing'
+
+    return _classify_http_simple_result(result)
+
+
+def classify_http_simple_run_entry(entry):
+    if entry.get('result') is None:
+        return unfinished_label(entry)
+    result = entry.get('result', {})
+    if result.get('Worker_2') is None:
+        return 'Failure'
+
+    return _classify_http_simple_result(result)
+
+
+def _classify_http_simple_result(result):
+    vars1 = result.get('Worker_1', {}).get('Variables', {})
+    vars2 = result.get('Worker_2', {}).get('Variables', {})
+
+    dict_result1 = vars1.get('dict', {}).get('result', {})
+    sync_result1 = vars1.get('sync_dict', {}).get('result', {})
+
+    dict_result2 = vars2.get('dict', {}).get('result', {})
+    sync_result2 = vars2.get('sync_dict', {}).get('result', {})
+
+    if dict_result1 == sync_result1 and dict_result2 == sync_result2:
+        return 'Match'
+
+    status1 = dict_result1.get('results', {}).get('HTTP', {}).get('status')
+    status2 = dict_result2.get('results', {}).get('HTTP', {}).get('status')
+
+    if status1 == status2 and status1 is not None:
+        return 'Match'
+
+    if status1 == 503 or status2 == 503:
+        return '503'
+    if status1 == 403 or status2 == 403:
+        return '403'
+
+    errors1 = dict_result1.get('errors', [])
+    errors2 = dict_result2.get('errors', [])
+    combined_errors = errors1 + errors2
+
+    return ERROR_MATCHERS['http_errors'].first_match(combined_errors) or 'Other'
+
+
+# --- http_1_conformance ---
+def classify_http_conformance_entry(entry):
+    if entry.get('status') == 'submission_failed':
+        return 'SubmissionFailed'
+    if entry.get('status') == 'polling_failed':
+        return 'PollingFailed'
+
+    result = entry.get('result') or {}
+    if result.get('Worker_1') is None or result.get('Worker_2') is None:
+        return 'WorkerMissing'
+
+    return _classify_http_conformance_result(result)
+
+
+def classify_http_conformance_run_entry(entry):
+    if entry.get('result') is None:
+        return unfinished_label(entry)
+    result = entry.get('result', {})
+    # Worker_2 null → Failure (gray)
+    if result.get('Worker_2') is None:
+        return 'Failure'
+
+    return _classify_http_conformance_result(result)
+
+
+def _classify_http_conformance_result(result):
+    vars1 = result.get('Worker_1', {}).get('Variables', {})
+    vars2 = result.get('Worker_2', {}).get('Variables', {})
+
+    sync1 = vars1.get('sync_received')
+    recv1 = vars1.get('received') or ""
+    sync2 = vars2.get('sync_received')
+    recv2 = vars2.get('received') or ""
+
+    # If worker_1 received is Empty string → Empty (yellow)
+    if recv1 == "":
+        return 'Empty'
+
+    # 503 in worker_1 received → 503 (red)
+    if '503' in recv1:
+        return '503'
+
+    # Match condition: sync1 == recv2 and sync2 == recv1
+    if sync1 == recv2 and sync2 == recv1:
+        return 'Match'
+
+    return 'Failure'
+
+
+# --- https_sni ---
+def classify_https_sni_entry(entry):
+    if entry.get('result') is None:
+        return unfinished_label(entry)
+    return _classify_https_sni_result(entry['result'], empty_label='Empty')
+
+
+def classify_https_sni_run_entry(entry):
+    if entry.get('result') is None:
+        return unfinished_label(entry)
+    return _classify_https_sni_result(entry['result'], empty_label='Null')
+
+
+def _classify_https_sni_result(result, empty_label):
+    if result.get('Worker_2') is None:
+        return 'Failure'
+
+    vars1 = result.get('Worker_1', {}).get('Variables', {})
+    vars2 = result.get('Worker_2', {}).get('Variables', {})
+
+    sync1 = vars1.get('sync_dict')
+    recv1 = vars1.get('received')
+    sync2 = vars2.get('sync_dict')
+    recv2 = vars2.get('received')
+
+    if recv1 is None:
+        return empty_label
+
+    if sync1 == recv2 and sync2 == recv1:
+        return 'Match'
+
+    return 'Failure'
+
+
+# --- udp_dns_qname_prober ---
+def classify_dns_entry(entry):
+    if entry.get('status') == 'submission_failed':
+        return 'SubmissionFailed'
+    if entry.get('status') == 'polling_failed':
+        return 'PollingFailed'
+
+    return classify_dns_run_entry(entry)
+
+
+def classify_dns_run_entry(entry):
+    if entry.get('result') is None:
+        return unfinished_label(entry)
+    result = entry.get('result', {})
+    w1 = result.get('Worker_1')
+    if not w1:
+        return 'Failure'
+
+    vars1 = w1.get('Variables', {})
+
+    dict1 = vars1.get('dict', {})
+    response = dict1.get('response', {})
+
+    # Check if 'received' is explicitly null (=> it's a dict with key 'received' set to None)
+    if isinstance(response, dict):
+        inner_received = response.get('received')
+        if inner_received is None:
+            return 'No Response'
+
+        # Check for sinkhole in response
+        if isinstance(inner_received, dict):
+            response = inner_received.get('response', '')
+            label = ERROR_MATCHERS['dns_response'].match(response)
+            if label:
+                return label
+
+    return 'Failure'
+
+
+# All-workers classifier per test tree name
+CLASSIFIERS = {
+    "http_simple_request": classify_http_simple_entry,
+    "http_1_conformance": classify_http_conformance_entry,
+    "https_sni": classify_https_sni_entry,
+    "udp_dns_qname_prober": classify_dns_entry,
+}
+
+# Per-run classifier per test tree name
+RUN_CLASSIFIERS = {
+    "http_simple_request": classify_http_simple_run_entry,
+    "http_1_conformance": classify_http_conformance_run_entry,
+    "https_sni": classify_https_sni_run_entry,
+    "udp_dns_qname_prober": classify_dns_run_entry,
+}
+
+# Outcome considered "passing" for each test tree
+MATCH_LABELS = {
+    "http_simple_request": "Match",
+    "http_1_conformance": "Match",
+    "https_sni": "Match",
+    "udp_dns_qname_prober": "Received",
+}
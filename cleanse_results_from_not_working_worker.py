@@ -1,39 +1,32 @@
+"""Drop results involving workers that no longer have a profile.
+
+A shortcut for ``result_transform.py --keep-profile-workers``: the worker
+names come from the ``profiles/*.yml`` and ``*.yaml`` files the generator
+reads, and each file is filtered in one streaming pass and replaced
+atomically.
+
+    python cleanse_results_from_not_working_worker.py
+    python cleanse_results_from_not_working_worker.py run_all_workers_*.json --jobs 4
+"""
+import argparse
 import os
-import json
-import yaml  # Assumes profile files are YAML
-
-# Paths
-profiles_dir = "profiles"
-results_file = "run_all_workers_conformance_results.json"
-output_file = "run_all_workers_conformance_results.json"  # Or overwrite: use results_file
-
-# Collect all valid worker names from profile files
-valid_names = set()
-
-for filename in os.listdir(profiles_dir):
-    if filename.endswith(".yml") or filename.endswith(".yaml") or filename.endswith(".txt") or filename.endswith(".json"):
-        path = os.path.join(profiles_dir, filename)
-        with open(path, "r") as f:
-            try:
-                profile_data = yaml.safe_load(f)
-                name = profile_data.get("name")
-                if name:
-                    valid_names.add(name)
-            except Exception as e:
-                print(f"Error parsing {filename}: {e}")
-
-# Load test results
-with open(results_file, "r") as f:
-    test_results = json.load(f)
-
-# Filter entries
-filtered_results = {
-    test_id: data for test_id, data in test_results.items()
-    if data.get("worker_1") in valid_names and data.get("worker_2") in valid_names
-}
-
-# Save filtered results
-with open(output_file, "w") as f:
-    json.dump(filtered_results, f, indent=2)
-
-print(f"Filtered {len(test_results) - len(filtered_results)} entries. Saved to {output_file}")
+
+from result_transform import KeepWorkers, Transform, apply_all, profile_worker_names
+
+DEFAULT_FILES = ["run_all_workers_conformance_results.json"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drop results involving workers without a profile.")
+    parser.add_argument("files", nargs="*", default=DEFAULT_FILES, help="JSON result files, filtered in place")
+    parser.add_argument("--profiles", default="profiles", help="Profiles folder (default: profiles)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Files processed in parallel (default: CPU count)")
+    args = parser.parse_args()
+
+    transform = Transform([KeepWorkers(profile_worker_names(args.profiles))])
+    for path, stats in apply_all(transform, args.files, jobs=args.jobs):
+        print(f"Filtered {stats['read'] - stats['written']} entries. Saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
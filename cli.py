@@ -0,0 +1,118 @@
+"""Single entry point for the campaign tools.
+
+    python cli.py                          # list the commands
+    python cli.py generate --jobs 4
+    python cli.py run --batch-size 50
+    python cli.py matrix blocked dns.npz --through RB2
+    python cli.py plot-dns-pairs
+
+Commands marked with ``*`` run a script that has no options of its own: it
+runs as soon as it starts, prompts, or reads and overwrites fixed files.
+For those, ``cli.py <command> --help`` prints what the script reads and
+writes and does not start it.
+
+Only the tool of the chosen command is loaded, and the tools import
+matplotlib, requests and tqdm where they use them, so a quick lookup does
+not pay for the plotting or HTTP stack. Charts are drawn with the non-GUI
+Agg backend. Every tool can still be run on its own (``python generator.py``).
+"""
+import os
+import runpy
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# command -> (script, description)
+COMMANDS = {
+    "inputs": ("domain_inputs.py", "Validate hostname/IP inputs and compile the domain table"),
+    "generate": ("generator.py", "Generate campaign.yml from profiles and test trees"),
+    "find-test": ("find_test_id.py", "Look up test IDs by test, workers and domain"),
+    "remap": ("campaign_mapping.py", "Remap result IDs from old_campaign.yml to campaign.yml"),
+    "run": ("apicampaign.py", "Run the campaign against the NoPASARAN master"),
+    "rerun-test": ("apicampaign_patch.py", "Re-submit a single test ID and re-plot its tree"),
+    "adaptive-rerun": ("adaptive_rerun.py", "Select inconclusive tests for another run"),
+    "standin": ("master_standin.py", "Serve a local stand-in for the master API"),
+    "live": ("live_dashboard.py", "Live charts and counters while a campaign runs"),
+    "filter": ("interactive_json_filter.py", "Filter a results file interactively"),
+    "order": ("result_ordering.py", "Sort result files by test ID"),
+    "transform": ("result_transform.py", "Filter, remap and sort result files in one pass"),
+    "cleanse": ("cleanse_results_from_not_working_worker.py", "Drop results of workers that are gone"),
+    "check-dns": ("checkvpsrecieved.py", "Check which qnames the DNS runs received"),
+    "archive": ("result_archive.py", "Pack and unpack indexed result archives"),
+    "store": ("result_store.py", "Deduplicated result store"),
+    "matrix": ("result_matrix.py", "Worker pair x domain x run classification matrix"),
+    "charts": ("chart_export.py", "Run plotting scripts through a pooled chart exporter"),
+    "plot-synthesis": ("synthesis_vector.py", "Synthesis chart"),
+    "plot-dns-runs": ("udp_dns_conformance_port_53.py", "DNS classification per run"),
+    "plot-http-runs": ("http_conformance_port_80.py", "HTTP/1 conformance per run"),
+    "plot-https-runs": ("https_conformance_port_443.py", "HTTPS SNI classification per run"),
+    "plot-http-simple-runs": ("http_simple_conformance.py", "HTTP/HTTPS simple requests per run"),
+    "plot-dns-pairs": ("dns_all_workers.py", "DNS classification per worker pair"),
+    "plot-http-pairs": ("http_conformance_all_workers.py", "HTTP/1 conformance per worker pair"),
+    "plot-https-pairs": ("https_conformance_all_workers.py", "HTTPS SNI classification per worker pair"),
+    "plot-http-simple-pairs": ("http_simple_all_workers_conformance.py", "HTTP/HTTPS simple requests per worker pair"),
+    "join": ("result_join.py", "Add campaign fields to result entries"),
+    "enrich": ("analysis/enriched_filtering.py", "Attach protocol and hostname to filtered results"),
+    "http-https": ("analysis/analysis_http_https.py", "HTTP vs HTTPS discrepancy chart"),
+    "bench": ("benchmark.py", "Benchmark the pipeline stages"),
+}
+
+# Scripts without an argument parser: what they do when run, shown by --help instead of running them
+NO_PARSER = {
+    "find-test": "Prompts for a campaign file (default: decode from profiles/ and tests-trees/), a test, two workers and a domain, then prints the test ID.",
+    "remap": "Reads old_campaign.yml and campaign.yml and rewrites the IDs of every run*.json file in the current directory in place.",
+    "rerun-test": "Prompts for a test ID, submits it to the NoPASARAN master, updates its run_all_workers_*.json file and re-plots the test tree.",
+    "filter": "Reads results.json, prompts for filters and writes the matching entries to a new JSON file.",
+    "plot-synthesis": "Reads synthesis.json and writes synthesis_vector.png.",
+    "plot-dns-runs": "Reads run_{1..4}_udp_dns_results.json, updates synthesis.json and writes udp_dns_conformance_vector.png.",
+    "plot-http-runs": "Reads run_{1..4}_http_results.json, updates synthesis.json and writes http_1_conformance_vector.png.",
+    "plot-https-runs": "Reads run_{1..4}_https_results.json, updates synthesis.json and writes https_1_conformance_vector.png.",
+    "plot-http-simple-runs": "Reads run_{1..4}_http_simple_results.json, updates synthesis.json and writes http_split_vector.png and https_split_vector.png.",
+    "plot-dns-pairs": "Reads run_all_workers_dns_results.json and writes dns_classification_by_pair.png.",
+    "plot-http-pairs": "Reads run_all_workers_conformance_results.json and writes http_classification_by_pair.png.",
+    "plot-https-pairs": "Reads run_all_workers_https_results.json and writes https_classification_by_pair.png.",
+    "plot-http-simple-pairs": "Reads run_all_workers_simple_results.json and writes http_vector_by_pair.png and https_vector_by_pair.png.",
+    "http-https": "Usage: cli.py http-https [RESULTS_FILE]. Reads RESULTS_FILE (default: enriched_filtered.json) and writes "
+                  "http_https_discrepancies.json, http_https_discrepancy_details.json and http_https_discrepancy_vector.png.",
+}
+
+
+def usage():
+    width = max(len(command) for command in COMMANDS) + 1
+    lines = ["usage: cli.py <command> [arguments]", "", "commands:"]
+    lines += [
+        f"  {command + ('*' if command in NO_PARSER else ''):<{width}}  {description}"
+        for command, (_, description) in COMMANDS.items()
+    ]
+    lines += [
+        "",
+        "Run 'cli.py <command> --help' for the arguments of a command.",
+        "* No options: the script runs (or prompts) as soon as it starts; --help only describes it.",
+    ]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0
+    command, args = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"cli.py: unknown command '{command}'\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    if command in NO_PARSER and any(arg in ("-h", "--help") for arg in args):
+        script, description = COMMANDS[command]
+        print(f"cli.py {command}: {description} ({script})\n\n{NO_PARSER[command]}")
+        return 0
+
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    script = os.path.join(ROOT, COMMANDS[command][0])
+    sys.argv = [script, *args]
+    runpy.run_path(script, run_name="__main__")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
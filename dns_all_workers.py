@@ -1,58 +1,16 @@
 import json
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
-from collections import defaultdict
+from classifiers import classify_dns_entry
+from plotting import format_worker_name, draw_status_row
+from chart_export import save_chart
+from result_matrix import ResultMatrix
 
-# 1) Load the DNS results file
-with open('run_all_workers_dns_results.json', 'r') as f:
-    data = json.load(f)
+# 1) Classify the DNS results into the pair × domain matrix (through the classification cache)
+matrix = ResultMatrix.build('udp_dns_qname_prober', ['run_all_workers_dns_results.json'], classifier=classify_dns_entry)
 
-# 2) Group by worker pair
-pairwise_data = defaultdict(list)
-for tid, entry in sorted(data.items(), key=lambda x: int(x[0])):  # sort by test ID
-    pair = (entry['worker_1'], entry['worker_2'])
-    pairwise_data[pair].append((int(tid), entry))
-
-# 3) DNS classification for each entry (bidirectional result)
-def classify_dns_entry(entry):
-    if entry.get('status') == 'submission_failed':
-        return 'SubmissionFailed'
-    if entry.get('status') == 'polling_failed':
-        return 'PollingFailed'
-    
-    result = entry.get('result', {})
-    w1 = result.get('Worker_1')
-    if not w1:
-        return 'Failure'
-
-    vars1 = w1.get('Variables', {})
-
-    dict1 = vars1.get('dict', {})
-    response = dict1.get('response', {})
-
-    # Check if 'received' is explicitly null (=> it's a dict with key 'received' set to None)
-    if isinstance(response, dict):
-        inner_received = response.get('received')
-        if inner_received is None:
-            return 'No Response'
-
-        # Check for sinkhole in response
-        if isinstance(inner_received, dict):
-            response = inner_received.get('response', '')
-            if 'sinkhole.paloaltonetworks.com.' in response:
-                return 'Sinkhole'
-            if '127.0.0.1' in response:
-                return 'Received'
-
-    return 'Failure'
-
-# 4) Apply classification per pair
-classified_by_pair = defaultdict(list)
-for pair, entries in pairwise_data.items():
-    sorted_entries = sorted(entries, key=lambda x: x[0])
-    for _, entry in sorted_entries:
-        status = classify_dns_entry(entry)
-        classified_by_pair[pair].append(status)
+# 2) One row of labels per worker pair, in domain order
+classified_by_pair = matrix.statuses_by_pair(0, observed_only=True)
 
 # 5) Plotting parameters
 patterns = {
@@ -63,6 +21,7 @@ patterns = {
     'SubmissionFailed':'',      # solid black
     'PollingFailed':   '///',
     'WorkerMissing':   'oo',
+    'Missing':         '',
 }
 colors = {
     'Received': 'green',
@@ -72,6 +31,7 @@ colors = {
     'SubmissionFailed':'black',
     'PollingFailed':   'black',
     'WorkerMissing':   'black',
+    'Missing':         'white',
 }
 
 # Optional: load name map if you want formatted names
@@ -81,22 +41,13 @@ try:
 except FileNotFoundError:
     name_map = {}
 
-subscript_digits = str.maketrans("0123456789", "₀₁₂₃₄₅₆₇₈₉")
-
-def format_worker_name(worker_id):
-    mapped = name_map.get(worker_id, worker_id)
-    if any(char.isdigit() for char in mapped):
-        base = ''.join([c for c in mapped if not c.isdigit()])
-        digits = ''.join([c for c in mapped if c.isdigit()])
-        return base + digits.translate(subscript_digits)
-    return mapped
 
 # 6) Create the plot
 fig, ax = plt.subplots(figsize=(15, 6))
 y_spacing = 0.65
 bar_height = 0.6
 
-all_pairs = sorted(classified_by_pair.keys(), key=lambda p: (format_worker_name(p[0]), format_worker_name(p[1])))
+all_pairs = sorted(classified_by_pair.keys(), key=lambda p: (format_worker_name(p[0], name_map), format_worker_name(p[1], name_map)))
 y_positions = [y_spacing * (len(all_pairs) - i) for i in range(len(all_pairs))]
 present_statuses = set()
 
@@ -105,27 +56,9 @@ for idx, pair in enumerate(all_pairs):
     statuses = classified_by_pair[pair]
     present_statuses.update(statuses)
 
-    for i, status in enumerate(statuses):
-        ax.barh(
-            y=y,
-            width=1,
-            left=i,
-            height=bar_height,
-            color=colors[status],
-            edgecolor='black',
-            hatch=patterns[status]
-        )
-
-    w1 = format_worker_name(pair[0])
-    w2 = format_worker_name(pair[1])
-    ax.text(
-        -5, y,
-        f'{w1} ↔ {w2}',
-        va='center',
-        ha='right',
-        fontweight='bold',
-        fontsize=13
-    )
+    w1 = format_worker_name(pair[0], name_map)
+    w2 = format_worker_name(pair[1], name_map)
+    draw_status_row(ax, y, statuses, colors, patterns, bar_height, f'{w1} ↔ {w2}')
 
 # 7) Add legend
 preferred_order = ['Received', 'Sinkhole', 'No Response']
@@ -161,5 +94,4 @@ for spine in ['top', 'right', 'left', 'bottom']:
 ax.tick_params(axis='y', which='both', left=False, labelleft=False)
 
 plt.tight_layout()
-plt.savefig('dns_classification_by_pair.png', dpi=300, bbox_inches='tight')
-print("✅ Chart saved: dns_classification_by_pair.png")
+save_chart(fig, 'dns_classification_by_pair.png')
@@ -0,0 +1,237 @@
+"""Compiled domain inputs: validated hostname/IP pairs with stable domain IDs.
+
+``inputs/hostnames.yml`` and ``inputs/ip.yml`` are plain lists that the test
+trees zip by position. This module checks them before they reach a
+campaign: every hostname must be a valid DNS name and every IP a valid
+address. Hostnames are normalized (lowercase, no trailing dot) and
+deduplicated. Both lists must have the same length. The result is a table
+of ``(id, hostname, ip)`` rows written to ``inputs/domains.yml``. IDs stay
+with their hostname when the lists are edited, and the IDs of removed
+hostnames are not reused.
+
+    python domain_inputs.py           # compile inputs/domains.yml
+    python domain_inputs.py --check   # only validate; exit 1 on errors
+
+``DomainTable.load()`` gives the lookup index (hostname, ID or IP to row)
+that the analysis tools share. It recompiles in memory when the lists
+changed since the table was written. IPs may legitimately repeat (shared
+hosting); repeats and non-public addresses are reported as warnings.
+"""
+import argparse
+import hashlib
+import ipaddress
+import os
+import re
+
+import yaml
+
+from generator import SafeLoader
+
+HOSTNAMES_FILE = "inputs/hostnames.yml"
+IPS_FILE = "inputs/ip.yml"
+TABLE_FILE = "inputs/domains.yml"
+
+LABEL = re.compile(r"^[a-z0-9_]([a-z0-9_-]{0,61}[a-z0-9_])?$")
+
+
+class InputError(ValueError):
+    """The input lists cannot be compiled; ``problems`` lists every reason."""
+
+    def __init__(self, problems):
+        self.problems = problems
+        super().__init__("\n".join(problems))
+
+
+def normalize_hostname(name):
+    """Lowercase ``name`` without surrounding spaces or a trailing dot."""
+    return str(name).strip().lower().rstrip(".")
+
+
+def validate_hostname(name):
+    """Return the normalized hostname; raise ValueError if it is not a DNS name."""
+    if not isinstance(name, str):
+        raise ValueError(f"not a string: {name!r}")
+    hostname = normalize_hostname(name)
+    if not hostname or len(hostname) > 253:
+        raise ValueError(f"invalid length: {name!r}")
+    for label in hostname.split("."):
+        if not LABEL.match(label):
+            raise ValueError(f"invalid label {label!r} in {name!r}")
+    return hostname
+
+
+def validate_ip(value):
+    """Return the canonical form of an IPv4/IPv6 address; raise ValueError otherwise."""
+    return str(ipaddress.ip_address(str(value).strip()))
+
+
+def _read_list(path):
+    with open(path, "r") as f:
+        content = yaml.load(f, Loader=SafeLoader)
+    if not isinstance(content, list):
+        raise InputError([f"{path}: does not contain a list"])
+    return content
+
+
+def _digest(*paths):
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class DomainTable:
+    """Rows ``{"id", "hostname", "ip"}`` in input order, indexed by hostname, ID and IP."""
+
+    def __init__(self, rows, next_id=None, source=None, warnings=()):
+        self.rows = rows
+        self.next_id = next_id if next_id is not None else max((row["id"] for row in rows), default=-1) + 1
+        self.source = source
+        self.warnings = list(warnings)
+        self.by_hostname = {row["hostname"]: row for row in rows}
+        self.by_id = {row["id"]: row for row in rows}
+        self.by_ip = {}
+        for row in rows:
+            if row.get("ip") is not None:
+                self.by_ip.setdefault(row["ip"], []).append(row)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __contains__(self, hostname):
+        return self.lookup(hostname) is not None
+
+    @property
+    def hostnames(self):
+        return [row["hostname"] for row in self.rows]
+
+    def lookup(self, hostname):
+        """Row of ``hostname`` (any case, trailing dot allowed), or None."""
+        return self.by_hostname.get(normalize_hostname(hostname))
+
+    def id(self, hostname):
+        """Domain ID of ``hostname``, or None if it is not an input."""
+        row = self.lookup(hostname)
+        return row["id"] if row else None
+
+    # --- Compilation ---
+    @classmethod
+    def compile(cls, hostnames_file=HOSTNAMES_FILE, ips_file=IPS_FILE, previous=None):
+        """Validate and pair the input lists.
+
+        ``previous`` (a ``DomainTable``) supplies the IDs of hostnames seen
+        before; new hostnames get IDs from its ``next_id`` on.
+        """
+        hostnames = _read_list(hostnames_file)
+        ips = _read_list(ips_file) if ips_file else None
+        problems, warnings = [], []
+
+        if ips is not None and len(ips) != len(hostnames):
+            problems.append(
+                f"{hostnames_file} has {len(hostnames)} entries but {ips_file} has {len(ips)}: "
+                "test trees zip them by position, and lists of different lengths would be "
+                "combined as a cartesian product"
+            )
+
+        rows, seen = [], {}
+        next_id = previous.next_id if previous else 0
+        for position, name in enumerate(hostnames, 1):
+            try:
+                hostname = validate_hostname(name)
+            except ValueError as e:
+                problems.append(f"{hostnames_file}:{position}: {e}")
+                continue
+            ip = None
+            if ips is not None and position <= len(ips):
+                try:
+                    ip = validate_ip(ips[position - 1])
+                except ValueError as e:
+                    problems.append(f"{ips_file}:{position}: {e}")
+                    continue
+
+            if hostname in seen:
+                other = seen[hostname]
+                if other["ip"] != ip:
+                    problems.append(f"{hostnames_file}:{position}: {hostname} repeated with IP {ip} (first with {other['ip']})")
+                else:
+                    warnings.append(f"{hostnames_file}:{position}: duplicate of {hostname}, dropped")
+                continue
+
+            known = previous.by_hostname.get(hostname) if previous else None
+            if known:
+                domain_id = known["id"]
+            else:
+                domain_id, next_id = next_id, next_id + 1
+            row = {"id": domain_id, "hostname": hostname, "ip": ip}
+            seen[hostname] = row
+            rows.append(row)
+
+        if problems:
+            raise InputError(problems)
+
+        table = cls(rows, next_id, _digest(*filter(None, (hostnames_file, ips_file))))
+        for ip, shared in sorted(table.by_ip.items()):
+            if len(shared) > 1:
+                warnings.append(f"{ip} is shared by {', '.join(row['hostname'] for row in shared)}")
+            if not ipaddress.ip_address(ip).is_global:
+                warnings.append(f"{ip} ({', '.join(row['hostname'] for row in shared)}) is not a public address")
+        table.warnings = warnings
+        return table
+
+    def save(self, path=TABLE_FILE):
+        content = {"source": self.source, "next_id": self.next_id, "domains": self.rows}
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(f"# Compiled by domain_inputs.py from {HOSTNAMES_FILE} and {IPS_FILE}; do not edit.\n")
+            yaml.safe_dump(content, f, sort_keys=False, default_flow_style=None, width=200)
+        os.replace(tmp, path)
+
+    @classmethod
+    def read(cls, path=TABLE_FILE):
+        with open(path, "r") as f:
+            content = yaml.load(f, Loader=SafeLoader)
+        return cls(content["domains"], content["next_id"], content.get("source"))
+
+    @classmethod
+    def load(cls, path=TABLE_FILE, hostnames_file=HOSTNAMES_FILE, ips_file=IPS_FILE):
+        """The compiled table, recompiled in memory if the input lists changed since."""
+        previous = cls.read(path) if os.path.exists(path) else None
+        if previous and previous.source == _digest(hostnames_file, ips_file):
+            return previous
+        return cls.compile(hostnames_file, ips_file, previous)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate the hostname/IP input lists and compile the domain table.")
+    parser.add_argument("--hostnames", default=HOSTNAMES_FILE)
+    parser.add_argument("--ips", default=IPS_FILE)
+    parser.add_argument("--output", default=TABLE_FILE)
+    parser.add_argument("--check", action="store_true", help="Only validate; do not write the table")
+    args = parser.parse_args()
+
+    previous = DomainTable.read(args.output) if os.path.exists(args.output) else None
+    try:
+        table = DomainTable.compile(args.hostnames, args.ips, previous)
+    except InputError as e:
+        print(f"❌ {len(e.problems)} problem(s) in the input lists:")
+        for problem in e.problems:
+            print(f"   {problem}")
+        raise SystemExit(1)
+
+    for warning in table.warnings:
+        print(f"⚠️  {warning}")
+    added = sum(1 for row in table if not previous or row["hostname"] not in previous.by_hostname)
+    removed = sum(1 for row in previous if row["hostname"] not in table.by_hostname) if previous else 0
+    if args.check:
+        print(f"✅ {len(table)} domains valid")
+        return
+    table.save(args.output)
+    print(f"✅ {len(table)} domains ({added} new, {removed} removed) written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
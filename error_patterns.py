@@ -0,0 +1,55 @@
+"""Compiled multi-pattern matcher for result error strings.
+
+Each group of ``error_taxonomy.yml`` is compiled into one regular expression
+that lists every pattern, in precedence order, inside a lookahead. Scanning a
+string reports, at each position where some pattern starts, the
+highest-precedence pattern starting there; the best of those is the category
+of the string. This is the same result as testing each pattern with ``in``
+in precedence order, but takes a single pass over the string however many
+patterns the group has.
+"""
+import os
+import re
+
+import yaml
+
+TAXONOMY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "error_taxonomy.yml")
+
+
+class PatternMatcher:
+    def __init__(self, categories):
+        self.labels = []
+        alternatives = []
+        for category in categories:
+            for pattern in category["patterns"]:
+                alternatives.append(f"(?P<p{len(self.labels)}>{re.escape(pattern)})")
+                self.labels.append(category["label"])
+        self.regex = re.compile(f"(?=(?:{'|'.join(alternatives)}))") if alternatives else None
+
+    def match(self, text):
+        """Category of the highest-precedence pattern found in ``text``, or ``None``."""
+        if self.regex is None or not text:
+            return None
+        best = None
+        for found in self.regex.finditer(text):
+            rank = int(found.lastgroup[1:])
+            if best is None or rank < best:
+                best = rank
+                if rank == 0:
+                    break
+        return None if best is None else self.labels[best]
+
+    def first_match(self, texts):
+        """Category of the first string in ``texts`` matching any pattern, or ``None``."""
+        for text in texts:
+            label = self.match(text)
+            if label is not None:
+                return label
+        return None
+
+
+def load_taxonomy(path=TAXONOMY_FILE):
+    """Return ``{group: PatternMatcher}`` for every group of the taxonomy file."""
+    with open(path, "r") as f:
+        taxonomy = yaml.safe_load(f)
+    return {group: PatternMatcher(categories) for group, categories in taxonomy.items()}
@@ -1,4 +1,6 @@
 import yaml
+from generator import CampaignIndex
+from payload_cache import entry_domain
 
 def load_campaign_file(path="campaign.yml"):
     with open(path, "r") as f:
@@ -53,12 +55,23 @@ def find_test_ids(campaign, test_name, w1, w2, domain):
             matched_ids.append(entry["id"])
     return matched_ids
 
-def main():
-    campaign_path = input("Enter path to campaign YAML file [default: campaign.yml]: ") or "campaign.yml"
-    campaign = load_campaign_file(campaign_path)
+def index_domains(index, test_name, w1, w2):
+    return sorted({entry_domain(index.entry(test_id)) for test_id in index.ids(test_name, w1, w2)} - {None})
+
+def index_test_ids(index, test_name, w1, w2, domain):
+    return [test_id for test_id in index.ids(test_name, w1, w2) if entry_domain(index.entry(test_id)) == domain]
 
-    tests = extract_unique_tests(campaign)
-    workers = extract_workers(campaign)
+def main():
+    # Without a campaign file, IDs are decoded from profiles/ and tests-trees/
+    campaign_path = input("Enter path to campaign YAML file [default: decode from profiles/ and tests-trees/]: ")
+    if campaign_path:
+        campaign = load_campaign_file(campaign_path)
+        tests = extract_unique_tests(campaign)
+        workers = extract_workers(campaign)
+    else:
+        index = CampaignIndex.load()
+        tests = index.test_names()
+        workers = index.worker_names()
 
     print("\nAvailable Tests:")
     for i, t in enumerate(tests):
@@ -74,7 +87,10 @@ def main():
     w1 = workers[w1_idx]
     w2 = workers[w2_idx]
 
-    domains = extract_domains(campaign, test_name_filter=test_name)
+    if campaign_path:
+        domains = extract_domains(campaign, test_name_filter=test_name)
+    else:
+        domains = index_domains(index, test_name, w1, w2)
     if not domains:
         print("\nNo domains found for the selected test.")
         return
@@ -85,7 +101,10 @@ def main():
     d_idx = int(input("Choose domain number: ")) - 1
     domain = domains[d_idx]
 
-    ids = find_test_ids(campaign, test_name, w1, w2, domain)
+    if campaign_path:
+        ids = find_test_ids(campaign, test_name, w1, w2, domain)
+    else:
+        ids = index_test_ids(index, test_name, w1, w2, domain)
     if ids:
         print("\nMatching Test ID(s):", ids)
     else:
@@ -1,5 +1,8 @@
+import argparse
+import hashlib
 import os
 import yaml
+from bisect import bisect_right
 from itertools import permutations, product
 import copy
 
@@ -8,11 +11,26 @@ class NoAliasDumper(yaml.SafeDumper):
         return True
 
 
-def read_worker_profiles(profiles_folder='./profiles'):
+# Applied to test trees without an ``eligibility`` section:
+# the server (Worker_2) must be internet accessible
+DEFAULT_ELIGIBILITY = {"worker_2": {"internet_accessible": True}}
+# Files of profiles/ that are worker profiles
+PROFILE_EXTENSIONS = (".yml", ".yaml")
+
+CAMPAIGN_FILE = "campaign.yml"
+# First line of a generated campaign: the digest of the inputs it was generated from
+DIGEST_PREFIX = "# inputs: "
+
+
+class CampaignMismatch(Exception):
+    pass
+
+
+def read_workers(profiles_folder='./profiles'):
     worker_data = []
     for filename in sorted(os.listdir(profiles_folder)):
         file_path = os.path.join(profiles_folder, filename)
-        if filename.endswith(".yml"):
+        if filename.endswith(PROFILE_EXTENSIONS):
             with open(file_path, 'r') as file:
                 try:
                     data = yaml.safe_load(file)
@@ -22,9 +40,12 @@ def read_worker_profiles(profiles_folder='./profiles'):
                     continue
 
     worker_data.sort(key=lambda x: x.get("name", ""))
+    return worker_data
+
 
+def read_worker_profiles(profiles_folder='./profiles'):
     worker_pairs = []
-    for pair in permutations(worker_data, 2):
+    for pair in permutations(read_workers(profiles_folder), 2):
         worker_pairs.append({
             "Worker_1": pair[0],
             "Worker_2": pair[1]
@@ -32,94 +53,151 @@ def read_worker_profiles(profiles_folder='./profiles'):
     return worker_pairs
 
 
+# libyaml's loader when PyYAML is built with it: same results, many times faster
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+_referenced_files = {}
+
+
+def load_referenced_file(file_path):
+    """Content of an ``@file:`` reference, parsed once while the file is unchanged.
+
+    Test trees reference the same input lists several times; the returned
+    object is shared, so callers must not modify it.
+    """
+    if not os.path.isfile(file_path):
+        raise FileNotFoundError(f"Referenced file not found: {file_path}")
+    stat = os.stat(file_path)
+    key = (file_path, stat.st_mtime_ns, stat.st_size)
+    if key not in _referenced_files:
+        with open(file_path, 'r') as f:
+            _referenced_files[key] = yaml.load(f, Loader=SafeLoader)
+    return _referenced_files[key]
+
+
 def resolve_file_references(data):
     if isinstance(data, dict):
         return {k: resolve_file_references(v) for k, v in data.items()}
     elif isinstance(data, list):
         return [resolve_file_references(i) for i in data]
     elif isinstance(data, str) and data.startswith("@file:"):
-        file_path = data.replace("@file:", "")
-        if os.path.isfile(file_path):
-            with open(file_path, 'r') as f:
-                content = yaml.safe_load(f)
-                return content
-        else:
-            raise FileNotFoundError(f"Referenced file not found: {file_path}")
+        return copy.deepcopy(load_referenced_file(data.replace("@file:", "")))
     else:
         return data
 
 
 
-def expand_parameters(params, test_name=None):
-    def collect_dynamic_parameters(obj, path_prefix=""):
-        static = {}
-        dynamic = {}
-
-        for key, value in obj.items():
-            full_key = f"{path_prefix}{key}" if path_prefix else key
-
-            if isinstance(value, dict):
-                nested_static, nested_dynamic = collect_dynamic_parameters(value, f"{full_key}.")
-                static[key] = nested_static
-                dynamic.update(nested_dynamic)
-            elif isinstance(value, str) and value.startswith("@file:"):
-                file_path = value.replace("@file:", "")
-                if os.path.isfile(file_path):
-                    with open(file_path, 'r') as f:
-                        content = yaml.safe_load(f)
-                        if isinstance(content, list):
-                            dynamic[full_key] = content
-                        else:
-                            raise ValueError(f"File {file_path} does not contain a list.")
-                else:
-                    raise FileNotFoundError(f"Referenced file not found: {file_path}")
-            else:
-                static[key] = value
+def collect_dynamic_parameters(obj, path_prefix=""):
+    static = {}
+    dynamic = {}
 
-        return static, dynamic
+    for key, value in obj.items():
+        full_key = f"{path_prefix}{key}" if path_prefix else key
 
+        if isinstance(value, dict):
+            nested_static, nested_dynamic = collect_dynamic_parameters(value, f"{full_key}.")
+            static[key] = nested_static
+            dynamic.update(nested_dynamic)
+        elif isinstance(value, str) and value.startswith("@file:"):
+            file_path = value.replace("@file:", "")
+            content = load_referenced_file(file_path)
+            if isinstance(content, list):
+                dynamic[full_key] = content
+            else:
+                raise ValueError(f"File {file_path} does not contain a list.")
+        else:
+            static[key] = value
+
+    return static, dynamic
+
+
+class ParameterSpace:
+    """The parameter sets of one test tree, computed on demand by index.
+
+    Dynamic lists are zipped and must have equal lengths. With
+    ``combine="product"`` (``combine: product`` in the test tree) their
+    cartesian product is taken instead (mixed-radix decoding, last key
+    varying fastest). For
+    ``http_simple_request`` every combination appears twice, with
+    ``use_https`` "0" then "1". Iterating yields the same sets, in the same
+    order, as ``expand_parameters``.
+    """
+
+    def __init__(self, static, dynamic, test_name=None, combine="zip"):
+        if combine not in ("zip", "product"):
+            raise ValueError(f"Unknown combine mode {combine!r} for {test_name}: use 'zip' or 'product'")
+        self.static = static
+        self.keys, self.values = zip(*sorted(dynamic.items())) if dynamic else ((), ())
+        lengths = {key: len(values) for key, values in zip(self.keys, self.values)}
+        if combine == "zip" and len(set(lengths.values())) > 1:
+            # Catch lists that drifted apart before they multiply the campaign
+            raise ValueError(
+                f"Parameter lists of {test_name} have different lengths ({lengths}) and cannot be zipped; "
+                "fix the input files (see domain_inputs.py --check) or set 'combine: product' in the test tree"
+            )
+        self.zipped = combine == "zip" or len(self.keys) <= 1
+        self.variants = ("0", "1") if test_name == "http_simple_request" else (None,)
+        if not self.keys:
+            self.combinations = 1
+        elif self.zipped:
+            self.combinations = len(self.values[0])
+        else:
+            self.combinations = 1
+            for values in self.values:
+                self.combinations *= len(values)
+
+    def __len__(self):
+        return self.combinations * len(self.variants)
+
+    def combination(self, index):
+        if self.zipped:
+            return {key: values[index] for key, values in zip(self.keys, self.values)}
+        combo = {}
+        for key, values in reversed(list(zip(self.keys, self.values))):
+            index, position = divmod(index, len(values))
+            combo[key] = values[position]
+        return combo
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        index, variant = divmod(index, len(self.variants))
+
+        # A fresh copy every time: callers may modify the set they get
+        param_set = copy.deepcopy(self.static)
+        if self.keys:
+            for full_key, value in self.combination(index).items():
+                keys_path = full_key.split(".")
+                target = param_set
+                for k in keys_path[:-1]:
+                    target = target.setdefault(k, {})
+                target[keys_path[-1]] = value
+
+            param_set = resolve_file_references(param_set)
+
+            domain = param_set.get("domain")
+            request_data = param_set.get("request-data", {})
+            if isinstance(request_data, dict) and domain:
+                request_data["host"] = domain
+                param_set["request-data"] = request_data
+
+        if self.variants[variant] is None:
+            return param_set
+        return dict(param_set, use_https=self.variants[variant])
+
+
+def parameter_space(params, test_name=None, combine="zip"):
     static, dynamic = collect_dynamic_parameters(params)
 
     static["controller_conf_filename"] = "controller_configuration.json"
 
-    if not dynamic:
-        if test_name == "http_simple_request":
-            return [dict(static, use_https="0"), dict(static, use_https="1")]
-        return [static]
+    return ParameterSpace(static, dynamic, test_name, combine)
 
-    keys, values = zip(*sorted(dynamic.items()))
 
-    if len(set(map(len, values))) == 1:
-        combinations_list = [dict(zip(keys, items)) for items in zip(*values)]
-    else:
-        combinations_list = [dict(zip(keys, combo)) for combo in product(*values)]
-
-    expanded = []
-    for combo in combinations_list:
-        param_set = copy.deepcopy(static)
-
-        for full_key, value in combo.items():
-            keys_path = full_key.split(".")
-            target = param_set
-            for k in keys_path[:-1]:
-                target = target.setdefault(k, {})
-            target[keys_path[-1]] = value
-
-        param_set = resolve_file_references(param_set)
-
-        domain = param_set.get("domain")
-        request_data = param_set.get("request-data", {})
-        if isinstance(request_data, dict) and domain:
-            request_data["host"] = domain
-            param_set["request-data"] = request_data
-
-        if test_name == "http_simple_request":
-            expanded.append(dict(param_set, use_https="0"))
-            expanded.append(dict(param_set, use_https="1"))
-        else:
-            expanded.append(param_set)
-
-    return expanded
+def expand_parameters(params, test_name=None, combine="zip"):
+    return list(parameter_space(params, test_name=test_name, combine=combine))
 
 
 
@@ -153,68 +231,301 @@ def load_all_test_trees(tests_folder='./tests-trees'):
 
 
 
-def main():
-    campaign_output_file = "campaign.yml"
-    worker_pairs = read_worker_profiles()
-    test_cases = load_all_test_trees()
+def referenced_files(data):
+    """Paths of the ``@file:`` references in a test tree (or any value)."""
+    if isinstance(data, dict):
+        return {path for value in data.values() for path in referenced_files(value)}
+    if isinstance(data, list):
+        return {path for value in data for path in referenced_files(value)}
+    if isinstance(data, str) and data.startswith("@file:"):
+        return {data.replace("@file:", "")}
+    return set()
+
+
+def inputs_digest(profiles_folder='./profiles', tests_folder='./tests-trees', test_cases=None):
+    """Digest of everything test IDs are decoded from: the worker profiles,
+    the test trees and the input files they reference."""
+    if test_cases is None:
+        test_cases = load_all_test_trees(tests_folder)
+    paths = [os.path.join(profiles_folder, f) for f in sorted(os.listdir(profiles_folder)) if f.endswith(PROFILE_EXTENSIONS)]
+    paths += [os.path.join(tests_folder, f) for f in sorted(os.listdir(tests_folder)) if f.endswith(('.yml', '.yaml'))]
+    paths += sorted({path for test in test_cases for path in referenced_files(test)})
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        digest.update(os.path.basename(path).encode() + b"\0")
+        try:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        except FileNotFoundError:
+            digest.update(b"\0missing")
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def campaign_digest(campaign_file=CAMPAIGN_FILE):
+    """The inputs digest recorded in a campaign file, or None if it has none."""
+    with open(campaign_file, "r") as f:
+        line = f.readline()
+    return line[len(DIGEST_PREFIX):].strip() if line.startswith(DIGEST_PREFIX) else None
+
+
+def worker_matches(worker, requirements):
+    return all(worker.get(field) == value for field, value in (requirements or {}).items())
+
+
+def eligibility_matrix(workers, test_cases):
+    """Precompute which workers may take each role in each test tree.
+
+    Returns, per test tree, the indices of workers allowed as Worker_1, the
+    indices allowed as Worker_2 and whether only one direction per pair is
+    kept (``unordered_pair``), from the tree's ``eligibility`` rules.
+    """
+    matrix = []
+    for test in test_cases:
+        rules = test.get("eligibility", DEFAULT_ELIGIBILITY)
+        matrix.append((
+            {i for i, w in enumerate(workers) if worker_matches(w, rules.get("worker_1"))},
+            {i for i, w in enumerate(workers) if worker_matches(w, rules.get("worker_2"))},
+            bool(rules.get("unordered_pair")),
+        ))
+    return matrix
+
+
+def eligible_pairs(workers, test_cases):
+    """Yield ``(i, j, tests)`` in campaign order: the worker indices of each
+    pair and the indices of the test trees it is eligible for."""
+    matrix = eligibility_matrix(workers, test_cases)
+    for i, j in permutations(range(len(workers)), 2):
+        tests = [
+            t for t, (first, second, unordered) in enumerate(matrix)
+            if i in first and j in second
+            and not (unordered and workers[i]["name"] > workers[j]["name"])
+        ]
+        if tests:
+            yield i, j, tests
+
+
+def make_entry(pair, test, shared_params, test_id):
+    test_name = test["name"].lower()
+    # Per-entry keys are set below; nested values are shared
+    # between entries (the dumper writes them out in full)
+    params = dict(shared_params)
+    # Inject target IP if not http_simple_request
+    if test_name != "http_simple_request":
+        params["ip"] = pair["Worker_2"]["ip"]
+
+    # Add identifier for https_sni
+    if test_name in ["https_sni"]:
+        params["identifier"] = params.get("ip", pair["Worker_2"]["ip"])
+
+    return {
+        "id": test_id,
+        "name": test["name"],
+        "Worker_1": {**pair["Worker_1"], "role": test["worker_1_role"]},
+        "Worker_2": {**pair["Worker_2"], "role": test["worker_2_role"]},
+        "parameters": params
+    }
+
+
+def pair_entries(pair, tests, expanded, test_id):
+    """Build the campaign entries of one worker pair, numbered from ``test_id``.
+
+    ``tests`` are the eligible test trees and ``expanded`` maps each tree's
+    index to its expanded parameter sets.
+    """
+    entries = []
+    for t, test in tests:
+        for shared_params in expanded[t]:
+            entries.append(make_entry(pair, test, shared_params, test_id))
+            test_id += 1
+    return entries
+
+
+class CampaignIndex:
+    """Campaign entries decoded from their test ID, without generating the campaign.
+
+    Only the number of entries per eligible worker pair is computed up front;
+    an ID is located by bisecting the first ID of each pair, then decoded
+    through the test tree's ``ParameterSpace``. Entries and IDs are the same
+    as in the ``campaign.yml`` ``main`` writes from the same profiles and
+    test trees; ``load`` checks that they still are.
+    """
+
+    def __init__(self, workers, test_cases):
+        self.workers = workers
+        self.test_cases = test_cases
+        self.pairs = list(eligible_pairs(workers, test_cases))
+        self.pair_index = {(workers[i]["name"], workers[j]["name"]): p for p, (i, j, _) in enumerate(self.pairs)}
+        self.spaces = {}
+
+        self.first_ids = []
+        test_id = 1
+        for _, _, tests in self.pairs:
+            self.first_ids.append(test_id)
+            test_id += sum(len(self.space(t)) for t in tests)
+        self.count = test_id - 1
+
+    @classmethod
+    def load(cls, profiles_folder='./profiles', tests_folder='./tests-trees', campaign_file=CAMPAIGN_FILE):
+        """Index of the profiles and test trees.
+
+        If ``campaign_file`` exists, it must have been generated from them:
+        otherwise its IDs (those the results were recorded under) may decode
+        to other entries, and CampaignMismatch is raised. Pass
+        ``campaign_file=None`` to skip the check.
+        """
+        workers, test_cases = read_workers(profiles_folder), load_all_test_trees(tests_folder)
+        if campaign_file and os.path.exists(campaign_file):
+            recorded = campaign_digest(campaign_file)
+            if recorded is None:
+                raise CampaignMismatch(
+                    f"{campaign_file} has no inputs digest, so it cannot be checked against {profiles_folder} "
+                    f"and {tests_folder}: regenerate it (python generator.py)"
+                )
+            if recorded != inputs_digest(profiles_folder, tests_folder, test_cases):
+                raise CampaignMismatch(
+                    f"{campaign_file} was generated from other profiles or test trees than {profiles_folder} and "
+                    f"{tests_folder}, so its test IDs may decode to other entries: restore the inputs it was "
+                    "generated from, or regenerate it (python generator.py) and remap the results (campaign_mapping.py)"
+                )
+        return cls(workers, test_cases)
+
+    def space(self, t):
+        if t not in self.spaces:
+            test = self.test_cases[t]
+            self.spaces[t] = parameter_space(test.get("parameters", {}), test_name=test["name"].lower(), combine=test.get("combine", "zip"))
+        return self.spaces[t]
+
+    def __len__(self):
+        return self.count
+
+    def test_names(self):
+        return sorted({self.test_cases[t]["name"] for _, _, tests in self.pairs for t in tests})
+
+    def worker_names(self):
+        return sorted({self.workers[k]["name"] for i, j, _ in self.pairs for k in (i, j)})
+
+    def locate(self, test_id):
+        """``(pair position, test tree position, offset in its ParameterSpace)`` of a test ID."""
+        if not 1 <= test_id <= self.count:
+            raise KeyError(test_id)
+        p = bisect_right(self.first_ids, test_id) - 1
+        offset = test_id - self.first_ids[p]
+        for t in self.pairs[p][2]:
+            size = len(self.space(t))
+            if offset < size:
+                return p, t, offset
+            offset -= size
+
+    def entry(self, test_id):
+        p, t, offset = self.locate(test_id)
+        i, j, _ = self.pairs[p]
+        pair = {"Worker_1": self.workers[i], "Worker_2": self.workers[j]}
+        return make_entry(pair, self.test_cases[t], self.space(t)[offset], test_id)
+
+    def ids(self, test_name, worker_1, worker_2):
+        """The range of test IDs of ``test_name`` between two workers (empty if not eligible)."""
+        p = self.pair_index.get((worker_1, worker_2))
+        if p is None:
+            return range(0)
+        test_id = self.first_ids[p]
+        for t in self.pairs[p][2]:
+            size = len(self.space(t))
+            if self.test_cases[t]["name"] == test_name:
+                return range(test_id, test_id + size)
+            test_id += size
+        return range(0)
+
+
+def custom_representer(dumper, data):
+    if isinstance(data, list) and all(isinstance(i, list) and len(i) == 2 for i in data):
+        return dumper.represent_sequence('tag:yaml.org,2002:seq', data, flow_style=True)
+    return dumper.represent_list(data)
+
+
+NoAliasDumper.add_representer(list, custom_representer)
+
+
+def dump_entries(entries, stream=None):
+    return yaml.dump(entries, stream, Dumper=NoAliasDumper, default_flow_style=False)
+
+
+# Set in each pool process by _init_chunk_worker
+_chunk_context = {}
+
+
+def _init_chunk_worker(workers, test_cases, expanded):
+    _chunk_context.update(workers=workers, test_cases=test_cases, expanded=expanded)
+
+
+def _render_chunk(chunk):
+    test_id, pairs = chunk
+    workers, test_cases = _chunk_context["workers"], _chunk_context["test_cases"]
+    entries = []
+    for i, j, tests in pairs:
+        pair = {"Worker_1": workers[i], "Worker_2": workers[j]}
+        entries.extend(pair_entries(pair, [(t, test_cases[t]) for t in tests], _chunk_context["expanded"], test_id + len(entries)))
+    return dump_entries(entries)
+
+
+def plan_chunks(pairs, expanded, n_chunks):
+    """Split ``pairs`` into about ``n_chunks`` runs of similar entry counts.
+
+    Returns ``(first_id, pairs)`` per chunk; IDs are assigned exactly as in
+    serial generation, so chunks can be rendered independently.
+    """
+    sizes = [sum(len(expanded[t]) for t in tests) for _, _, tests in pairs]
+    target = max(1, sum(sizes) // max(1, n_chunks))
+    chunks, current, test_id, chunk_id, chunk_size = [], [], 1, 1, 0
+    for pair, size in zip(pairs, sizes):
+        current.append(pair)
+        chunk_size += size
+        if chunk_size >= target:
+            chunks.append((chunk_id, current))
+            test_id += chunk_size
+            chunk_id, current, chunk_size = test_id, [], 0
+    if current:
+        chunks.append((chunk_id, current))
+    return chunks
+
+
+def main(profiles_folder='./profiles', tests_folder='./tests-trees', campaign_output_file=CAMPAIGN_FILE, jobs=1):
+    workers = read_workers(profiles_folder)
+    test_cases = load_all_test_trees(tests_folder)
+    pairs = list(eligible_pairs(workers, test_cases))
+    # Recorded so that CampaignIndex.load can tell whether the inputs changed since
+    header = f"{DIGEST_PREFIX}{inputs_digest(profiles_folder, tests_folder, test_cases)}\n"
+
+    # Parameter sets only depend on the test tree: expand each used tree once
+    expanded = {}
+    for _, _, tests in pairs:
+        for t in tests:
+            if t not in expanded:
+                expanded[t] = expand_parameters(test_cases[t].get("parameters", {}), test_name=test_cases[t]["name"].lower(), combine=test_cases[t].get("combine", "zip"))
+
+    if jobs > 1 and len(pairs) > 1:
+        import multiprocessing
+
+        # Each process renders whole pairs to YAML; chunks are written in order
+        chunks = plan_chunks(pairs, expanded, jobs * 4)
+        with multiprocessing.Pool(jobs, initializer=_init_chunk_worker, initargs=(workers, test_cases, expanded)) as pool:
+            with open(campaign_output_file, 'w') as f:
+                f.write(header)
+                for text in pool.imap(_render_chunk, chunks):
+                    if text != "[]\n":
+                        f.write(text)
+        return
 
     campaign_entries = []
-    test_id = 1
-
-    for pair in worker_pairs:
-        for test in test_cases:
-            test_name = test["name"].lower()
-
-            # Rule 1: Skip mirrored roles for http_simple_request (keep one direction only)
-            if test_name == "http_simple_request":
-                if pair["Worker_1"]["name"] > pair["Worker_2"]["name"]:
-                    continue
-
-            # Rule 2: Server (Worker_2) must be internet accessible for all tests
-            if not pair["Worker_2"].get("internet_accessible", False):
-                continue
-
-            # Additional skip for intranet-restricted tests
-            if test_name in ["https_sni", "udp_dns_qname_prober", "http_1_conformance"]:
-                if not pair["Worker_2"].get("intranet_accessible", False):
-                    continue
-
-            parameter_sets = expand_parameters(test.get("parameters", {}), test_name=test_name)
-            for params in parameter_sets:
-                # Inject target IP if not http_simple_request
-                if test_name != "http_simple_request":
-                    params["ip"] = pair["Worker_2"]["ip"]
-
-                # Add identifier for https_sni
-                if test_name in ["https_sni"]:
-                    params["identifier"] = params.get("ip", pair["Worker_2"]["ip"])
-
-                campaign_entry = {
-                    "id": test_id,
-                    "name": test["name"],
-                    "Worker_1": {**pair["Worker_1"], "role": test["worker_1_role"]},
-                    "Worker_2": {**pair["Worker_2"], "role": test["worker_2_role"]},
-                    "parameters": params
-                }
-
-                # Apply special filters for dns_qname_prober
-                if test_name == "udp_dns_qname_prober":
-                    w1_ip = pair["Worker_1"]["ip"]
-                    w2_ip = pair["Worker_2"]["ip"]
-
-
-                campaign_entries.append(campaign_entry)
-                test_id += 1
-
-    def custom_representer(dumper, data):
-        if isinstance(data, list) and all(isinstance(i, list) and len(i) == 2 for i in data):
-            return dumper.represent_sequence('tag:yaml.org,2002:seq', data, flow_style=True)
-        return dumper.represent_list(data)
-
-    NoAliasDumper.add_representer(list, custom_representer)
+    for i, j, tests in pairs:
+        pair = {"Worker_1": workers[i], "Worker_2": workers[j]}
+        campaign_entries.extend(pair_entries(pair, [(t, test_cases[t]) for t in tests], expanded, len(campaign_entries) + 1))
 
     with open(campaign_output_file, 'w') as f:
-        yaml.dump(campaign_entries, f, Dumper=NoAliasDumper, default_flow_style=False)
+        f.write(header)
+        dump_entries(campaign_entries, f)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate campaign.yml from worker profiles and test trees.")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes for generation (output is identical to serial)")
+    main(jobs=parser.parse_args().jobs)
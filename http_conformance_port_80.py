@@ -1,13 +1,19 @@
 import json
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
+from classifiers import classify_http_conformance_run_entry
+from classification_cache import ClassificationCache
+from plotting import draw_status_row
+from chart_export import save_chart
 
 # 1) Load the data files
 data = {}
+paths = {}
 for run_idx in range(1, 5):
     path = f'run_{run_idx}_http_results.json'
     with open(path, 'r') as f:
         data[run_idx] = json.load(f)
+    paths[run_idx] = path
 
 # 2) Gather a stable, sorted list of test IDs
 test_ids = sorted(data[1].keys(), key=int)
@@ -33,39 +39,11 @@ def update_synthesis_file_s2(classifications, test_ids, filename='synthesis.json
     print("✅ Synthesis file updated with 'S2_HTTP'")
 
 
-# 3) Classification function with your rules
-def classify_entry(entry):
-    result = entry.get('result', {})
-    # Worker_2 null → Failure (gray)
-    if result.get('Worker_2') is None:
-        return 'Failure'
-    
-    vars1 = result.get('Worker_1', {}).get('Variables', {})
-    vars2 = result.get('Worker_2', {}).get('Variables', {})
-
-    sync1 = vars1.get('sync_received')
-    recv1 = vars1.get('received') or ""
-    sync2 = vars2.get('sync_received')
-    recv2 = vars2.get('received') or ""
-
-    # If worker_1 received is Empty string → Empty (yellow)
-    if recv1 == "":
-        return 'Empty'
-    
-    # 503 in worker_1 received → 503 (red)
-    if '503' in recv1:
-        return '503'
-    
-    # Match condition: sync1 == recv2 and sync2 == recv1
-    if sync1 == recv2 and sync2 == recv1:
-        return 'Match'
-    
-    # Default fallback: Failure (gray)
-    return 'Failure'
-
 # 4) Build a classification list for each run
+with ClassificationCache() as cache:
+    labels = {run_idx: cache.classify_file(paths[run_idx], classify_http_conformance_run_entry, data[run_idx]) for run_idx in data}
 classifications = {
-    run_idx: [classify_entry(data[run_idx][tid]) for tid in test_ids]
+    run_idx: [labels[run_idx][tid] for tid in test_ids]
     for run_idx in data
 }
 
@@ -91,24 +69,7 @@ fig, ax = plt.subplots(figsize=(len(test_ids)/4, 3.5))  # Slightly shorter heigh
 for idx, run_idx in enumerate(sorted(classifications)):
     vector = classifications[run_idx]
     y = y_positions[idx]
-    for i, status in enumerate(vector):
-        ax.barh(
-            y=y,
-            width=1,
-            left=i,
-            height=bar_height,
-            color=colors[status],
-            edgecolor='black',
-            hatch=patterns[status]
-        )
-    ax.text(
-        -5, y,
-        f'Run {run_idx}',
-        va='center',
-        ha='right',
-        fontweight='bold',
-        fontsize=13  # Slightly smaller font
-    )
+    draw_status_row(ax, y, vector, colors, patterns, bar_height, f'Run {run_idx}')
 
 # 7) Add a legend
 legend_handles = [
@@ -146,8 +107,7 @@ ax.spines['bottom'].set_visible(False)  # Optional: keep True if you want a bott
 
 ax.tick_params(axis='y', which='both', left=False, labelleft=False)
 plt.tight_layout()
-plt.savefig('http_1_conformance_vector.png', dpi=300, bbox_inches='tight')
-print("✅ Vector chart saved as 'http_1_conformance_vector.png'")
+save_chart(fig, 'http_1_conformance_vector.png')
 
 update_synthesis_file_s2(classifications, test_ids)
 
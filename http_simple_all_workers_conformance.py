@@ -2,25 +2,21 @@ import json
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 from collections import defaultdict
+from classifiers import classify_http_simple_entry
+from classification_cache import ClassificationCache
+from plotting import format_worker_name, draw_status_row
+from chart_export import save_chart
 
 # Load classification data
 with open('run_all_workers_simple_results.json', 'r') as f:
     data = json.load(f)
+with ClassificationCache() as cache:
+    labels = cache.classify_file('run_all_workers_simple_results.json', classify_http_simple_entry, data)
 
 # Load naming map
 with open('paper_workers_naming.json', 'r') as f:
     name_map = json.load(f)
 
-# Unicode subscripts
-subscript_digits = str.maketrans("0123456789", "₀₁₂₃₄₅₆₇₈₉")
-
-def format_worker_name(worker_id):
-    mapped = name_map.get(worker_id, worker_id)
-    if any(char.isdigit() for char in mapped):
-        base = ''.join([c for c in mapped if not c.isdigit()])
-        digits = ''.join([c for c in mapped if c.isdigit()])
-        return base + digits.translate(subscript_digits)
-    return mapped
 
 # Group by worker pairs
 pairwise_data = defaultdict(list)
@@ -28,63 +24,12 @@ for tid, entry in sorted(data.items(), key=lambda x: int(x[0])):  # sort by test
     pair = (entry['worker_1'], entry['worker_2'])
     pairwise_data[pair].append((tid, entry))
 
-# Classify entries
-def classify_entry(entry):
-    if entry.get('status') == 'submission_failed':
-        return 'SubmissionFailed'
-    if entry.get('status') == 'polling_failed':
-        return 'PollingFailed'
-
-    result = entry.get('result', {})
-    if result.get('Worker_1') is None or result.get('Worker_2') is None:
-        return 'WorkerMissing'
-
-    vars1 = result.get('Worker_1', {}).get('Variables', {})
-    vars2 = result.get('Worker_2', {}).get('Variables', {})
-
-    dict_result1 = vars1.get('dict', {}).get('result', {})
-    sync_result1 = vars1.get('sync_dict', {}).get('result', {})
-
-    dict_result2 = vars2.get('dict', {}).get('result', {})
-    sync_result2 = vars2.get('sync_dict', {}).get('result', {})
-
-    if dict_result1 == sync_result1 and dict_result2 == sync_result2:
-        return 'Match'
-
-    status1 = dict_result1.get('results', {}).get('HTTP', {}).get('status')
-    status2 = dict_result2.get('results', {}).get('HTTP', {}).get('status')
-
-    if status1 == status2 and status1 is not None:
-        return 'Match'
-
-    if status1 == 503 or status2 == 503:
-        return '503'
-    if status1 == 403 or status2 == 403:
-        return '403'
-
-    errors1 = dict_result1.get('errors', [])
-    errors2 = dict_result2.get('errors', [])
-    combined_errors = errors1 + errors2
-
-    for err in combined_errors:
-        if "handshake operation timed out" in err:
-            return 'HandshakeTimeout'
-        if "Connection reset by peer" in err:
-            return 'ConnReset'
-        if "HTTP request failed: timed out" in err:
-            return 'HTTPTimeout'
-        if "HTTPS request failed: timed out" in err:
-            return 'HTTPSTimeout'
-
-    return 'Other'
-
-
 # Apply classification
 classified_by_pair = defaultdict(lambda: {'HTTP': [], 'HTTPS': []})
 for pair, entries in pairwise_data.items():
     for i, (tid, entry) in enumerate(entries):
         protocol = 'HTTP' if i % 2 == 0 else 'HTTPS'
-        status = classify_entry(entry)
+        status = labels[tid]
         classified_by_pair[pair][protocol].append((int(tid), status))
 
 # Style settings
@@ -123,7 +68,7 @@ def plot_classification_group(protocol, output_file):
     y_spacing = 0.65
     bar_height = 0.6
 
-    all_pairs = sorted(classified_by_pair.keys(), key=lambda p: (format_worker_name(p[0]), format_worker_name(p[1])))
+    all_pairs = sorted(classified_by_pair.keys(), key=lambda p: (format_worker_name(p[0], name_map), format_worker_name(p[1], name_map)))
     y_positions = [y_spacing * (len(all_pairs) - i) for i in range(len(all_pairs))]
 
     present_statuses = set()
@@ -135,28 +80,9 @@ def plot_classification_group(protocol, output_file):
         statuses = [status for _, status in test_vector]
         present_statuses.update(statuses)
 
-        for i, status in enumerate(statuses):
-            ax.barh(
-                y=y,
-                width=1,
-                left=i,
-                height=bar_height,
-                color=colors.get(status, 'gray'),
-                edgecolor='black',
-                hatch=patterns.get(status, '')
-            )
-
-        # Use mapped + subscripted name
-        w1 = format_worker_name(pair[0])
-        w2 = format_worker_name(pair[1])
-        ax.text(
-            -5, y,
-            f'{w1} ↔ {w2}',
-            va='center',
-            ha='right',
-            fontweight='bold',
-            fontsize=13
-        )
+        w1 = format_worker_name(pair[0], name_map)
+        w2 = format_worker_name(pair[1], name_map)
+        draw_status_row(ax, y, statuses, colors, patterns, bar_height, f'{w1} ↔ {w2}')
 
     def legend_sort_key(status):
         if status == 'Match':
@@ -199,8 +125,7 @@ def plot_classification_group(protocol, output_file):
     ax.tick_params(axis='y', which='both', left=False, labelleft=False)
 
     plt.tight_layout()
-    plt.savefig(output_file, dpi=300, bbox_inches='tight')
-    print(f"✅ Chart saved: {output_file}")
+    save_chart(fig, output_file)
 
 # Generate both plots
 plot_classification_group('HTTP', 'http_vector_by_pair.png')
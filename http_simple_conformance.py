@@ -1,13 +1,19 @@
 import json
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
+from classifiers import classify_http_simple_run_entry
+from classification_cache import ClassificationCache
+from plotting import draw_status_row
+from chart_export import save_chart
 
 # 1) Load the data files
 data = {}
+paths = {}
 for run_idx in range(1, 5):
     path = f'run_{run_idx}_http_simple_results.json'
     with open(path, 'r') as f:
         data[run_idx] = json.load(f)
+    paths[run_idx] = path
 
 # 2) Gather sorted test IDs
 test_ids = sorted(data[1].keys(), key=int)
@@ -43,56 +49,13 @@ def update_synthesis_file(classifications, test_ids, filename='synthesis.json'):
     print(f"✅ Synthesis file '{filename}' updated")
 
 
-# 3) Classification function
-def classify_entry(entry):
-    result = entry.get('result', {})
-    if result.get('Worker_2') is None:
-        return 'Failure'
-
-    vars1 = result.get('Worker_1', {}).get('Variables', {})
-    vars2 = result.get('Worker_2', {}).get('Variables', {})
-
-    dict_result1 = vars1.get('dict', {}).get('result', {})
-    sync_result1 = vars1.get('sync_dict', {}).get('result', {})
-
-    dict_result2 = vars2.get('dict', {}).get('result', {})
-    sync_result2 = vars2.get('sync_dict', {}).get('result', {})
-
-    if dict_result1 == sync_result1 and dict_result2 == sync_result2:
-        return 'Match'
-
-    status1 = dict_result1.get('results', {}).get('HTTP', {}).get('status')
-    status2 = dict_result2.get('results', {}).get('HTTP', {}).get('status')
-
-    if status1 == status2 and status1 is not None:
-        return 'Match'
-
-    if status1 == 503 or status2 == 503:
-        return '503'
-    if status1 == 403 or status2 == 403:
-        return '403'
-
-    errors1 = dict_result1.get('errors', [])
-    errors2 = dict_result2.get('errors', [])
-    combined_errors = errors1 + errors2
-
-    for err in combined_errors:
-        if "handshake operation timed out" in err:
-            return 'HandshakeTimeout'
-        if "Connection reset by peer" in err:
-            return 'ConnReset'
-        if "HTTP request failed: timed out" in err:
-            return 'HTTPTimeout'
-        if "HTTPS request failed: timed out" in err:
-            return 'HTTPSTimeout'
-
-    return 'Other'
-
 # 4) Classify
+with ClassificationCache() as cache:
+    labels = {run_idx: cache.classify_file(paths[run_idx], classify_http_simple_run_entry, data[run_idx]) for run_idx in data}
 classifications = {run_idx: {} for run_idx in data}
 for run_idx in data:
     for tid in test_ids:
-        classifications[run_idx][tid] = classify_entry(data[run_idx][tid])
+        classifications[run_idx][tid] = labels[run_idx][tid]
 
 # 5) Styles
 patterns = {
@@ -141,24 +104,7 @@ def plot_classification_group(protocol_name, is_https, output_file):
 
         present_statuses.update(vector)
 
-        for i, status in enumerate(vector):
-            ax.barh(
-                y=y,
-                width=1,
-                left=i,
-                height=bar_height,
-                color=colors[status],
-                edgecolor='black',
-                hatch=patterns[status]
-            )
-        ax.text(
-            -5, y,
-            f'Run {run_idx}',
-            va='center',
-            ha='right',
-            fontweight='bold',
-            fontsize=13  # Slightly smaller font
-        )
+        draw_status_row(ax, y, vector, colors, patterns, bar_height, f'Run {run_idx}')
 
     # Legend only for statuses in current data
     sorted_keys = ['Match'] + sorted(k for k in present_statuses if k != 'Match')
@@ -197,8 +143,7 @@ def plot_classification_group(protocol_name, is_https, output_file):
     ax.tick_params(axis='y', which='both', left=False, labelleft=False)
 
     plt.tight_layout()
-    plt.savefig(output_file, dpi=300, bbox_inches='tight')
-    print(f"✅ Chart saved as '{output_file}'")
+    save_chart(fig, output_file)
 
 
 
@@ -1,13 +1,19 @@
 import json
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
+from classifiers import classify_https_sni_run_entry
+from classification_cache import ClassificationCache
+from plotting import draw_status_row
+from chart_export import save_chart
 
 # 1) Load the data files for HTTPS
 data = {}
+paths = {}
 for run_idx in range(1, 5):
     path = f'run_{run_idx}_https_results.json'
     with open(path, 'r') as f:
         data[run_idx] = json.load(f)
+    paths[run_idx] = path
 
 # 2) Gather a stable, sorted list of test IDs
 test_ids = sorted(data[1].keys(), key=int)
@@ -32,31 +38,11 @@ def update_synthesis_file_s3(classifications, test_ids, filename='synthesis.json
         json.dump(synthesis, f, indent=2)
     print("✅ Synthesis file updated with 'S3_HTTPS'")
 
-# 3) Classification function with new rules (Match, Null, Failure only)
-def classify_entry(entry):
-    result = entry.get('result', {})
-    if result.get('Worker_2') is None:
-        return 'Failure'
-
-    vars1 = result.get('Worker_1', {}).get('Variables', {})
-    vars2 = result.get('Worker_2', {}).get('Variables', {})
-
-    sync1 = vars1.get('sync_dict')
-    recv1 = vars1.get('received')
-    sync2 = vars2.get('sync_dict')
-    recv2 = vars2.get('received')
-
-    if recv1 is None:
-        return 'Null'
-
-    if sync1 == recv2 and sync2 == recv1:
-        return 'Match'
-
-    return 'Failure'
-
 # 4) Build a classification list for each run
+with ClassificationCache() as cache:
+    labels = {run_idx: cache.classify_file(paths[run_idx], classify_https_sni_run_entry, data[run_idx]) for run_idx in data}
 classifications = {
-    run_idx: [classify_entry(data[run_idx][tid]) for tid in test_ids]
+    run_idx: [labels[run_idx][tid] for tid in test_ids]
     for run_idx in data
 }
 
@@ -80,24 +66,7 @@ fig, ax = plt.subplots(figsize=(len(test_ids)/4, 3.5))  # Slightly shorter heigh
 for idx, run_idx in enumerate(sorted(classifications)):
     vector = classifications[run_idx]
     y = y_positions[idx]
-    for i, status in enumerate(vector):
-        ax.barh(
-            y=y,
-            width=1,
-            left=i,
-            height=bar_height,
-            color=colors[status],
-            edgecolor='black',
-            hatch=patterns[status]
-        )
-    ax.text(
-        -5, y,
-        f'Run {run_idx}',
-        va='center',
-        ha='right',
-        fontweight='bold',
-        fontsize=13  # Slightly smaller font
-    )
+    draw_status_row(ax, y, vector, colors, patterns, bar_height, f'Run {run_idx}')
 
 # 7) Add a legend
 legend_handles = [
@@ -134,8 +103,7 @@ ax.spines['bottom'].set_visible(False)  # Optional: keep True if you want a bott
 
 ax.tick_params(axis='y', which='both', left=False, labelleft=False)
 plt.tight_layout()
-plt.savefig('https_1_conformance_vector.png', dpi=300, bbox_inches='tight')
-print("✅ Vector chart saved as 'https_1_conformance_vector.png'")
+save_chart(fig, 'https_1_conformance_vector.png')
 
 update_synthesis_file_s3(classifications, test_ids)
 
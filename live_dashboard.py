@@ -0,0 +1,309 @@
+"""Live classification dashboards, updated while a campaign runs.
+
+Follows the runner's output and keeps, per test tree, the per-pair
+classification vectors of the ``*_all_workers*`` scripts and label counters
+up to date. Only results that are new or changed since the last read are
+classified. Charts (``live_<tree>.png``) are re-rendered at most every
+``--interval`` seconds; only the cells of rows that changed are updated.
+
+    python apicampaign.py --events-file results.events.jsonl
+    python live_dashboard.py --events results.events.jsonl
+    python live_dashboard.py --results results.json --interval 30
+
+``--events`` tails the JSON-lines stream written by ``apicampaign.py
+--events-file``; ``--results`` re-reads the results file whenever the runner
+rewrites it. ``--once`` processes what is there, renders and exits.
+"""
+import argparse
+import json
+import os
+import time
+from bisect import bisect_left
+from collections import Counter
+
+from classifiers import CLASSIFIERS, MATCH_LABELS, unfinished_label
+from plotting import format_worker_name, load_name_map
+
+# (colors, patterns) per test tree, as in the all-workers scripts
+STYLES = {
+    "http_simple_request": (
+        {'Match': 'green', 'Other': 'dimgray', '503': 'red', '403': 'orange', 'HandshakeTimeout': 'lightblue',
+         'ConnReset': 'purple', 'HTTPTimeout': 'pink', 'HTTPSTimeout': 'pink', 'SubmissionFailed': 'black',
+         'PollingFailed': 'black', 'WorkerMissing': 'black'},
+        {'Match': '//', 'Other': '...', '503': '\\\\', '403': '++', 'HandshakeTimeout': '--', 'ConnReset': 'oo',
+         'HTTPTimeout': '++', 'HTTPSTimeout': '--', 'SubmissionFailed': '', 'PollingFailed': '///', 'WorkerMissing': 'xx'},
+    ),
+    "http_1_conformance": (
+        {'Match': 'green', 'Empty': 'yellow', '503': 'red', 'Failure': 'dimgray', 'SubmissionFailed': 'black',
+         'PollingFailed': 'black', 'WorkerMissing': 'black'},
+        {'Match': '//', 'Empty': 'xx', '503': '\\\\', 'Failure': '...', 'SubmissionFailed': '', 'PollingFailed': '///',
+         'WorkerMissing': 'oo'},
+    ),
+    "https_sni": (
+        {'Match': 'green', 'Empty': 'blue', 'Failure': 'dimgray', 'SubmissionFailed': 'black', 'PollingFailed': 'black',
+         'WorkerMissing': 'black'},
+        {'Match': '//', 'Empty': 'xx', 'Failure': '...', 'SubmissionFailed': '', 'PollingFailed': '///', 'WorkerMissing': 'oo'},
+    ),
+    "udp_dns_qname_prober": (
+        {'Received': 'green', 'Sinkhole': 'red', 'No Response': 'yellow', 'Failure': 'dimgray',
+         'SubmissionFailed': 'black', 'PollingFailed': 'black', 'WorkerMissing': 'black'},
+        {'Received': '//', 'Sinkhole': '\\\\', 'No Response': 'xx', 'Failure': '...', 'SubmissionFailed': '',
+         'PollingFailed': '///', 'WorkerMissing': 'oo'},
+    ),
+}
+
+
+class LiveState:
+    """Classification vectors per (chart, worker pair), in test ID order.
+
+    ``http_simple_request`` is split into HTTP and HTTPS charts by the
+    ``use_https`` parameter of each test ID in the campaign
+    (``result_join.CampaignJoin``, loaded on first use).
+    """
+
+    def __init__(self, join=None):
+        self.join = join
+        # (chart, pair) -> ([test IDs], [labels]), both sorted by test ID
+        self.rows = {}
+        # test ID -> (row key, label)
+        self.labels = {}
+        # test tree -> Counter of labels
+        self.counters = {}
+        # row key -> first cell that changed since the last render
+        self.dirty = {}
+
+    def _mark(self, key, position):
+        self.dirty[key] = min(position, self.dirty.get(key, position))
+
+    def _remove(self, test_id):
+        key, label = self.labels.pop(test_id)
+        ids, labels = self.rows[key]
+        position = bisect_left(ids, test_id)
+        del ids[position], labels[position]
+        self.counters[key[0][0]][label] -= 1
+        self._mark(key, position)
+
+    def chart_key(self, test_id, entry):
+        test_name = entry.get("test_name")
+        if test_name != "http_simple_request":
+            return test_name, None
+        if self.join is None:
+            from result_join import CampaignJoin
+            self.join = CampaignJoin(("protocol",))
+        try:
+            return test_name, self.join.fields_of(test_id)["protocol"].upper()
+        except (KeyError, ValueError):
+            # Not in the current campaign: one chart for both protocols
+            return test_name, None
+
+    def update(self, test_id, entry):
+        """Classify a new or updated result; return whether anything changed."""
+        classifier = CLASSIFIERS.get(entry.get("test_name"))
+        if classifier is None or not str(test_id).isdigit():
+            return False
+        test_id = int(test_id)
+        key = (self.chart_key(test_id, entry), (entry.get("worker_1"), entry.get("worker_2")))
+        # A worker that went offline leaves no result to classify
+        label = unfinished_label(entry) or classifier(entry)
+        if self.labels.get(test_id) == (key, label):
+            return False
+        if test_id in self.labels:
+            self._remove(test_id)
+
+        ids, labels = self.rows.setdefault(key, ([], []))
+        position = bisect_left(ids, test_id)
+        ids.insert(position, test_id)
+        labels.insert(position, label)
+        self.labels[test_id] = (key, label)
+        self.counters.setdefault(key[0][0], Counter())[label] += 1
+        self._mark(key, position)
+        return True
+
+    def summary(self):
+        lines = []
+        for test_name, counter in sorted(self.counters.items()):
+            total = sum(counter.values())
+            matched = counter.get(MATCH_LABELS.get(test_name), 0)
+            counts = ", ".join(f"{label} {count}" for label, count in counter.most_common() if count)
+            lines.append(f"{test_name:<22} {total:>6} results ({100 * matched / total if total else 0:.0f}% {MATCH_LABELS.get(test_name)}): {counts}")
+        return "\n".join(lines)
+
+
+class EventTail:
+    """New records of the JSON-lines stream written by ``apicampaign.py --events-file``."""
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.partial = b""
+
+    def read(self):
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return
+        if size < self.offset:
+            # Truncated or replaced: start over
+            self.offset, self.partial = 0, b""
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read()
+        self.offset += len(data)
+        lines = (self.partial + data).split(b"\n")
+        self.partial = lines.pop()
+        for line in lines:
+            if line.strip():
+                record = json.loads(line)
+                yield record.pop("id"), record
+
+
+class ResultsPoll:
+    """Entries of a results file that are new or changed since the last read."""
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+        self.seen = {}
+
+    def read(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self.mtime:
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except ValueError:
+            # Caught mid-rewrite; read again on the next poll
+            return
+        self.mtime = mtime
+        for test_id, entry in data.items():
+            version = (entry.get("timestamp"), entry.get("status"))
+            if self.seen.get(test_id) != version:
+                self.seen[test_id] = version
+                yield test_id, entry
+
+
+class Dashboard:
+    """One figure per chart; rows keep their position once drawn."""
+
+    def __init__(self, output_dir=".", name_map=None, dpi=100):
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        import matplotlib.patches as mpatches
+
+        self.plt, self.mpatches = plt, mpatches
+        self.output_dir = output_dir
+        self.name_map = name_map or {}
+        self.dpi = dpi
+        self.figures = {}
+        # row key -> (y, [cell patches])
+        self.cells = {}
+        self.y_spacing = 0.65
+        self.bar_height = 0.6
+
+    def _figure(self, chart):
+        if chart not in self.figures:
+            fig, ax = self.plt.subplots(figsize=(15, 6))
+            # Fixed margins for the pair labels and legend (no tight bbox pass per render)
+            fig.subplots_adjust(left=0.25, right=0.98, top=0.97, bottom=0.25)
+            for spine in ['top', 'right', 'left', 'bottom']:
+                ax.spines[spine].set_visible(False)
+            ax.tick_params(axis='y', which='both', left=False, labelleft=False)
+            ax.set_xlabel('Domain Name ID', fontsize=13, fontweight='bold')
+            self.figures[chart] = {"fig": fig, "ax": ax, "rows": 0, "width": 0, "statuses": set()}
+        return self.figures[chart]
+
+    def _update_row(self, key, labels, start):
+        chart, pair = key
+        figure = self._figure(chart)
+        ax = figure["ax"]
+        colors, patterns = STYLES[chart[0]]
+        if key not in self.cells:
+            y = -self.y_spacing * figure["rows"]
+            figure["rows"] += 1
+            w1, w2 = (format_worker_name(w or "?", self.name_map) for w in pair)
+            ax.text(-0.01, y, f'{w1} ↔ {w2}', va='center', ha='right', fontweight='bold', fontsize=13, transform=ax.get_yaxis_transform())
+            self.cells[key] = (y, [])
+        y, cells = self.cells[key]
+
+        for i in range(start, len(labels)):
+            status = labels[i]
+            if i < len(cells):
+                cells[i].set_facecolor(colors.get(status, 'gray'))
+                cells[i].set_hatch(patterns.get(status, ''))
+            else:
+                cells.append(ax.add_patch(self.mpatches.Rectangle(
+                    (i, y - self.bar_height / 2), 1, self.bar_height,
+                    facecolor=colors.get(status, 'gray'), edgecolor='black', hatch=patterns.get(status, ''))))
+        while len(cells) > len(labels):
+            cells.pop().remove()
+
+        figure["width"] = max(figure["width"], len(labels))
+        figure["statuses"].update(labels[start:])
+
+    def render(self, state):
+        charts = set()
+        for key, start in state.dirty.items():
+            self._update_row(key, state.rows[key][1], start)
+            charts.add(key[0])
+
+        for chart in charts:
+            figure = self.figures[chart]
+            fig, ax = figure["fig"], figure["ax"]
+            colors, patterns = STYLES[chart[0]]
+            ax.set_xlim(0, max(10, figure["width"]))
+            ax.set_ylim(-self.y_spacing * figure["rows"] + 0.2, self.y_spacing)
+            ax.set_xticks(list(range(0, figure["width"] + 1, 5)))
+            handles = [
+                self.mpatches.Patch(facecolor=colors.get(key, 'gray'), edgecolor='black', hatch=patterns.get(key, ''), label=key)
+                for key in sorted(figure["statuses"])
+            ]
+            ax.legend(handles=handles, title="Classification", loc='upper center', bbox_to_anchor=(0.5, -0.1), ncol=4, frameon=True)
+            name = chart[0] if chart[1] is None else f"{chart[0]}_{chart[1].lower()}"
+            fig.savefig(os.path.join(self.output_dir, f"live_{name}.png"), dpi=self.dpi)
+        return charts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live per-pair classification charts and counters while a campaign runs.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--events", help="JSON-lines file written by apicampaign.py --events-file")
+    source.add_argument("--results", help="Results file rewritten by apicampaign.py after every test")
+    parser.add_argument("--interval", type=float, default=10, help="Minimum seconds between chart renders (default: 10)")
+    parser.add_argument("--poll", type=float, default=1, help="Seconds between reads of the source (default: 1)")
+    parser.add_argument("--output-dir", default=".", help="Directory for live_<tree>.png charts")
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--no-charts", action="store_true", help="Only print the counters")
+    parser.add_argument("--once", action="store_true", help="Process the current content, render once and exit")
+    args = parser.parse_args()
+
+    reader = EventTail(args.events) if args.events else ResultsPoll(args.results)
+    state = LiveState()
+    dashboard = None if args.no_charts else Dashboard(args.output_dir, load_name_map(), args.dpi)
+    last_render = None
+    changed = 0
+
+    try:
+        while True:
+            changed += sum(state.update(test_id, entry) for test_id, entry in reader.read())
+            due = last_render is None or time.monotonic() - last_render >= args.interval
+            if state.dirty and (due or args.once):
+                charts = dashboard.render(state) if dashboard else ()
+                state.dirty.clear()
+                last_render = time.monotonic()
+                print(f"\n[{time.strftime('%H:%M:%S')}] {changed} new result(s), {len(charts)} chart(s) updated")
+                print(state.summary())
+                changed = 0
+            if args.once:
+                break
+            time.sleep(args.poll)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""Local stand-in for the NoPASARAN master task API.
+
+Implements the two endpoints used by apicampaign.py:
+
+    POST /api/v1/tests-trees/task            -> {"task_id": ...}
+    GET  /api/v1/tests-trees/task/<task_id>  -> {"status": ..., "result": ...}
+
+plus an optional batch endpoint (disable with ``--no-batch`` to test the
+client's fallback):
+
+    POST /api/v1/tests-trees/task/batch      -> {"task_ids": [...]}
+
+Tasks are executed on simulated workers with a bounded number of concurrent
+tasks each; response latency, task duration and failure rates are drawn from
+configurable distributions. Completed tasks replay recorded results from the
+``run_*_results.json`` files. Point the runner at it with:
+
+    python master_standin.py --port 8765 --results "run_*_results.json"
+    NOPASARAN_TASK_URL=http://127.0.0.1:8765/api/v1/tests-trees/task python apicampaign.py
+"""
+import argparse
+import asyncio
+import glob
+import itertools
+import json
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import yaml
+
+from campaign_mapping import get_fingerprint
+
+TASK_PATH = "/api/v1/tests-trees/task"
+WORKER_SUFFIX = ".admin.worker.nopasaran.org"
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+def parse_distribution(spec):
+    """Turn ``kind:args`` into a sampler taking a ``random.Random``.
+
+    Supported kinds: ``const:S``, ``uniform:LOW,HIGH``, ``exp:MEAN``,
+    ``lognormal:MU,SIGMA`` and ``normal:MEAN,STDDEV`` (clamped at 0), all in
+    seconds.
+    """
+    kind, _, args = str(spec).partition(":")
+    if not args:
+        kind, args = "const", kind
+    values = [float(v) for v in args.split(",")]
+
+    if kind == "const":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1 / values[0]) if values[0] else 0.0
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    raise ValueError(f"Unknown distribution: {spec}")
+
+
+def payload_to_entry(payload):
+    # Rebuild a campaign-like entry so campaign_mapping fingerprints apply
+    worker_1 = payload["variables"]["Root"]["Worker_1"]
+    worker_2 = payload["variables"]["Root"]["Worker_2"]
+    return {
+        "name": payload["tests-tree"].rsplit(".png", 1)[0],
+        "Worker_1": {"name": worker_1.get("name")},
+        "Worker_2": {"name": worker_2.get("name")},
+        "parameters": worker_1,
+    }
+
+
+class ResultReplay:
+    """Recorded results served back as task outcomes.
+
+    With a campaign file, payloads are matched to their test ID through
+    campaign fingerprints and answered with a recorded result for that ID.
+    Otherwise (or when no record exists) results are drawn round-robin from
+    the recordings of the same test tree and worker pair.
+    """
+
+    def __init__(self, result_patterns=(), campaign_file=None, rng=None):
+        self.rng = rng or random.Random()
+        self.by_id = defaultdict(list)
+        self.by_pair = defaultdict(list)
+        self.fingerprints = {}
+
+        for pattern in result_patterns:
+            for path in sorted(glob.glob(pattern)):
+                with open(path, "r") as f:
+                    data = json.load(f)
+                for test_id, entry in data.items():
+                    if entry.get("status") != "completed" or not entry.get("result"):
+                        continue
+                    self.by_id[test_id].append(entry["result"])
+                    self.by_pair[(entry.get("test_name"), entry.get("worker_1"), entry.get("worker_2"))].append(entry["result"])
+
+        self.pair_cycles = {key: itertools.cycle(results) for key, results in self.by_pair.items()}
+
+        if campaign_file:
+            with open(campaign_file, "r") as f:
+                for entry in yaml.safe_load(f):
+                    self.fingerprints[get_fingerprint(entry)] = str(entry["id"])
+
+    def __len__(self):
+        return sum(len(results) for results in self.by_id.values())
+
+    def lookup(self, payload):
+        entry = payload_to_entry(payload)
+        test_id = self.fingerprints.get(get_fingerprint(entry))
+        if test_id and self.by_id.get(test_id):
+            return self.rng.choice(self.by_id[test_id])
+
+        key = (entry["name"], entry["Worker_1"]["name"], entry["Worker_2"]["name"])
+        if key in self.pair_cycles:
+            return next(self.pair_cycles[key])
+        return None
+
+
+class MasterStandin:
+    def __init__(self, replay=None, latency="const:0", task_duration="const:0.05",
+                 submit_failure_rate=0.0, task_failure_rate=0.0, worker_capacity=1,
+                 offline_workers=(), batch_enabled=True, seed=None):
+        self.replay = replay or ResultReplay()
+        self.latency = parse_distribution(latency)
+        self.task_duration = parse_distribution(task_duration)
+        self.submit_failure_rate = submit_failure_rate
+        self.task_failure_rate = task_failure_rate
+        self.worker_capacity = worker_capacity
+        self.offline_workers = set(offline_workers)
+        self.batch_enabled = batch_enabled
+        self.rng = random.Random(seed)
+
+        self.tasks = {}
+        self.worker_slots = {}
+        self.stats = defaultdict(int)
+
+    # --- Simulated task execution ---
+    def _slots(self, worker):
+        if worker not in self.worker_slots:
+            self.worker_slots[worker] = asyncio.Semaphore(self.worker_capacity)
+        return self.worker_slots[worker]
+
+    async def _execute(self, task_id, workers):
+        task = self.tasks[task_id]
+        if any(worker in self.offline_workers for worker in workers):
+            # Offline workers never pick the task up; it stays pending
+            return
+
+        first, second = sorted(workers)
+        async with self._slots(first), self._slots(second):
+            task["status"] = "running"
+            task["started_at"] = time.time()
+            await asyncio.sleep(self.task_duration(self.rng))
+
+        if self.rng.random() < self.task_failure_rate:
+            task["status"] = "failed"
+            self.stats["tasks_failed"] += 1
+            return
+
+        task["result"] = self.replay.lookup(task["payload"]) or {
+            "Worker_1": {"State": "DONE", "Variables": {}},
+            "Worker_2": {"State": "DONE", "Variables": {}},
+        }
+        task["status"] = "completed"
+        task["completed_at"] = time.time()
+        self.stats["tasks_completed"] += 1
+
+    def submit(self, payload):
+        if self.rng.random() < self.submit_failure_rate:
+            self.stats["submissions_rejected"] += 1
+            return 503, {"error": "Simulated submission failure"}
+
+        try:
+            workers = (
+                payload["first-worker"].removesuffix(WORKER_SUFFIX),
+                payload["second-worker"].removesuffix(WORKER_SUFFIX),
+            )
+        except (KeyError, TypeError, AttributeError):
+            return 400, {"error": "Malformed payload"}
+
+        task_id = str(uuid.UUID(int=self.rng.getrandbits(128)))
+        self.tasks[task_id] = {"status": "pending", "payload": payload, "submitted_at": time.time()}
+        self.stats["submissions"] += 1
+        asyncio.get_running_loop().create_task(self._execute(task_id, workers))
+        return 200, {"task_id": task_id}
+
+    def submit_batch(self, payloads):
+        if not isinstance(payloads, list):
+            return 400, {"error": "Expected a list of payloads"}
+        self.stats["batches"] += 1
+        task_ids, errors = [], []
+        for payload in payloads:
+            status, body = self.submit(payload)
+            task_ids.append(body.get("task_id"))
+            errors.append(body.get("error"))
+        return 200, {"task_ids": task_ids, "errors": errors}
+
+    def status(self, task_id):
+        task = self.tasks.get(task_id)
+        self.stats["polls"] += 1
+        if task is None:
+            return 404, {"error": "Unknown task"}
+        body = {"task_id": task_id, "status": task["status"]}
+        if task["status"] == "completed":
+            body["result"] = task["result"]
+        return 200, body
+
+    # --- HTTP plumbing ---
+    async def dispatch(self, method, path, body):
+        await asyncio.sleep(self.latency(self.rng))
+        path = path.split("?", 1)[0].rstrip("/")
+
+        if path == TASK_PATH:
+            if method != "POST":
+                return 405, {"error": "Method not allowed"}
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                return 400, {"error": "Invalid JSON"}
+            return self.submit(payload)
+
+        if path == TASK_PATH + "/batch" and self.batch_enabled:
+            if method != "POST":
+                return 405, {"error": "Method not allowed"}
+            try:
+                payloads = json.loads(body or b"[]")
+            except ValueError:
+                return 400, {"error": "Invalid JSON"}
+            return self.submit_batch(payloads)
+
+        if path.startswith(TASK_PATH + "/"):
+            if method != "GET":
+                return 405, {"error": "Method not allowed"}
+            return self.status(path[len(TASK_PATH) + 1:])
+
+        return 404, {"error": "Not found"}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode("latin-1").split()
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self.dispatch(method, path, body)
+                data = json.dumps(payload).encode()
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765, ready=None):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        if ready is not None:
+            ready(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+
+
+def start_in_thread(standin, host="127.0.0.1", port=0):
+    """Run the stand-in on a background event loop; returns the task URL."""
+    loop = asyncio.new_event_loop()
+    bound = {}
+    started = threading.Event()
+
+    def on_ready(actual_port):
+        bound["port"] = actual_port
+        started.set()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(standin.serve(host, port, ready=on_ready))
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+    return f"http://{host}:{bound['port']}{TASK_PATH}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local NoPASARAN master stand-in for offline and load testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--results", nargs="*", default=["run_*_results.json"], help="Result files (globs) to replay")
+    parser.add_argument("--campaign", help="Campaign file used to match payloads to recorded test IDs")
+    parser.add_argument("--latency", default="const:0", help="Per-request latency, e.g. uniform:0.05,0.3")
+    parser.add_argument("--task-duration", default="lognormal:0.5,0.6", help="Task execution time on the workers")
+    parser.add_argument("--submit-failure-rate", type=float, default=0.0)
+    parser.add_argument("--task-failure-rate", type=float, default=0.0)
+    parser.add_argument("--worker-capacity", type=int, default=1, help="Concurrent tasks per worker")
+    parser.add_argument("--offline-worker", action="append", default=[], help="Worker name whose tasks never complete")
+    parser.add_argument("--no-batch", action="store_true", help="Do not offer the batch submission endpoint")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    replay = ResultReplay(args.results, args.campaign, rng=rng)
+    print(f"📦 Loaded {len(replay)} recorded results for replay")
+
+    standin = MasterStandin(
+        replay=replay,
+        latency=args.latency,
+        task_duration=args.task_duration,
+        submit_failure_rate=args.submit_failure_rate,
+        task_failure_rate=args.task_failure_rate,
+        worker_capacity=args.worker_capacity,
+        offline_workers=args.offline_worker,
+        batch_enabled=not args.no_batch,
+        seed=args.seed,
+    )
+    print(f"🚀 Serving on http://{args.host}:{args.port}{TASK_PATH}")
+    try:
+        asyncio.run(standin.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print(f"\nStats: {dict(standin.stats)}")
+
+
+if __name__ == "__main__":
+    main()
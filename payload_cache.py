@@ -0,0 +1,157 @@
+"""Pre-serialized task payloads for campaign entries.
+
+Payloads are built once per campaign entry and kept as ready-to-send bytes.
+Each worker's fields are serialized once and the shared test parameters once
+per test, then spliced into both worker sections, instead of copying the
+worker dicts and parameters for every test.
+
+The compiled payloads are cached on disk next to the campaign
+(``campaign.yml.payloads``) together with the few fields the runner needs to
+select tests, so later runs skip YAML parsing entirely. The cache is keyed by
+a hash of the campaign file, the master and the tests repository.
+"""
+import hashlib
+import json
+import os
+
+import yaml
+
+FORMAT_VERSION = 2
+
+# Parameters naming the target domain, by test tree
+DOMAIN_FIELDS = ("domain", "hostname", "qname")
+
+
+class PayloadBuilder:
+    def __init__(self, master, repository):
+        self.master = master
+        self.repository = repository
+        self.worker_fragments = {}
+
+    def _fragment(self, fields):
+        # JSON object members without the enclosing braces
+        return json.dumps(dict(fields))[1:-1]
+
+    def _worker_fragment(self, worker, overridden):
+        fields = tuple((k, v) for k, v in worker.items() if k != "parameters" and k not in overridden)
+        try:
+            fragment = self.worker_fragments.get(fields)
+        except TypeError:
+            return self._fragment(fields)
+        if fragment is None:
+            fragment = self.worker_fragments[fields] = self._fragment(fields)
+        return fragment
+
+    def build(self, test):
+        test_name = test.get("name", "unknown_test")
+        params = test["parameters"]
+        controller_conf = params.get("controller_conf_filename")
+        shared_params = {k: v for k, v in params.items() if k != "controller_conf_filename"}
+
+        # Parameters override worker fields of the same name, as in {**worker, **params}
+        overridden = shared_params.keys() | {"controller_conf_filename"}
+        shared = self._fragment([("controller_conf_filename", controller_conf), *shared_params.items()])
+
+        sections = []
+        for worker_key in ("Worker_1", "Worker_2"):
+            worker = self._worker_fragment(test[worker_key], overridden)
+            sections.append("{" + ", ".join(part for part in (worker, shared) if part) + "}")
+
+        header = self._fragment([
+            ("master", self.master),
+            ("first-worker", f"{test['Worker_1']['name']}.admin.worker.nopasaran.org"),
+            ("second-worker", f"{test['Worker_2']['name']}.admin.worker.nopasaran.org"),
+            ("repository", self.repository),
+            ("tests-tree", f"{test_name}.png"),
+        ])
+        return (
+            "{" + header + ', "variables": {"Root": {"Worker_1": ' + sections[0]
+            + ', "Worker_2": ' + sections[1] + "}}}"
+        ).encode()
+
+
+def entry_domain(test):
+    params = test.get("parameters") or {}
+    for field in DOMAIN_FIELDS:
+        if params.get(field):
+            return params[field]
+    request = params.get("request-data")
+    if isinstance(request, dict):
+        return request.get("host")
+    return None
+
+
+def summarize_entry(test):
+    # The fields test selection, scheduling and result logging need
+    return {
+        "id": test.get("id"),
+        "name": test.get("name"),
+        "Worker_1": {"name": test["Worker_1"]["name"]},
+        "Worker_2": {"name": test["Worker_2"]["name"]},
+        "domain": entry_domain(test),
+    }
+
+
+def cache_path(campaign_file):
+    return f"{campaign_file}.payloads"
+
+
+def _cache_key(campaign_bytes, master, repository):
+    digest = hashlib.sha256(campaign_bytes)
+    digest.update(f"\0{master}\0{repository}\0{FORMAT_VERSION}".encode())
+    return digest.hexdigest()
+
+
+def write_payload_cache(path, key, entries, payloads):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(json.dumps({"key": key, "version": FORMAT_VERSION, "count": len(entries)}).encode() + b"\n")
+        for entry in entries:
+            summary = [entry["id"], entry["name"], entry["Worker_1"]["name"], entry["Worker_2"]["name"], entry["domain"]]
+            f.write(json.dumps(summary).encode() + b"\t" + payloads[entry["id"]] + b"\n")
+    os.replace(tmp_path, path)
+
+
+def read_payload_cache(path, key):
+    try:
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            if header.get("key") != key:
+                return None
+            entries, payloads = [], {}
+            for line in f:
+                summary, _, payload = line.rstrip(b"\n").partition(b"\t")
+                test_id, name, worker_1, worker_2, domain = json.loads(summary)
+                entries.append({"id": test_id, "name": name, "Worker_1": {"name": worker_1}, "Worker_2": {"name": worker_2}, "domain": domain})
+                payloads[test_id] = payload
+    except (FileNotFoundError, ValueError):
+        return None
+    return entries, payloads
+
+
+def load_payloads(campaign_file, master, repository, use_cache=True):
+    """Return ``(entries, payloads)`` for a campaign file.
+
+    ``entries`` are light campaign entries (id, name, worker names, domain) and
+    ``payloads`` maps each test ID to its serialized payload bytes.
+    """
+    with open(campaign_file, "rb") as f:
+        campaign_bytes = f.read()
+    key = _cache_key(campaign_bytes, master, repository)
+    path = cache_path(campaign_file)
+
+    if use_cache:
+        cached = read_payload_cache(path, key)
+        if cached is not None:
+            return cached
+
+    builder = PayloadBuilder(master, repository)
+    entries, payloads = [], {}
+    for test in yaml.safe_load(campaign_bytes):
+        entry = summarize_entry(test)
+        entries.append(entry)
+        payloads[entry["id"]] = builder.build(test)
+
+    if use_cache:
+        write_payload_cache(path, key, entries, payloads)
+    return entries, payloads
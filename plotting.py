@@ -0,0 +1,53 @@
+import json
+
+# Unicode subscripts
+subscript_digits = str.maketrans("0123456789", "₀₁₂₃₄₅₆₇₈₉")
+
+
+def load_name_map(path='paper_workers_naming.json'):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def format_worker_name(worker_id, name_map):
+    mapped = name_map.get(worker_id, worker_id)
+    if any(char.isdigit() for char in mapped):
+        base = ''.join([c for c in mapped if not c.isdigit()])
+        digits = ''.join([c for c in mapped if c.isdigit()])
+        return base + digits.translate(subscript_digits)
+    return mapped
+
+
+def draw_status_row(ax, y, statuses, colors, patterns, bar_height, label, fontsize=13):
+    # One hatched cell per classified test, labelled on the left. Consecutive
+    # cells with the same status are drawn as one collection: far fewer artists
+    # to build and draw, in the same order (and with the same joins) as one
+    # patch per cell, so the output is unchanged.
+    from matplotlib.collections import PatchCollection
+    from matplotlib.patches import Rectangle
+
+    runs = []
+    for i, status in enumerate(statuses):
+        if not runs or runs[-1][0] != status:
+            runs.append((status, []))
+        runs[-1][1].append(Rectangle((i, y - bar_height / 2), 1, bar_height))
+    for status, rectangles in runs:
+        ax.add_collection(PatchCollection(
+            rectangles,
+            facecolor=colors.get(status, 'gray'),
+            edgecolor='black',
+            hatch=patterns.get(status, ''),
+            joinstyle='miter',
+            capstyle='butt',
+        ))
+    ax.text(
+        -5, y,
+        label,
+        va='center',
+        ha='right',
+        fontweight='bold',
+        fontsize=fontsize
+    )
@@ -0,0 +1,208 @@
+"""Memory-mapped result archives with random access by test ID.
+
+``run_*_results.json`` files are pretty-printed dicts keyed by test ID, so
+reading a single result means parsing the whole file. An archive
+(``<name>.npra``) stores each entry as its own zlib-compressed JSON blob,
+followed by an index of ``(test ID, offset, length)`` records sorted by ID.
+Readers ``mmap`` the file and binary-search the index, so fetching one entry
+or an ID range only decompresses those entries.
+
+    python result_archive.py pack run_*_results.json       # run_1_udp_dns_results.npra, ...
+    python result_archive.py show run_1_udp_dns_results.npra 2471 2480-2490
+    python result_archive.py unpack run_1_udp_dns_results.npra
+
+Blobs keep the order of the source file, so ``unpack`` restores the original
+JSON byte for byte. Test IDs must be integers.
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import zlib
+
+MAGIC = b"NPRA"
+FORMAT_VERSION = 1
+EXTENSION = ".npra"
+
+# magic, version, entry count, index offset
+HEADER = struct.Struct("<4sHxxQQ")
+# test ID, blob offset, blob length
+INDEX_RECORD = struct.Struct("<QQI")
+
+
+def archive_path(json_path):
+    return os.path.splitext(json_path)[0] + EXTENSION
+
+
+def write_archive(results, path, level=6):
+    """Write a ``{test_id: entry}`` dict as an archive at ``path``."""
+    records = []
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, 0))
+        for test_id, entry in results.items():
+            blob = zlib.compress(json.dumps(entry, separators=(",", ":")).encode(), level)
+            records.append((int(test_id), f.tell(), len(blob)))
+            f.write(blob)
+
+        index_offset = f.tell()
+        records.sort()
+        for i in range(1, len(records)):
+            if records[i][0] == records[i - 1][0]:
+                raise ValueError(f"Duplicate test ID {records[i][0]}")
+        for record in records:
+            f.write(INDEX_RECORD.pack(*record))
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(records), index_offset))
+    os.replace(tmp_path, path)
+
+
+class ResultArchive:
+    """Read-only, dict-like view of an archive (keys are string test IDs)."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self.index_offset = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.map.close()
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} result archive")
+
+    def close(self):
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def _record(self, position):
+        return INDEX_RECORD.unpack_from(self.map, self.index_offset + position * INDEX_RECORD.size)
+
+    def _lower_bound(self, test_id):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._record(middle)[0] < test_id:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _load(self, offset, length):
+        return json.loads(zlib.decompress(self.map[offset:offset + length]))
+
+    def get(self, test_id, default=None):
+        test_id = int(test_id)
+        position = self._lower_bound(test_id)
+        if position < self.count:
+            found, offset, length = self._record(position)
+            if found == test_id:
+                return self._load(offset, length)
+        return default
+
+    def __getitem__(self, test_id):
+        entry = self.get(test_id)
+        if entry is None:
+            raise KeyError(test_id)
+        return entry
+
+    def __contains__(self, test_id):
+        position = self._lower_bound(int(test_id))
+        return position < self.count and self._record(position)[0] == int(test_id)
+
+    def range(self, first, last):
+        """Yield ``(test_id, entry)`` for IDs ``first`` to ``last`` inclusive, in ID order."""
+        for position in range(self._lower_bound(first), self.count):
+            test_id, offset, length = self._record(position)
+            if test_id > last:
+                break
+            yield str(test_id), self._load(offset, length)
+
+    def keys(self):
+        return [str(self._record(position)[0]) for position in range(self.count)]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def items(self):
+        """Yield ``(test_id, entry)`` in the order of the source file."""
+        records = sorted((self._record(position) for position in range(self.count)), key=lambda r: r[1])
+        for test_id, offset, length in records:
+            yield str(test_id), self._load(offset, length)
+
+    def values(self):
+        for _, entry in self.items():
+            yield entry
+
+
+def load_results(path):
+    """Results of a ``run_*_results.json`` file, from its archive when one is up to date.
+
+    Returns a ``ResultArchive`` (dict-like, read-only) or the parsed JSON dict.
+    """
+    packed = archive_path(path)
+    if os.path.exists(packed) and (not os.path.exists(path) or os.path.getmtime(packed) >= os.path.getmtime(path)):
+        return ResultArchive(packed)
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def json_to_archive(json_path, path=None):
+    path = path or archive_path(json_path)
+    with open(json_path, "r") as f:
+        write_archive(json.load(f), path)
+    return path
+
+
+def archive_to_json(path, json_path=None):
+    json_path = json_path or os.path.splitext(path)[0] + ".json"
+    with ResultArchive(path) as archive:
+        results = dict(archive.items())
+    with open(json_path, "w") as f:
+        json.dump(results, f, indent=2)
+    return json_path
+
+
+def parse_id_ranges(specs):
+    for spec in specs:
+        first, _, last = spec.partition("-")
+        yield int(first), int(last or first)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert result files to and from indexed archives, and read entries by test ID.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    pack = subparsers.add_parser("pack", help="Convert run_*_results.json files to archives")
+    pack.add_argument("files", nargs="+")
+    unpack = subparsers.add_parser("unpack", help="Convert archives back to JSON result files")
+    unpack.add_argument("files", nargs="+")
+    show = subparsers.add_parser("show", help="Print entries by test ID or ID range (e.g. 2471 2480-2490)")
+    show.add_argument("archive")
+    show.add_argument("ids", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        for json_path in args.files:
+            path = json_to_archive(json_path)
+            print(f"Packed: {json_path} → {path} ({os.path.getsize(json_path)} → {os.path.getsize(path)} bytes)")
+    elif args.command == "unpack":
+        for path in args.files:
+            print(f"Unpacked: {path} → {archive_to_json(path)}")
+    else:
+        with ResultArchive(args.archive) as archive:
+            entries = {}
+            for first, last in parse_id_ranges(args.ids):
+                entries.update(archive.range(first, last))
+            print(json.dumps(entries, indent=2))
+
+
+if __name__ == "__main__":
+    main()
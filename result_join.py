@@ -0,0 +1,123 @@
+"""Join campaign fields onto result entries.
+
+Each result is matched to its campaign entry by test ID through
+``generator.CampaignIndex`` (no ``campaign.yml`` parsing), and the requested
+fields are added to it as top-level keys. Results are streamed from the
+input (``.json`` or ``.npra``) and written one by one, so memory does not
+grow with the number of results: only the requested parameters of each
+parameter set of the test trees are kept, once for all worker pairs.
+
+    python result_join.py run_1_http_simple_results.json enriched.json
+    python result_join.py run_all_workers_dns_results.json dns.json --fields qname worker=Worker_2.name
+    python result_join.py results.json joined.json --fields host=request-data.host name
+
+A field is ``[alias=]path``. The path is dotted into the campaign entry
+(``name``, ``Worker_1.name``, ``parameters.domain``...); a path that does not
+start with an entry key is read under ``parameters``. ``protocol`` is derived:
+``https`` when ``use_https`` is "1", ``http`` otherwise. Fields missing from
+an entry are null. Results whose ID is not in the campaign are kept as is.
+"""
+import argparse
+from collections import Counter
+
+from generator import CampaignIndex, make_entry
+from result_stream import iter_results, write_json_results
+
+ENTRY_KEYS = ("id", "name", "Worker_1", "Worker_2", "parameters")
+# Parameters make_entry sets from the worker pair
+PAIR_PARAMETERS = ("ip", "identifier")
+
+DERIVED = {
+    "protocol": (("use_https",), lambda entry: "https" if entry["parameters"].get("use_https", "0") == "1" else "http"),
+}
+
+DEFAULT_FIELDS = ("protocol", "hostname")
+
+
+def parse_field(spec):
+    """``(alias, getter, parameter names it reads)`` of a field spec."""
+    alias, _, path = spec.rpartition("=")
+    alias = alias or spec
+    if path in DERIVED:
+        parameters, getter = DERIVED[path]
+        return alias, getter, parameters
+    keys = path.split(".")
+    if keys[0] not in ENTRY_KEYS:
+        keys.insert(0, "parameters")
+
+    def getter(entry):
+        value = entry
+        for key in keys:
+            if not isinstance(value, dict) or key not in value:
+                return None
+            value = value[key]
+        return value
+
+    return alias, getter, keys[1:2] if keys[0] == "parameters" else ()
+
+
+class CampaignJoin:
+    """Adds the projected campaign fields of each result's test ID to the result."""
+
+    def __init__(self, fields=DEFAULT_FIELDS, index=None):
+        self.index = index or CampaignIndex.load()
+        self.fields = [parse_field(spec) for spec in fields]
+        self.parameters = {name for _, _, names in self.fields for name in names} | set(PAIR_PARAMETERS)
+        # (test tree, offset) -> the requested parameters of that parameter set
+        self.projected = {}
+        self.stats = Counter()
+
+    def shared_parameters(self, t, offset):
+        key = (t, offset)
+        if key not in self.projected:
+            params = self.index.space(t)[offset]
+            self.projected[key] = {name: params[name] for name in self.parameters if name in params}
+        return self.projected[key]
+
+    def fields_of(self, test_id):
+        """``{alias: value}`` of a test ID; KeyError if it is not in the campaign."""
+        p, t, offset = self.index.locate(int(test_id))
+        i, j, _ = self.index.pairs[p]
+        pair = {"Worker_1": self.index.workers[i], "Worker_2": self.index.workers[j]}
+        entry = make_entry(pair, self.index.test_cases[t], self.shared_parameters(t, offset), int(test_id))
+        return {alias: getter(entry) for alias, getter, _ in self.fields}
+
+    def __call__(self, items):
+        """Yield ``(test_id, entry)`` pairs with the fields added."""
+        for test_id, entry in items:
+            self.stats["read"] += 1
+            try:
+                fields = self.fields_of(test_id)
+            except (KeyError, ValueError):
+                self.stats["unmatched"] += 1
+            else:
+                entry.update(fields)
+            yield test_id, entry
+
+
+def join_file(input_path, output_path, fields=DEFAULT_FIELDS, index=None):
+    """Write the results of ``input_path`` with campaign fields to ``output_path``; return the counts."""
+    join = CampaignJoin(fields, index)
+    join.stats["written"] = write_json_results(output_path, join(iter_results(input_path)))
+    return join.stats
+
+
+def main(default_input=None, default_output=None):
+    parser = argparse.ArgumentParser(description="Add campaign fields (protocol, hostname, any parameter) to result entries.")
+    parser.add_argument("input", nargs=None if default_input is None else "?", default=default_input, help="Results file (.json or .npra)")
+    parser.add_argument("output", nargs=None if default_output is None else "?", default=default_output, help="Output JSON file (may be the input)")
+    parser.add_argument("--fields", nargs="+", default=list(DEFAULT_FIELDS), metavar="[ALIAS=]PATH",
+                        help="Campaign fields to add (default: %(default)s)")
+    parser.add_argument("--profiles", default="./profiles")
+    parser.add_argument("--tests", default="./tests-trees")
+    args = parser.parse_args()
+
+    stats = join_file(args.input, args.output, args.fields, CampaignIndex.load(args.profiles, args.tests))
+    if stats["unmatched"]:
+        print(f"⚠️  {stats['unmatched']} results have no entry in the campaign and were left as is")
+    aliases = ", ".join(parse_field(spec)[0] for spec in args.fields)
+    print(f"✅ {stats['written']} results with {aliases} saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Worker pair × domain × run matrix of classification codes.
+
+The analysis scripts regroup results by pair on every run and infer the
+domain from the order of test IDs. A ``ResultMatrix`` does that once: test IDs
+are mapped to their (worker pair, domain) cell through the campaign
+(``generator.CampaignIndex``, no ``campaign.yml`` parsing), each run file is
+classified (through the classification cache) and the labels are stored as
+small integer codes in a dense ``(pairs, domains, runs)`` numpy array.
+Missing results are ``MISSING``.
+
+    python result_matrix.py build udp_dns_qname_prober run_*_udp_dns_results.json -o dns.npz
+    python result_matrix.py blocked dns.npz --through RB2
+
+Slicing queries are array operations, e.g. the domains blocked on every pair
+through a worker, and ``statuses_by_pair`` returns the per-pair label rows the
+plotting code draws.
+"""
+import argparse
+import json
+
+import numpy as np
+
+from classification_cache import ClassificationCache
+from classifiers import MATCH_LABELS, RUN_CLASSIFIERS
+from generator import CampaignIndex
+from payload_cache import entry_domain
+from plotting import load_name_map
+
+MISSING = -1
+
+
+class ResultMatrix:
+    def __init__(self, test_name, pairs, domains, runs, labels, codes):
+        self.test_name = test_name
+        self.pairs = pairs
+        self.domains = domains
+        self.runs = runs
+        self.labels = labels
+        self.codes = codes
+
+    @classmethod
+    def build(cls, test_name, result_files, protocol=None, classifier=None, index=None, cache=None):
+        """Build the matrix of ``test_name`` from one results file per run.
+
+        ``http_simple_request`` has an HTTP and an HTTPS test per domain:
+        ``protocol`` ("HTTP" or "HTTPS") selects one of them.
+        """
+        if test_name == "http_simple_request" and protocol not in ("HTTP", "HTTPS"):
+            raise ValueError("http_simple_request needs protocol='HTTP' or 'HTTPS'")
+        index = index or CampaignIndex.load()
+        classifier = classifier or RUN_CLASSIFIERS[test_name]
+
+        # Offsets within a pair's block of tests -> domain column (same for every pair)
+        t = next(t for t, test in enumerate(index.test_cases) if test["name"] == test_name)
+        space = index.space(t)
+        domains, domain_columns, columns = [], {}, {}
+        for offset in range(len(space)):
+            params = space[offset]
+            if protocol and params.get("use_https") != ("1" if protocol == "HTTPS" else "0"):
+                continue
+            domain = entry_domain({"parameters": params})
+            if domain not in domain_columns:
+                domain_columns[domain] = len(domains)
+                domains.append(domain)
+            columns[offset] = domain_columns[domain]
+
+        pairs, cells = [], {}
+        for worker_1, worker_2 in index.pair_index:
+            ids = index.ids(test_name, worker_1, worker_2)
+            if not ids:
+                continue
+            for offset, column in columns.items():
+                cells[ids[offset]] = (len(pairs), column)
+            pairs.append((worker_1, worker_2))
+
+        labels, label_codes = [], {}
+        codes = np.full((len(pairs), len(domains), len(result_files)), MISSING, dtype=np.int8)
+        with (cache or ClassificationCache()) as cache:
+            for run, path in enumerate(result_files):
+                for test_id, label in cache.classify_file(path, classifier).items():
+                    cell = cells.get(int(test_id))
+                    if cell is None:
+                        continue
+                    if label not in label_codes:
+                        label_codes[label] = len(labels)
+                        labels.append(label)
+                    codes[cell[0], cell[1], run] = label_codes[label]
+        return cls(test_name, pairs, domains, list(result_files), labels, codes)
+
+    def save(self, path):
+        meta = {"test_name": self.test_name, "pairs": self.pairs, "domains": self.domains, "runs": self.runs, "labels": self.labels}
+        np.savez_compressed(path, codes=self.codes, meta=np.array(json.dumps(meta)))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            codes = data["codes"]
+        return cls(meta["test_name"], [tuple(p) for p in meta["pairs"]], meta["domains"], meta["runs"], meta["labels"], codes)
+
+    # --- Queries ---
+    def code(self, label):
+        return self.labels.index(label) if label in self.labels else MISSING - 1
+
+    def where(self, label):
+        """Boolean ``(pairs, domains, runs)`` mask of cells with ``label``."""
+        return self.codes == self.code(label)
+
+    def observed(self):
+        return self.codes != MISSING
+
+    def pairs_through(self, worker):
+        """Boolean mask over pairs with ``worker`` on either side."""
+        return np.array([worker in pair for pair in self.pairs], dtype=bool)
+
+    def blocked(self, match_label=None, blocked_fraction=0.75):
+        """Boolean ``(pairs, domains)`` verdicts: share of non-matching observed
+        runs at least ``blocked_fraction`` (the synthesis "≥ 3 of 4" rule)."""
+        match_label = match_label or MATCH_LABELS[self.test_name]
+        observed = self.observed()
+        non_matches = (observed & ~self.where(match_label)).sum(axis=2)
+        runs = observed.sum(axis=2)
+        return (runs > 0) & (non_matches >= blocked_fraction * runs)
+
+    def domains_blocked_on_all(self, worker=None, **kwargs):
+        """Domains blocked on every pair (through ``worker``, if given) that observed them.
+
+        Pairs without any result for a domain do not count for or against
+        it; a domain no pair observed is not listed.
+        """
+        verdicts = self.blocked(**kwargs)
+        observed = self.observed().any(axis=2)
+        if worker is not None:
+            through = self.pairs_through(worker)
+            verdicts, observed = verdicts[through], observed[through]
+        if not len(verdicts):
+            return []
+        blocked = (verdicts | ~observed).all(axis=0) & observed.any(axis=0)
+        return [self.domains[d] for d in np.flatnonzero(blocked)]
+
+    def statuses_by_pair(self, run=0, observed_only=False):
+        """``{pair: [label per domain]}`` of one run, in domain order, for ``draw_status_row``.
+
+        Cells without a result are "Missing"; ``observed_only`` leaves out
+        pairs without any result in the run.
+        """
+        names = self.labels + ["Missing"]
+        rows = {}
+        for p, pair in enumerate(self.pairs):
+            codes = self.codes[p, :, run]
+            if observed_only and (codes == MISSING).all():
+                continue
+            rows[pair] = [names[code] for code in codes]
+        return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query worker pair × domain × run classification matrices.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Build a matrix from run result files (one per run, in order)")
+    build.add_argument("test_name", choices=sorted(RUN_CLASSIFIERS))
+    build.add_argument("files", nargs="+")
+    build.add_argument("--protocol", choices=("HTTP", "HTTPS"), help="Variant of http_simple_request")
+    build.add_argument("-o", "--output", required=True)
+    blocked = subparsers.add_parser("blocked", help="List domains blocked on all pairs (through a worker)")
+    blocked.add_argument("matrix")
+    blocked.add_argument("--through", help="Worker name or paper name (e.g. RB2)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        matrix = ResultMatrix.build(args.test_name, args.files, protocol=args.protocol)
+        matrix.save(args.output)
+        print(f"✅ {len(matrix.pairs)} pairs × {len(matrix.domains)} domains × {len(matrix.runs)} runs saved to {args.output}")
+    else:
+        matrix = ResultMatrix.load(args.matrix)
+        worker = args.through
+        if worker:
+            # Accept the paper names of paper_workers_naming.json
+            worker = {paper: name for name, paper in load_name_map().items()}.get(worker, worker)
+        domains = matrix.domains_blocked_on_all(worker)
+        where = f" through {args.through}" if args.through else ""
+        print(f"{len(domains)} domain(s) blocked on all {matrix.test_name} pairs{where}:")
+        for domain in domains:
+            print(f"  {domain}")
+
+
+if __name__ == "__main__":
+    main()
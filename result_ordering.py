@@ -1,29 +1,178 @@
-import os
-import json
+"""Sort result files by test ID with bounded memory.
+
+Entries are streamed from each file (``result_stream``) and rendered as they
+will be written. Up to ``--memory`` megabytes of them are sorted at a time
+and spilled to a temporary run file; the runs are then merged into the
+output, which replaces the input atomically. Files are sorted in parallel.
+
+A file that is already in order is not rewritten. The size and modification
+time of every file found or left sorted are recorded in ``.result_order.json``,
+so later calls skip it without reading it until it changes.
+
+    python result_ordering.py                       # every run*.json
+    python result_ordering.py run_1_*.json --jobs 4 --memory 256
+"""
+import argparse
 import glob
+import heapq
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
-def sort_json_by_id(filepath):
-    with open(filepath, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+from result_stream import entry_text, iter_json_results, write_json_results
 
-    # Convert keys to integers for sorting, then back to strings for JSON
-    sorted_data = {
-        str(k): data[str(k)]
-        for k in sorted((int(key) for key in data.keys()))
-    }
+MARKER_FILE = ".result_order.json"
+MEMORY = 64 << 20
+# Run files merged at once; more runs are merged in several passes
+FAN_IN = 64
 
-    # Overwrite the file with sorted content
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(sorted_data, f, indent=2)
-    print(f"Sorted: {filepath}")
 
-def main():
-    json_files = glob.glob("run*.json")
-    for filepath in json_files:
+def _write_run(directory, members):
+    members.sort(key=lambda member: member[0])
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".run")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        for test_id, text in members:
+            f.write(f"{test_id}\t{json.dumps(text)}\n")
+    return path
+
+
+def _read_run(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            test_id, _, text = line.partition("\t")
+            yield int(test_id), json.loads(text)
+
+
+def _merge_runs(directory, runs):
+    # Merge passes until one heap merge over at most FAN_IN runs remains
+    while len(runs) > FAN_IN:
+        merged = []
+        for start in range(0, len(runs), FAN_IN):
+            group = runs[start:start + FAN_IN]
+            fd, path = tempfile.mkstemp(dir=directory, suffix=".run")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for test_id, text in heapq.merge(*map(_read_run, group), key=lambda member: member[0]):
+                    f.write(f"{test_id}\t{json.dumps(text)}\n")
+            for run in group:
+                os.remove(run)
+            merged.append(path)
+        runs = merged
+    return heapq.merge(*map(_read_run, runs), key=lambda member: member[0])
+
+
+def sorted_members(items, directory=None, memory=MEMORY):
+    """Render ``(test_id, entry)`` pairs and yield them in test ID order.
+
+    At most about ``memory`` bytes of rendered entries are held at once; the
+    rest is spilled to run files in ``directory`` (default: the system's
+    temporary directory), removed when the generator finishes.
+    """
+    with tempfile.TemporaryDirectory(dir=directory, prefix=".sort-") as tmp:
+        runs, members, size = [], [], 0
+        for test_id, entry in items:
+            text = entry_text(test_id, entry)
+            members.append((int(test_id), text))
+            size += len(text)
+            if size >= memory:
+                runs.append(_write_run(tmp, members))
+                members, size = [], 0
+        if not runs:
+            members.sort(key=lambda member: member[0])
+            yield from (text for _, text in members)
+            return
+        if members:
+            runs.append(_write_run(tmp, members))
+        del members
+        yield from (text for _, text in _merge_runs(tmp, runs))
+
+
+def is_sorted(path):
+    """Whether the test IDs of a results file are in increasing order (stops at the first that is not)."""
+    last = None
+    for test_id, _ in iter_json_results(path):
+        number = int(test_id)
+        if last is not None and number < last:
+            return False
+        last = number
+    return True
+
+
+def sort_results(path, memory=MEMORY):
+    """Sort a results file in place unless it is already sorted; return True if it was rewritten."""
+    if is_sorted(path):
+        return False
+    directory = os.path.dirname(os.path.abspath(path))
+    write_json_results(path, sorted_members(iter_json_results(path), directory, memory))
+    return True
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _sort(args):
+    path, memory = args
+    try:
+        return path, sort_results(path, memory), None
+    except (OSError, ValueError) as e:
+        return path, False, e
+
+
+class OrderMarkers:
+    """Signatures of the files known to be sorted, in ``.result_order.json``."""
+
+    def __init__(self, path=MARKER_FILE):
+        self.path = path
         try:
-            sort_json_by_id(filepath)
-        except Exception as e:
-            print(f"Error processing {filepath}: {e}")
+            with open(path, "r") as f:
+                self.files = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.files = {}
+
+    def is_sorted(self, path):
+        return self.files.get(os.path.abspath(path)) == _signature(path)
+
+    def mark(self, path):
+        self.files[os.path.abspath(path)] = _signature(path)
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.files, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sort result files by test ID.")
+    parser.add_argument("files", nargs="*", help="JSON result files (default: run*.json)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Files sorted in parallel (default: CPU count)")
+    parser.add_argument("--memory", type=int, default=MEMORY >> 20, help="Megabytes of entries sorted in memory per file (default: %(default)s)")
+    parser.add_argument("--force", action="store_true", help="Check files even if marked as sorted")
+    args = parser.parse_args()
+
+    markers = OrderMarkers()
+    paths = args.files or sorted(glob.glob("run*.json"))
+    pending = [path for path in paths if args.force or not markers.is_sorted(path)]
+    for path in sorted(set(paths) - set(pending)):
+        print(f"Already sorted: {path}")
+
+    tasks = [(path, args.memory << 20) for path in pending]
+    if args.jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(args.jobs) as pool:
+            outcomes = list(pool.map(_sort, tasks))
+    else:
+        outcomes = list(map(_sort, tasks))
+
+    for path, rewritten, error in outcomes:
+        if error:
+            print(f"Error processing {path}: {error}")
+            continue
+        markers.mark(path)
+        print(f"Sorted: {path}" if rewritten else f"Already sorted: {path}")
+    markers.save()
+
 
 if __name__ == "__main__":
     main()
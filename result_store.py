@@ -0,0 +1,178 @@
+"""Content-addressed store of result files with shared sub-trees.
+
+Many results are structurally identical apart from a few fields: DNS
+``EXCHANGE_SYNC`` results with ``received: null``, the ``ready_stop``
+signaling variables of every worker, the same HTTP responses across pairs and
+runs. The store splits every entry into its dicts and lists, hashes each one
+from its own content and the hashes of its children, and keeps each unique
+sub-tree once, however many entries and runs contain it.
+
+A store holds any number of runs, each named after its source file:
+
+    python result_store.py add results.store.json run_*_results.json
+    python result_store.py stats results.store.json
+    python result_store.py extract results.store.json run_1_udp_dns_results
+
+Stored objects keep their key order, so ``extract`` writes the original JSON
+back byte for byte. ``ResultStore.classify`` runs a classifier once per
+distinct ``(status, result)`` sub-tree instead of once per entry.
+"""
+import argparse
+import hashlib
+import json
+import os
+
+FORMAT_VERSION = 1
+
+# A child sub-tree inside a stored object
+REF = "$ref"
+
+
+def _digest(encoded):
+    return hashlib.blake2b(json.dumps(encoded, separators=(",", ":")).encode(), digest_size=16).hexdigest()
+
+
+class ResultStore:
+    def __init__(self, objects=None, runs=None):
+        # hash -> dict/list whose container children are {"$ref": hash}
+        self.objects = objects or {}
+        # run name -> {test_id: hash of the entry}
+        self.runs = runs or {}
+        # classifier -> {(status, result hash): label}, shared by all runs
+        self.labels = {}
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "r") as f:
+            data = json.load(f)
+        if data.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} result store")
+        return cls(data["objects"], data["runs"])
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": FORMAT_VERSION, "objects": self.objects, "runs": self.runs}, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    # --- Writing ---
+    def put(self, value):
+        """Store a JSON value's sub-trees; return its hash (``None`` for scalars)."""
+        if isinstance(value, dict):
+            encoded = {key: self._child(child) for key, child in value.items()}
+        elif isinstance(value, list):
+            encoded = [self._child(child) for child in value]
+        else:
+            return None
+        digest = _digest(encoded)
+        self.objects.setdefault(digest, encoded)
+        return digest
+
+    def _child(self, value):
+        if isinstance(value, (dict, list)):
+            return {REF: self.put(value)}
+        return value
+
+    def add_run(self, name, results):
+        replaced = name in self.runs
+        self.runs[name] = {test_id: self.put(entry) for test_id, entry in results.items()}
+        if replaced:
+            self.prune()
+
+    def prune(self):
+        """Drop sub-trees no stored run refers to any more."""
+        reachable = set()
+        pending = [digest for run in self.runs.values() for digest in run.values()]
+        while pending:
+            digest = pending.pop()
+            if digest in reachable:
+                continue
+            reachable.add(digest)
+            encoded = self.objects[digest]
+            children = encoded.values() if isinstance(encoded, dict) else encoded
+            pending.extend(child[REF] for child in children if isinstance(child, dict))
+        self.objects = {digest: encoded for digest, encoded in self.objects.items() if digest in reachable}
+
+    # --- Reading ---
+    def get(self, digest):
+        encoded = self.objects[digest]
+        if isinstance(encoded, dict):
+            return {key: self._resolve(child) for key, child in encoded.items()}
+        return [self._resolve(child) for child in encoded]
+
+    def _resolve(self, child):
+        if isinstance(child, dict):
+            return self.get(child[REF])
+        return child
+
+    def run(self, name):
+        """The ``{test_id: entry}`` dict of a stored run, as in its source file."""
+        return {test_id: self.get(digest) for test_id, digest in self.runs[name].items()}
+
+    def entry(self, name, test_id):
+        return self.get(self.runs[name][str(test_id)])
+
+    def classify(self, name, classifier):
+        """Map each test ID of a run to its label, classifying each distinct
+        ``(status, result)`` once across all runs of the store.
+
+        Only valid for classifiers that read nothing but ``status`` and
+        ``result``, as those in ``classifiers.py``.
+        """
+        labels = {}
+        memo = self.labels.setdefault(classifier, {})
+        for test_id, digest in self.runs[name].items():
+            encoded = self.objects[digest]
+            status, result = encoded.get("status"), encoded.get("result")
+            key = (status, result[REF] if isinstance(result, dict) else result)
+            if key not in memo:
+                entry = {"status": status}
+                if "result" in encoded:
+                    entry["result"] = self._resolve(result)
+                memo[key] = classifier(entry)
+            labels[test_id] = memo[key]
+        return labels
+
+    def stats(self):
+        entries = sum(len(run) for run in self.runs.values())
+        return {"runs": len(self.runs), "entries": entries, "unique_objects": len(self.objects)}
+
+
+def run_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deduplicate result files into a content-addressed store.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    add = subparsers.add_parser("add", help="Add (or replace) runs from run_*_results.json files")
+    add.add_argument("store")
+    add.add_argument("files", nargs="+")
+    extract = subparsers.add_parser("extract", help="Write stored runs back as <run>.json")
+    extract.add_argument("store")
+    extract.add_argument("runs", nargs="+")
+    stats = subparsers.add_parser("stats", help="Print run, entry and unique sub-tree counts")
+    stats.add_argument("store")
+    args = parser.parse_args()
+
+    store = ResultStore.load(args.store)
+    if args.command == "add":
+        for path in args.files:
+            with open(path, "r") as f:
+                store.add_run(run_name(path), json.load(f))
+        store.save(args.store)
+        sources = sum(os.path.getsize(path) for path in args.files)
+        print(f"✅ {len(args.files)} run(s) added: {sources} bytes of JSON, store is {os.path.getsize(args.store)} bytes")
+    elif args.command == "extract":
+        for name in args.runs:
+            with open(f"{name}.json", "w") as f:
+                json.dump(store.run(name), f, indent=2)
+            print(f"Extracted: {name}.json")
+    else:
+        print(json.dumps(store.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Streaming reads of result files, one entry at a time.
+
+``json.load`` holds a whole ``run_*_results.json`` in memory (several times
+its size on disk). ``iter_results`` yields ``(test_id, entry)`` pairs from
+the top-level object of a results file instead. The file is read in chunks,
+and each entry is decoded as soon as it is complete, so memory stays bounded
+by the largest entry. Result archives (``.npra``) are read through
+``ResultArchive``. ``write_json_results`` writes entries back one at a time,
+in the layout of ``json.dump(results, f, indent=2)``, to a temporary file
+that replaces the target only once complete.
+
+    for test_id, entry in iter_results("run_1_udp_dns_results.json"):
+        ...
+"""
+import json
+import os
+from json.decoder import WHITESPACE
+
+from result_archive import EXTENSION, ResultArchive
+
+CHUNK_SIZE = 1 << 20
+
+_decoder = json.JSONDecoder()
+
+
+class _Buffer:
+    """A window over a text file that grows on demand and drops consumed text."""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def more(self):
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop what was consumed before growing the window
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def skip_whitespace(self):
+        while True:
+            self.pos = WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text) or not self.more():
+                return
+
+    def peek(self):
+        self.skip_whitespace()
+        return self.text[self.pos] if self.pos < len(self.text) else ""
+
+    def expect(self, char, path):
+        if self.peek() != char:
+            raise ValueError(f"{path}: expected {char!r} in a results object")
+        self.pos += 1
+
+    def decode(self):
+        """Decode the next JSON value, reading more of the file until it is complete."""
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if self.more():
+                    continue
+                raise
+            # A value ending exactly at the window's edge (e.g. a number) may go on
+            if end == len(self.text) and self.more():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_results(path, chunk_size=CHUNK_SIZE):
+    """Yield ``(test_id, entry)`` from the top-level object of a JSON results file, in file order."""
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = _Buffer(f, chunk_size)
+        buffer.expect("{", path)
+        if buffer.peek() == "}":
+            return
+        while True:
+            test_id = buffer.decode()
+            buffer.expect(":", path)
+            yield test_id, buffer.decode()
+            if buffer.peek() == ",":
+                buffer.pos += 1
+                continue
+            buffer.expect("}", path)
+            return
+
+
+def iter_results(path, chunk_size=CHUNK_SIZE):
+    """Yield ``(test_id, entry)`` from a results file (``.json``) or a result archive (``.npra``)."""
+    if path.endswith(EXTENSION):
+        with ResultArchive(path) as archive:
+            yield from archive.items()
+    else:
+        yield from iter_json_results(path, chunk_size)
+
+
+def entry_text(test_id, entry):
+    """One member of a results object as ``json.dump(..., indent=2)`` writes it."""
+    # Strings never contain raw newlines in JSON, so re-indenting is safe
+    return f'  {json.dumps(str(test_id))}: ' + json.dumps(entry, indent=2).replace("\n", "\n  ")
+
+
+def write_json_results(path, items):
+    """Write ``(test_id, entry)`` pairs as a results file; return the number written.
+
+    ``items`` may also yield pre-rendered members (``entry_text``) as plain
+    strings. The file at ``path`` is replaced atomically, so it may be one of
+    the inputs being read.
+    """
+    count = 0
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for item in items:
+                f.write(",\n" if count else "{\n")
+                f.write(item if isinstance(item, str) else entry_text(*item))
+                count += 1
+            f.write("\n}" if count else "{}")
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
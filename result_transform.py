@@ -0,0 +1,194 @@
+"""Streaming transforms over result files.
+
+A transform is a chain of operations applied to every ``(test_id, entry)``
+of a results file in a single streaming pass. The output is written next
+to the input and renamed over it, or written to ``--output-dir``, only once
+complete. Files are processed in parallel.
+
+    # Drop every result involving a worker, across the whole results directory
+    python result_transform.py run_*.json --exclude-workers alyanetalyrz4 --jobs 4
+    # Keep only results between workers that still have a profile
+    python result_transform.py run_all_workers_*.json --keep-profile-workers
+    # Renumber results after regenerating the campaign, then sort by ID
+    python result_transform.py run_*.json --remap-campaigns old_campaign.yml campaign.yml --sort
+    # Count what would change
+    python result_transform.py run_*.json --exclude-tests https_sni --exclude-ids 1-100 --dry-run
+
+Operations run in the order above (filters, remap, sort), whatever the
+order of the options.
+"""
+import argparse
+import json
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from result_archive import parse_id_ranges
+from result_ordering import sorted_members
+from result_stream import iter_json_results, write_json_results
+
+
+class ExcludeWorkers:
+    """Drop results with one of ``workers`` on either side."""
+
+    name = "excluded_workers"
+
+    def __init__(self, workers):
+        self.workers = frozenset(workers)
+
+    def __call__(self, test_id, entry):
+        if entry.get("worker_1") in self.workers or entry.get("worker_2") in self.workers:
+            return None
+        return test_id, entry
+
+
+class KeepWorkers:
+    """Drop results with a worker outside ``workers`` on either side."""
+
+    name = "unknown_workers"
+
+    def __init__(self, workers):
+        self.workers = frozenset(workers)
+
+    def __call__(self, test_id, entry):
+        if entry.get("worker_1") in self.workers and entry.get("worker_2") in self.workers:
+            return test_id, entry
+        return None
+
+
+class ExcludeTests:
+    """Drop results of the named test trees and of the given test ID ranges."""
+
+    name = "excluded_tests"
+
+    def __init__(self, test_names=(), id_ranges=()):
+        self.test_names = frozenset(test_names)
+        self.id_ranges = tuple(id_ranges)
+
+    def __call__(self, test_id, entry):
+        if entry.get("test_name") in self.test_names:
+            return None
+        if self.id_ranges and str(test_id).isdigit():
+            number = int(test_id)
+            if any(first <= number <= last for first, last in self.id_ranges):
+                return None
+        return test_id, entry
+
+
+class RemapIds:
+    """Renumber results through an ``{old ID: new ID}`` mapping; unmapped results are dropped."""
+
+    name = "unmapped_ids"
+
+    def __init__(self, mapping):
+        self.mapping = {str(old): str(new) for old, new in mapping.items()}
+
+    def __call__(self, test_id, entry):
+        new_id = self.mapping.get(str(test_id))
+        return (new_id, entry) if new_id is not None else None
+
+
+class Transform:
+    """Operations applied in order to each entry, optionally followed by a sort by ID."""
+
+    def __init__(self, operations, sort=False):
+        self.operations = list(operations)
+        self.sort = sort
+
+    def entries(self, path, stats):
+        for item in iter_json_results(path):
+            stats["read"] += 1
+            for operation in self.operations:
+                item = operation(*item)
+                if item is None:
+                    stats[operation.name] += 1
+                    break
+            else:
+                yield item
+
+    def apply(self, path, output=None, dry_run=False):
+        """Transform ``path`` into ``output`` (default: in place); return the counts."""
+        stats = Counter()
+        entries = self.entries(path, stats)
+        if self.sort:
+            entries = sorted_members(entries, os.path.dirname(os.path.abspath(output or path)))
+        if dry_run:
+            stats["written"] = sum(1 for _ in entries)
+        else:
+            stats["written"] = write_json_results(output or path, entries)
+        return stats
+
+
+def _apply(args):
+    transform, path, output, dry_run = args
+    return path, transform.apply(path, output, dry_run)
+
+
+def apply_all(transform, paths, output_dir=None, jobs=1, dry_run=False):
+    """Run ``transform`` over many files; yield ``(path, counts)`` as they finish, in order."""
+    tasks = [(transform, path, os.path.join(output_dir, os.path.basename(path)) if output_dir else None, dry_run) for path in paths]
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(jobs) as pool:
+            yield from pool.map(_apply, tasks)
+    else:
+        yield from map(_apply, tasks)
+
+
+def profile_worker_names(profiles_folder="./profiles"):
+    # The same profiles (generator.PROFILE_EXTENSIONS) the generator reads
+    from generator import read_workers
+    return {worker["name"] for worker in read_workers(profiles_folder) if worker.get("name")}
+
+
+def campaign_id_mapping(old_campaign_file, new_campaign_file):
+    from campaign_mapping import build_id_mapping, load_campaign
+    mapping, _ = build_id_mapping(load_campaign(old_campaign_file), load_campaign(new_campaign_file))
+    return mapping
+
+
+def build_transform(args):
+    operations = []
+    if args.exclude_workers:
+        operations.append(ExcludeWorkers(args.exclude_workers))
+    if args.keep_profile_workers:
+        operations.append(KeepWorkers(profile_worker_names(args.keep_profile_workers)))
+    if args.exclude_tests or args.exclude_ids:
+        operations.append(ExcludeTests(args.exclude_tests or (), parse_id_ranges(args.exclude_ids or ())))
+    if args.remap:
+        with open(args.remap, "r") as f:
+            operations.append(RemapIds(json.load(f)))
+    if args.remap_campaigns:
+        operations.append(RemapIds(campaign_id_mapping(*args.remap_campaigns)))
+    return Transform(operations, sort=args.sort)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filter, renumber and sort result files in one streaming pass per file.")
+    parser.add_argument("files", nargs="+", help="JSON result files")
+    parser.add_argument("--exclude-workers", nargs="+", metavar="WORKER", help="Drop results involving these workers")
+    parser.add_argument("--keep-profile-workers", nargs="?", const="./profiles", metavar="DIR",
+                        help="Drop results involving workers without a profile in DIR (default: ./profiles)")
+    parser.add_argument("--exclude-tests", nargs="+", metavar="TEST", help="Drop results of these test trees")
+    parser.add_argument("--exclude-ids", nargs="+", metavar="RANGE", help="Drop these test IDs or ranges (e.g. 17 100-200)")
+    parser.add_argument("--remap", metavar="JSON", help="Renumber results through an {old: new} ID mapping file")
+    parser.add_argument("--remap-campaigns", nargs=2, metavar=("OLD", "NEW"), help="Renumber results from one campaign file to another")
+    parser.add_argument("--sort", action="store_true", help="Sort results by test ID")
+    parser.add_argument("--output-dir", help="Write here instead of replacing the input files")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Files processed in parallel (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true", help="Only count what would be written")
+    args = parser.parse_args()
+
+    transform = build_transform(args)
+    if not transform.operations and not transform.sort:
+        parser.error("no operation given")
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    for path, stats in apply_all(transform, args.files, args.output_dir, args.jobs, args.dry_run):
+        dropped = ", ".join(f"{stats[op.name]} {op.name.replace('_', ' ')}" for op in transform.operations if stats[op.name])
+        verb = "Would write" if args.dry_run else "Wrote"
+        print(f"{path}: read {stats['read']}, {verb.lower()} {stats['written']}" + (f" (dropped {dropped})" if dropped else ""))
+
+
+if __name__ == "__main__":
+    main()
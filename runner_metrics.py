@@ -0,0 +1,211 @@
+"""Runner instrumentation: latency histograms, counters and exporters.
+
+Metrics are kept in memory and exported in the Prometheus text format, either
+as a file (for node_exporter's textfile collector or plain inspection) or over
+a small HTTP endpoint, and summarised at the end of a run.
+"""
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+POLL_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, value, **labels):
+        key = tuple((name, labels.get(name, "")) for name in self.label_names)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series["buckets"][i] += 1
+        series["sum"] += value
+        series["count"] += 1
+
+    def quantile(self, q, **labels):
+        # Upper bound of the bucket holding the q-th observation
+        key = tuple((name, labels.get(name, "")) for name in self.label_names)
+        series = self.series.get(key)
+        if not series or not series["count"]:
+            return None
+        rank = q * series["count"]
+        for bound, cumulative in zip(self.buckets, series["buckets"]):
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.series.items()):
+            for bound, cumulative in zip(self.buckets, series["buckets"]):
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', bound),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {series['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series['sum']:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.values = defaultdict(float)
+
+    def inc(self, amount=1, **labels):
+        self.values[tuple((name, labels.get(name, "")) for name in self.label_names)] += amount
+
+    def total(self):
+        return sum(self.values.values())
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value:g}")
+        return lines
+
+
+class RunnerMetrics:
+    STAGES = ("build", "submit", "queue", "poll", "total")
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.lock = threading.Lock()
+        self.stage_seconds = Histogram(
+            "nopasaran_runner_stage_seconds",
+            "Time spent per runner stage and test tree.",
+            ("stage", "test_name"),
+        )
+        self.polls_per_test = Histogram(
+            "nopasaran_runner_polls_per_test",
+            "Status polls issued per test.",
+            ("test_name",),
+            buckets=POLL_BUCKETS,
+        )
+        self.submissions = Counter("nopasaran_runner_submissions_total", "Tasks submitted to the master.", ("test_name",))
+        self.results = Counter("nopasaran_runner_results_total", "Logged results by status.", ("test_name", "status"))
+        self.errors = Counter("nopasaran_runner_errors_total", "Errors by class.", ("test_name", "error_class"))
+
+    @contextmanager
+    def time_stage(self, stage, test_name, timing=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, test_name, time.perf_counter() - start, timing)
+
+    def observe_stage(self, stage, test_name, seconds, timing=None):
+        with self.lock:
+            self.stage_seconds.observe(seconds, stage=stage, test_name=test_name)
+        if timing is not None:
+            timing[stage] = round(seconds, 6)
+
+    def record_submission(self, test_name):
+        with self.lock:
+            self.submissions.inc(test_name=test_name)
+
+    def record_polls(self, test_name, polls):
+        with self.lock:
+            self.polls_per_test.observe(polls, test_name=test_name)
+
+    def record_error(self, test_name, error_class):
+        with self.lock:
+            self.errors.inc(test_name=test_name, error_class=error_class)
+
+    def record_result(self, test_name, status):
+        with self.lock:
+            self.results.inc(test_name=test_name, status=status)
+
+    def submissions_per_second(self):
+        elapsed = time.time() - self.started_at
+        return self.submissions.total() / elapsed if elapsed > 0 else 0.0
+
+    def render_prometheus(self):
+        with self.lock:
+            lines = []
+            for metric in (self.stage_seconds, self.polls_per_test, self.submissions, self.results, self.errors):
+                lines.extend(metric.render())
+            lines.append("# HELP nopasaran_runner_submissions_per_second Average submission rate since start.")
+            lines.append("# TYPE nopasaran_runner_submissions_per_second gauge")
+            lines.append(f"nopasaran_runner_submissions_per_second {self.submissions_per_second():.6f}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host="0.0.0.0"):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") not in ("", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def summary(self):
+        elapsed = time.time() - self.started_at
+        lines = [
+            f"Runtime: {elapsed:.1f}s, submissions: {self.submissions.total():g} "
+            f"({self.submissions_per_second():.2f}/s)",
+            f"{'test_name':<24}{'stage':<8}{'count':>7}{'mean':>10}{'p50':>8}{'p95':>8}",
+        ]
+
+        def stage_order(item):
+            labels = dict(item[0])
+            return labels["test_name"], self.STAGES.index(labels["stage"]) if labels["stage"] in self.STAGES else len(self.STAGES)
+
+        for key, series in sorted(self.stage_seconds.series.items(), key=stage_order):
+            labels = dict(key)
+            mean = series["sum"] / series["count"]
+            p50 = self.stage_seconds.quantile(0.5, **labels)
+            p95 = self.stage_seconds.quantile(0.95, **labels)
+            lines.append(f"{labels['test_name']:<24}{labels['stage']:<8}{series['count']:>7}{mean:>9.3f}s{p50:>7g}s{p95:>7g}s")
+
+        for key, series in sorted(self.polls_per_test.series.items()):
+            lines.append(f"Polls per test ({dict(key)['test_name']}): mean {series['sum'] / series['count']:.1f}")
+
+        if self.errors.values:
+            lines.append("Errors:")
+            for key, value in sorted(self.errors.values.items()):
+                labels = dict(key)
+                lines.append(f"  {labels['test_name']:<24}{labels['error_class']:<28}{value:g}")
+        return "\n".join(lines)
@@ -0,0 +1,134 @@
+"""Test ordering for the campaign runner.
+
+The campaign lists tests pair by pair and tree by tree, so a partial run only
+covers the first few test trees. ``fair_order`` reorders them so that any
+prefix of the run is a spread-out sample of the campaign:
+
+* tests are first grouped by priority class (lower classes run first);
+* within a class, test trees share the run in proportion to their weights
+  (stride scheduling);
+* within a tree, worker pairs take turns, and within a pair, domains do,
+  starting from a seeded random offset so that reruns cover other domains
+  first.
+
+``fit_time_budget`` then walks that order and keeps the tests whose
+historical durations still fit in a time budget.
+"""
+import heapq
+import random
+import statistics
+from collections import defaultdict
+
+# Used when no test of the same tree has a recorded duration yet
+DEFAULT_DURATION = 10.0
+
+
+def parse_assignments(spec, cast=float):
+    """Parse ``name=value,name=value`` into a dict."""
+    values = {}
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        name, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Expected name=value, got '{item}'")
+        values[name.strip()] = cast(value)
+    return values
+
+
+def _pair(test):
+    return test["Worker_1"]["name"], test["Worker_2"]["name"]
+
+
+def _stride(groups, weights, rng):
+    # Weighted fair interleaving of already-ordered groups: each pick advances
+    # the group's virtual time by 1/weight, lowest virtual time goes next.
+    heap = []
+    for i, (key, items) in enumerate(groups.items()):
+        weight = weights.get(key, 1.0)
+        if weight <= 0 or not items:
+            continue
+        heap.append((rng.random() / weight, i, key, 1.0 / weight, iter(items)))
+    heapq.heapify(heap)
+    while heap:
+        virtual_time, i, key, stride, items = heapq.heappop(heap)
+        item = next(items, None)
+        if item is None:
+            continue
+        yield item
+        heapq.heappush(heap, (virtual_time + stride, i, key, stride, items))
+
+
+def _group(tests, key):
+    groups = defaultdict(list)
+    for test in tests:
+        groups[key(test)].append(test)
+    return groups
+
+
+def fair_order(tests, priorities=None, weights=None, seed=0):
+    """Return ``tests`` reordered for priority and fair sharing.
+
+    ``priorities`` maps test names to a class (default 0, lower runs first),
+    ``weights`` maps test names to their share within a class (default 1; 0
+    leaves the tree out).
+    """
+    priorities = priorities or {}
+    weights = weights or {}
+    rng = random.Random(seed)
+
+    ordered = []
+    by_class = _group(tests, lambda t: priorities.get(t.get("name"), 0))
+    for priority in sorted(by_class):
+        trees = {}
+        for name, tree_tests in _group(by_class[priority], lambda t: t.get("name")).items():
+            pairs = {}
+            for pair, pair_tests in _group(tree_tests, _pair).items():
+                domains = _group(pair_tests, lambda t: t.get("domain"))
+                pairs[pair] = list(_stride(domains, {}, rng))
+            trees[name] = list(_stride(pairs, {}, rng))
+        ordered.extend(_stride(trees, weights, rng))
+    return ordered
+
+
+def historical_durations(results):
+    """Median ``timing.total`` per (test name, pair) and per test name."""
+    by_pair = defaultdict(list)
+    by_name = defaultdict(list)
+    for entry in results.values():
+        total = (entry.get("timing") or {}).get("total")
+        if total is None:
+            continue
+        by_pair[(entry.get("test_name"), entry.get("worker_1"), entry.get("worker_2"))].append(total)
+        by_name[entry.get("test_name")].append(total)
+    return (
+        {key: statistics.median(values) for key, values in by_pair.items()},
+        {key: statistics.median(values) for key, values in by_name.items()},
+    )
+
+
+def estimate_duration(test, durations, default=DEFAULT_DURATION):
+    by_pair, by_name = durations
+    name = test.get("name")
+    estimate = by_pair.get((name, *_pair(test)))
+    if estimate is None:
+        estimate = by_name.get(name, default)
+    return estimate
+
+
+def fit_time_budget(tests, results, budget_seconds, parallelism=1):
+    """Keep tests, in order, while their estimated durations fit the budget.
+
+    Tests that do not fit are skipped rather than ending the selection, so
+    shorter tests further down the order can still use the remaining time.
+    Returns ``(selected, estimated_seconds)``.
+    """
+    durations = historical_durations(results)
+    capacity = budget_seconds * max(1, parallelism)
+    selected, used = [], 0.0
+    for test in tests:
+        estimate = estimate_duration(test, durations)
+        if used + estimate <= capacity:
+            selected.append(test)
+            used += estimate
+    return selected, used / max(1, parallelism)
@@ -0,0 +1,108 @@
+"""Field-level differences between two JSON values, grouped into categories.
+
+``diff(a, b)`` lists the changes between two decoded JSON values as
+``Change(path, kind, left, right)``. ``path`` is the tuple of keys and list
+positions leading to the change. ``kind`` is one of:
+
+* ``changed``: a different value, or a value of a different type;
+* ``added``: only on the right;
+* ``removed``: only on the left.
+
+Equal values return ``[]`` after a single ``==``, which compares nested dicts
+and lists in C and is much faster than serializing them. Only mismatches
+are walked. A ``DiffEngine`` also memoizes them by the canonical hashes of
+both sides, so a discrepancy repeated across worker pairs and runs is
+walked once.
+
+``categorize`` maps changes to named categories through path patterns
+(``*`` matches any key), the first matching rule winning:
+
+    engine = DiffEngine()
+    changes = engine.diff(dict_result, sync_result)
+    categorize(changes, [("status", ("results", "*", "status")), ("errors", ("errors",))])
+"""
+import hashlib
+import json
+from collections import namedtuple
+
+Change = namedtuple("Change", "path kind left right")
+
+ANY = "*"
+
+
+def canonical_hash(value):
+    """Digest of a JSON value that does not depend on key order."""
+    text = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+def _walk(a, b, path, changes):
+    if a == b:
+        return
+    if isinstance(a, dict) and isinstance(b, dict):
+        for key in a:
+            if key not in b:
+                changes.append(Change(path + (key,), "removed", a[key], None))
+            else:
+                _walk(a[key], b[key], path + (key,), changes)
+        for key in b:
+            if key not in a:
+                changes.append(Change(path + (key,), "added", None, b[key]))
+    elif isinstance(a, list) and isinstance(b, list):
+        for position, (left, right) in enumerate(zip(a, b)):
+            _walk(left, right, path + (position,), changes)
+        for position in range(len(b), len(a)):
+            changes.append(Change(path + (position,), "removed", a[position], None))
+        for position in range(len(a), len(b)):
+            changes.append(Change(path + (position,), "added", None, b[position]))
+    else:
+        changes.append(Change(path, "changed", a, b))
+
+
+def diff(a, b):
+    """The changes from ``a`` to ``b``, in key order; ``[]`` when they are equal."""
+    changes = []
+    _walk(a, b, (), changes)
+    return changes
+
+
+class DiffEngine:
+    """``diff`` with mismatches memoized by the canonical hashes of both sides."""
+
+    def __init__(self):
+        self.memo = {}
+        self.compared = 0
+        self.walked = 0
+
+    def diff(self, a, b):
+        self.compared += 1
+        if a == b:
+            return []
+        key = (canonical_hash(a), canonical_hash(b))
+        if key not in self.memo:
+            self.walked += 1
+            self.memo[key] = diff(a, b)
+        return self.memo[key]
+
+
+def matches(pattern, path):
+    """Whether ``path`` starts with ``pattern`` (``*`` matching any key)."""
+    return len(path) >= len(pattern) and all(p == ANY or p == key for p, key in zip(pattern, path))
+
+
+def categorize(changes, rules, default="other"):
+    """Categories of ``changes``, in rule order: a change counts for the first rule matching its path."""
+    found = set()
+    for change in changes:
+        for category, pattern in rules:
+            if matches(pattern, change.path):
+                found.add(category)
+                break
+        else:
+            found.add(default)
+    order = [category for category, _ in rules] + [default]
+    return sorted(found, key=order.index)
+
+
+def format_path(path):
+    return "".join(f"[{key}]" if isinstance(key, int) else f".{key}" for key in path).lstrip(".") or "."
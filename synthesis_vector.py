@@ -1,6 +1,8 @@
 import json
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
+from plotting import draw_status_row
+from chart_export import save_chart
 
 # 1) Load synthesis.json
 with open('synthesis.json', 'r') as f:
@@ -36,24 +38,7 @@ fig, ax = plt.subplots(figsize=(max_len / 4, fig_height))
 
 for idx, (vector_name, vector) in enumerate(vectors.items()):
     y = y_positions[idx]
-    for i, status in enumerate(vector):
-        ax.barh(
-            y=y,
-            width=1,
-            left=i,
-            height=bar_height,
-            color=colors[status],
-            edgecolor='black',
-            hatch=patterns[status]
-        )
-    ax.text(
-        -5, y,
-        vector_name,
-        va='center',
-        ha='right',
-        fontweight='bold',
-        fontsize=13
-    )
+    draw_status_row(ax, y, vector, colors, patterns, bar_height, vector_name)
 
 # 5) Legend
 legend_handles = [
@@ -86,5 +71,4 @@ ax.spines['bottom'].set_visible(False)
 ax.tick_params(axis='y', which='both', left=False, labelleft=False)
 
 plt.tight_layout()
-plt.savefig('synthesis_vector.png', dpi=300, bbox_inches='tight')
-print("✅ Vector chart saved as 'synthesis_vector.png'")
+save_chart(fig, 'synthesis_vector.png')
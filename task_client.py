@@ -0,0 +1,124 @@
+"""Client for the NoPASARAN task API with batched submission.
+
+``submit_many`` posts a list of payloads to ``<task_url>/batch`` when the
+master supports it. When it does not (404/405), the client falls back to
+pipelined single submissions over a bounded thread pool. Either way it returns
+the task ID (or the error) for each campaign ID.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+class MissingTaskId(Exception):
+    pass
+
+
+def missing_task_id(error=None):
+    # Carry the master's reason for rejecting a payload, when it gives one
+    return MissingTaskId(f"No task ID in response: {error}" if error else "No task ID in response")
+
+
+class TaskClient:
+    def __init__(self, task_url, concurrency=8, batch_size=50, use_batch_endpoint=True, timeout=30):
+        self.task_url = task_url
+        self.batch_url = f"{task_url}/batch"
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        # None until the first batch call tells us whether the endpoint exists
+        self.batch_supported = None if use_batch_endpoint else False
+        self.timeout = timeout
+        self.local = threading.local()
+        self.executor = ThreadPoolExecutor(max_workers=concurrency) if concurrency > 1 else None
+
+    def session(self):
+        # requests sessions are not shared between threads
+        if not hasattr(self.local, "session"):
+            import requests
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def submit(self, body):
+        response = self.session().post(self.task_url, data=body, headers=JSON_HEADERS, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        task_id = data.get("task_id")
+        if not task_id:
+            raise missing_task_id(data.get("error"))
+        return task_id
+
+    def get_status(self, task_id):
+        response = self.session().get(f"{self.task_url}/{task_id}", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _submit_batch(self, items):
+        body = b"[" + b",".join(payload for _, payload in items) + b"]"
+        response = self.session().post(self.batch_url, data=body, headers=JSON_HEADERS, timeout=self.timeout)
+        if response.status_code in (404, 405):
+            return None
+        response.raise_for_status()
+
+        data = response.json()
+        task_ids = data.get("task_ids") or []
+        # Per-payload errors, aligned with the payloads (or keyed by their index)
+        errors = data.get("errors") or []
+        outcome = {}
+        for i, (campaign_id, _) in enumerate(items):
+            task_id = task_ids[i] if i < len(task_ids) else None
+            if task_id:
+                outcome[campaign_id] = task_id
+            elif isinstance(errors, dict):
+                outcome[campaign_id] = missing_task_id(errors.get(str(i), errors.get(i)))
+            else:
+                outcome[campaign_id] = missing_task_id(errors[i] if i < len(errors) else None)
+        return outcome
+
+    def _submit_one(self, item):
+        import requests
+
+        campaign_id, payload = item
+        try:
+            return campaign_id, self.submit(payload)
+        except (requests.exceptions.RequestException, ValueError, MissingTaskId) as e:
+            return campaign_id, e
+
+    def _submit_pipelined(self, items):
+        if self.executor is None or len(items) == 1:
+            return dict(map(self._submit_one, items))
+        return dict(self.executor.map(self._submit_one, items))
+
+    def submit_many(self, items):
+        """Submit ``(campaign_id, payload_bytes)`` pairs.
+
+        Returns a dict mapping each campaign ID to its task ID, or to the
+        exception raised while submitting it.
+        """
+        import requests
+
+        items = list(items)
+        outcome = {}
+        for start in range(0, len(items), self.batch_size):
+            chunk = items[start:start + self.batch_size]
+            result = None
+            if self.batch_supported is not False and len(chunk) > 1:
+                try:
+                    result = self._submit_batch(chunk)
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    result = {campaign_id: e for campaign_id, _ in chunk}
+                self.batch_supported = result is not None
+            if result is None:
+                result = self._submit_pipelined(chunk)
+            outcome.update(result)
+        return outcome
+
+    def map(self, func, iterable):
+        # Run func over iterable on the client's pool (used for polling)
+        if self.executor is None:
+            return list(map(func, iterable))
+        return list(self.executor.map(func, iterable))
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
@@ -2,9 +2,14 @@ import json
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 import os
+from classifiers import classify_dns_run_entry
+from classification_cache import ClassificationCache
+from plotting import draw_status_row
+from chart_export import save_chart
 
 # 1) Load the data files
 data = {}
+paths = {}
 for run_idx in range(1, 5):
     path = f'run_{run_idx}_udp_dns_results.json'
     if not os.path.exists(path):
@@ -12,6 +17,7 @@ for run_idx in range(1, 5):
         continue
     with open(path, 'r') as f:
         data[run_idx] = json.load(f)
+    paths[run_idx] = path
 
 # 2) Gather a stable, sorted list of test IDs
 if data:
@@ -39,37 +45,11 @@ def update_synthesis_file_s4(classifications, test_ids, filename='synthesis.json
         json.dump(synthesis, f, indent=2)
     print("✅ Synthesis file updated with 'S4_DNS'")
 
-# 3) Classification function for DNS
-def classify_dns_entry(entry):
-    result = entry.get('result', {})
-    w1 = result.get('Worker_1')
-    if not w1:
-        return 'Failure'
-
-    vars1 = w1.get('Variables', {})
-
-    dict1 = vars1.get('dict', {})
-    response = dict1.get('response', {})
-
-    # Check if 'received' is explicitly null (=> it's a dict with key 'received' set to None)
-    if isinstance(response, dict):
-        inner_received = response.get('received')
-        if inner_received is None:
-            return 'No Response'
-
-        # Check for sinkhole in response
-        if isinstance(inner_received, dict):
-            response = inner_received.get('response', '')
-            if 'sinkhole.paloaltonetworks.com.' in response:
-                return 'Sinkhole'
-            if '127.0.0.1' in response:
-                return 'Received'
-
-    return 'Failure'
-
 # 4) Build a classification list for each run
+with ClassificationCache() as cache:
+    labels = {run_idx: cache.classify_file(paths[run_idx], classify_dns_run_entry, data[run_idx]) for run_idx in data}
 classifications = {
-    run_idx: [classify_dns_entry(data[run_idx][tid]) for tid in test_ids]
+    run_idx: [labels[run_idx][tid] for tid in test_ids]
     for run_idx in data
 }
 
@@ -95,24 +75,7 @@ fig, ax = plt.subplots(figsize=(len(test_ids)/4, 3.5))  # Slightly shorter heigh
 for idx, run_idx in enumerate(sorted(classifications)):
     vector = classifications[run_idx]
     y = y_positions[idx]
-    for i, status in enumerate(vector):
-        ax.barh(
-            y=y,
-            width=1,
-            left=i,
-            height=bar_height,
-            color=colors[status],
-            edgecolor='black',
-            hatch=patterns[status]
-        )
-    ax.text(
-        -5, y,
-        f'Run {run_idx}',
-        va='center',
-        ha='right',
-        fontweight='bold',
-        fontsize=13  # Slightly smaller font
-    )
+    draw_status_row(ax, y, vector, colors, patterns, bar_height, f'Run {run_idx}')
 
 # 7) Add a legend
 legend_handles = [
@@ -148,8 +111,7 @@ ax.spines['bottom'].set_visible(False)
 
 ax.tick_params(axis='y', which='both', left=False, labelleft=False)
 plt.tight_layout()
-plt.savefig('udp_dns_conformance_vector.png', dpi=300, bbox_inches='tight')
-print("✅ Vector chart saved as 'udp_dns_conformance_vector.png'")
+save_chart(fig, 'udp_dns_conformance_vector.png')
 
 
 update_synthesis_file_s4(classifications, test_ids)
\ No newline at end of file
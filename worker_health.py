@@ -0,0 +1,194 @@
+"""Per-worker health tracking and rate limiting for the campaign runner.
+
+A test involves two workers, so a single failure does not say which one is
+broken. Failures are therefore counted per worker pair: a pair's breaker opens
+after ``failure_threshold`` consecutive failed tests. A worker is suspected
+down once pairs with ``partner_threshold`` distinct partners are open, and
+then every test involving it is held back. Open breakers let a single probe
+test through after a backoff that doubles with each failed probe; after
+``max_probes`` failed probes the worker (or pair) is given up for the run.
+
+Token buckets cap the submission rate towards the master and towards each
+worker independently of the breakers.
+"""
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+DEAD = "dead"
+
+# Outcomes that point at the workers rather than at the master
+WORKER_FAILURES = ("polling_failed",)
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        # Take a token, returning how long the caller must wait for it
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=3, backoff=30.0, max_backoff=600.0, max_probes=3):
+        self.failure_threshold = failure_threshold
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_probes = max_probes
+        self.state = CLOSED
+        self.failures = 0
+        self.failed_probes = 0
+        self.probe_at = None
+
+    def trip(self, now):
+        self.state = OPEN
+        delay = min(self.max_backoff, self.backoff * (2 ** self.failed_probes))
+        self.probe_at = now + delay
+
+    def allow(self, now):
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and now >= self.probe_at:
+            # Let exactly one probe through until it reports back
+            self.state = HALF_OPEN
+            return True
+        return False
+
+    def record(self, ok, now):
+        if ok:
+            self.state = CLOSED
+            self.failures = 0
+            self.failed_probes = 0
+            self.probe_at = None
+            return
+        if self.state == HALF_OPEN:
+            self.failed_probes += 1
+            if self.failed_probes >= self.max_probes:
+                self.state = DEAD
+                self.probe_at = None
+            else:
+                self.trip(now)
+            return
+        self.failures += 1
+        if self.state == CLOSED and self.failures >= self.failure_threshold:
+            self.trip(now)
+
+
+class WorkerHealth:
+    """Decides whether a test between two workers may be dispatched now.
+
+    ``check`` returns ``"allow"``, ``"defer"`` (retry later, see
+    ``next_probe_at``) or ``"dead"`` (give up on the test for this run).
+    """
+
+    def __init__(self, failure_threshold=3, partner_threshold=2, backoff=30.0,
+                 max_backoff=600.0, max_probes=3, worker_rate=None, master_rate=None):
+        self.breaker_args = {
+            "failure_threshold": failure_threshold,
+            "backoff": backoff,
+            "max_backoff": max_backoff,
+            "max_probes": max_probes,
+        }
+        self.partner_threshold = partner_threshold
+        self.pairs = {}
+        self.workers = {}
+        self.failing_partners = {}
+        self.worker_rate = worker_rate
+        self.worker_buckets = {}
+        self.master_bucket = TokenBucket(master_rate) if master_rate else None
+        self.lock = threading.Lock()
+
+    def _pair(self, worker_1, worker_2):
+        key = tuple(sorted((worker_1, worker_2)))
+        if key not in self.pairs:
+            self.pairs[key] = CircuitBreaker(**self.breaker_args)
+        return key, self.pairs[key]
+
+    def _worker(self, worker):
+        if worker not in self.workers:
+            self.workers[worker] = CircuitBreaker(**{**self.breaker_args, "failure_threshold": 1})
+        return self.workers[worker]
+
+    def check(self, worker_1, worker_2, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            breakers = [self._worker(worker_1), self._worker(worker_2), self._pair(worker_1, worker_2)[1]]
+            if any(b.state == DEAD for b in breakers):
+                return "dead"
+            if any(b.state == HALF_OPEN for b in breakers):
+                return "defer"
+            if any(b.state == OPEN and now < b.probe_at for b in breakers):
+                return "defer"
+            # Every open breaker is due: this test becomes their probe
+            for breaker in breakers:
+                breaker.allow(now)
+            return "allow"
+
+    def record(self, worker_1, worker_2, status, now=None):
+        now = time.monotonic() if now is None else now
+        ok = status not in WORKER_FAILURES
+        with self.lock:
+            key, pair = self._pair(worker_1, worker_2)
+            was_open = pair.state != CLOSED
+            pair.record(ok, now)
+
+            for worker, partner in ((worker_1, worker_2), (worker_2, worker_1)):
+                breaker = self._worker(worker)
+                partners = self.failing_partners.setdefault(worker, set())
+                if ok:
+                    partners.clear()
+                    breaker.record(True, now)
+                elif breaker.state == HALF_OPEN:
+                    breaker.record(False, now)
+                elif pair.state != CLOSED and not was_open:
+                    partners.add(partner)
+                    if len(partners) >= self.partner_threshold and breaker.state == CLOSED:
+                        breaker.record(False, now)
+
+    def next_probe_at(self):
+        with self.lock:
+            times = [b.probe_at for b in (*self.pairs.values(), *self.workers.values()) if b.state == OPEN]
+        return min(times) if times else None
+
+    def throttle(self, worker_1, worker_2):
+        # Block until the master and both workers have submission tokens left
+        buckets = []
+        if self.master_bucket:
+            buckets.append(self.master_bucket)
+        if self.worker_rate:
+            with self.lock:
+                for worker in (worker_1, worker_2):
+                    if worker not in self.worker_buckets:
+                        self.worker_buckets[worker] = TokenBucket(self.worker_rate)
+                    buckets.append(self.worker_buckets[worker])
+        wait = max((bucket.reserve() for bucket in buckets), default=0.0)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def unhealthy(self):
+        with self.lock:
+            workers = {w: b.state for w, b in self.workers.items() if b.state != CLOSED}
+            pairs = {p: b.state for p, b in self.pairs.items() if b.state != CLOSED}
+        return workers, pairs